@@ -0,0 +1,253 @@
+"""
+aggregation.py - Prevalence Aggregation Engine
+Module for computing group sizes, case counts, rates and confidence intervals for every chart.
+
+Given an outcome column and one or more grouping keys, ``group_rates`` returns one row per
+observed group in a single pass: the keys are turned into integer codes, combined into a flat
+index and counted with np.bincount. Intervals are computed for all groups at once.
+
+Queries covered by the contingency cube (see cube.py) are answered from its counts without
+touching the rows. Filtered queries (``where``, or a dataset view restricted to a cohort, see
+cohort.py) use the bitmap index (see bitmap.py), or scan only the selected rows.
+
+``ENGINE`` picks the path for every ``group_rates`` call that doesn't pass ``use_cube``, so the
+charts can be rebuilt on each engine and compared (see benchmarks/golden.py):
+
+- ``"auto"``: the cube or bitmaps when they cover the query, otherwise a row scan
+- ``"scan"``: always count the rows with np.bincount
+- ``"pandas"``: the groupby reference implementation
+"""
+
+import numpy as np
+import pandas as pd
+
+from bitmap import condition_mask, get_bitmaps, selected_rows
+from cohort import active_conditions
+from cube import OUTCOME, column, get_cube, key_codes
+
+ENGINES = ["auto", "scan", "pandas"]
+ENGINE = "auto"
+
+
+# ============================================================================
+# CONFIDENCE INTERVALS
+# ============================================================================
+
+def wilson_interval(cases, n, z=1.96):
+    """
+    Wilson score interval for every group at once.
+
+    Parameters:
+    -----------
+    cases, n : array-like
+        Number of cases and group sizes
+    z : float
+        Normal quantile (1.96 for 95%)
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        Lower and upper bounds (NaN where n == 0)
+    """
+    cases = np.asarray(cases, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = cases / n
+        denom = 1 + z**2 / n
+        center = (p + z**2 / (2 * n)) / denom
+        half = (z * np.sqrt((p * (1 - p) + z**2 / (4 * n)) / n)) / denom
+    return center - half, center + half
+
+
+def agresti_coull_interval(cases, n, z=1.96):
+    """
+    Agresti-Coull interval for every group at once (same arguments as ``wilson_interval``).
+    """
+    cases = np.asarray(cases, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n_adj = n + z**2
+        p_adj = (cases + z**2 / 2) / n_adj
+        half = z * np.sqrt(p_adj * (1 - p_adj) / n_adj)
+        lo, hi = np.clip(p_adj - half, 0, 1), np.clip(p_adj + half, 0, 1)
+    lo[n == 0] = np.nan
+    hi[n == 0] = np.nan
+    return lo, hi
+
+
+INTERVALS = {
+    "wilson": wilson_interval,
+    "agresti-coull": agresti_coull_interval,
+}
+
+
+# ============================================================================
+# GROUPED COUNTS
+# ============================================================================
+
+def dense_counts(df, by, outcome=OUTCOME, use_cube=True, where=None):
+    """
+    Count group sizes and outcome sums over the full cross product of the keys.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The standardised diabetes dataset
+    by : list of str
+        Grouping keys (dataset or feature column names)
+    outcome : str
+        Column whose per-group sum and mean are wanted
+    use_cube : bool
+        Answer from the dataset's contingency cube or bitmap index when they
+        cover the query
+    where : dict, optional
+        Only count rows matching {column: value, list of values or ``bitmap.Between``};
+        a cohort view's conditions are always applied as well
+
+    Returns:
+    --------
+    tuple
+        (n, cases, labels): n and cases are arrays shaped by the key sizes,
+        labels holds one label Index per key
+    """
+    where = active_conditions(df, where)
+    if use_cube and not where:
+        cube = get_cube(df)
+        counts = cube.query(by, outcome) if cube is not None else None
+        if counts is not None:
+            return counts
+    if use_cube and where:
+        bitmaps = get_bitmaps(df)
+        if bitmaps is not None:
+            bitmaps.extend(df, by, outcome)
+            if bitmaps.covers(by, outcome, where):
+                return bitmaps.counts(by, outcome, where)
+
+    keys = [key_codes(column(df, name)) for name in by]
+    labels = [key_labels for _, key_labels in keys]
+    shape = tuple(len(key_labels) for key_labels in labels)
+
+    values = column(df, outcome).to_numpy()
+    codes = [codes for codes, _ in keys]
+    if where:
+        rows = selected_rows(df, where)
+        codes = [c[rows] for c in codes]
+        values = values[rows]
+
+    valid = ~np.isnan(values) if values.dtype.kind == "f" else None
+    for c in codes:
+        if c.min(initial=0) < 0:
+            valid = c >= 0 if valid is None else valid & (c >= 0)
+    if valid is not None:
+        codes = [c[valid] for c in codes]
+        values = values[valid]
+
+    size = int(np.prod(shape))
+    flat = np.ravel_multi_index(codes, shape) if len(codes) > 1 else codes[0]
+    n = np.bincount(flat, minlength=size)
+    cases = np.bincount(flat, weights=values, minlength=size)
+    if values.dtype.kind in "uib":
+        cases = np.rint(cases).astype(np.int64)
+    return n.reshape(shape), cases.reshape(shape), labels
+
+
+# ============================================================================
+# PREVALENCE TABLE
+# ============================================================================
+
+def rates_table(n, cases, labels, by, z=1.96, interval="wilson"):
+    """
+    Turn dense counts into a table of observed groups with rates and intervals.
+
+    Parameters:
+    -----------
+    n, cases : numpy.ndarray
+        Dense counts shaped by the key sizes (see ``dense_counts``)
+    labels : list of pandas.Index
+        Labels for each key
+    by : list of str
+        Key names used as column names
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per group with n > 0: key columns, n, cases, rate, lo, hi
+    """
+    observed = np.flatnonzero(n.ravel())
+    positions = np.unravel_index(observed, n.shape)
+
+    table = {}
+    for name, key_labels, pos in zip(by, labels, positions):
+        if isinstance(key_labels, pd.CategoricalIndex):
+            # Categorical keys stay categorical so pivots and sorts keep their order
+            table[name] = key_labels[pos].values
+        else:
+            table[name] = np.asarray(key_labels[pos])
+
+    group_n = n.ravel()[observed]
+    group_cases = cases.ravel()[observed]
+    lo, hi = INTERVALS[interval](group_cases, group_n, z)
+
+    table["n"] = group_n
+    table["cases"] = group_cases
+    table["rate"] = group_cases / group_n
+    table["lo"] = lo
+    table["hi"] = hi
+    return pd.DataFrame(table)
+
+
+def group_rates(df, by, outcome=OUTCOME, z=1.96, interval="wilson", use_cube=None, where=None):
+    """
+    Compute n, cases, rate and a confidence interval for every group in one pass.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The standardised diabetes dataset
+    by : str or list of str
+        Grouping keys; dataset columns or ``features.get_features`` columns
+    outcome : str
+        0/1 outcome column (any numeric column works; rate is then its mean)
+    z : float
+        Normal quantile for the interval
+    interval : str
+        "wilson" or "agresti-coull"
+    use_cube : bool, optional
+        Set to False to always scan the rows; by default ``ENGINE`` decides
+    where : dict, optional
+        Only count rows matching {column: value, list of values or ``bitmap.Between``},
+        e.g. {"smoker": 1, "physactivity": 0}; on a cohort view (see cohort.py)
+        the cohort's conditions are added
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per observed group, ordered like ``groupby(..., observed=True)``:
+        key columns, n, cases, rate, lo, hi
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    if use_cube is None:
+        if ENGINE == "pandas":
+            return group_rates_pandas(df, by, outcome, z=z, interval=interval, where=where)
+        use_cube = ENGINE == "auto"
+    n, cases, labels = dense_counts(df, by, outcome, use_cube=use_cube, where=where)
+    return rates_table(n, cases, labels, by, z=z, interval=interval)
+
+
+def group_rates_pandas(df, by, outcome=OUTCOME, z=1.96, interval="wilson", where=None):
+    """
+    Reference implementation of ``group_rates`` using pandas groupby.
+
+    Mirrors the per-chart pandas code the engine replaced; used to check and
+    benchmark the fast path.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    mask = np.ones(len(df), dtype=bool)
+    for col, condition in active_conditions(df, where):
+        mask &= condition_mask(column(df, col), condition)
+    keys = [column(df, name)[mask].rename(name) for name in by]
+    grouped = column(df, outcome)[mask].groupby(keys, observed=True)
+    table = grouped.agg(n="count", cases="sum").reset_index()
+    table["rate"] = grouped.mean().to_numpy()
+    table["lo"], table["hi"] = INTERVALS[interval](table["cases"], table["n"], z)
+    return table
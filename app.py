@@ -1,7 +1,9 @@
+import functools
+import importlib
+import math
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
 
 # ============================================================================
 # STYLING FUNCTIONS
@@ -64,45 +66,203 @@ def styled_header():
     st.markdown(html, unsafe_allow_html=True)
     st.markdown("---")
 
-# Import hypothesis modules with functions
-from hypothesis_h1 import (
-    create_risk_factors_chart,
-    create_individual_lifestyle_factors_chart,
-    create_physical_activity_by_demographics_chart,
-)
-
-from hypothesis_h2 import (
-    create_education_health_behaviors_chart,
-    create_education_diabetes_trend_chart,
-    create_income_diabetes_by_education_chart,
-    create_education_lifestyle_diabetes_chart,
-)
-
-from hypothesis_h3 import (
-    create_healthcare_coverage_chart,
-    create_income_trends_dual_chart,
-    create_access_barriers_chart,
-)
-
-from hypothesis_h4 import (
-    create_health_trends_chart,
-    create_functional_limitations_comparison_chart,
-    create_functional_limitations_chart,
-)
-
-from hypothesis_h5 import (
-    create_preexisting_conditions_chart,
-    create_preexisting_conditions_demographics_chart,
-    create_bmi_categories_chart,
-    create_condition_count_chart,
-)
-
-from conclusion import create_sankey_diagram
-from introduction import display_body_diagram
-
-# Load dataset
-df = pd.read_csv('diabetes.csv')
-df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_') #standardising column names
+# function to display a chart only while its tab is selected
+def render_chart(tab, builder, *args, **kwargs):
+    """
+    Build and display a chart only while its tab is the selected one.
+    Tabs created with on_change="rerun" report the selected tab through
+    tab.open, so the other tabs' charts are neither built nor sent.
+    """
+    if tab.open is not False:
+        fig, nbytes = builder.sized(*args, **kwargs)
+        with profiling.span("plotly_chart", builder.__name__, bytes=nbytes):
+            st.plotly_chart(fig, width="stretch")
+
+# function to show the opt-in performance panel (see profiling.py)
+def request_profile():
+    """Button callback: capture the rerun it triggers with cProfile."""
+    st.session_state["profile_next_rerun"] = True
+
+def performance_panel(rerun_profile):
+    """
+    Sidebar panel with this rerun's timings, the figure cache counters and the
+    size of every figure built so far, plus a button to cProfile the next rerun.
+    """
+    if rerun_profile.dump_path is not None:
+        st.session_state["last_profile_dump"] = rerun_profile.dump_path
+
+    with st.sidebar.expander("Performance"):
+        st.caption(f"Last rerun: {rerun_profile.total_ms:.0f} ms")
+        st.caption("Allocations are process-wide deltas: they include other sessions and the warm-up.")
+        st.dataframe(pd.DataFrame(rerun_profile.totals()).rename(columns={"alloc_kib": "process alloc KiB"}),
+                     hide_index=True)
+        spans = pd.DataFrame([
+            {"span": "· " * item["depth"] + item["name"], "detail": item["detail"],
+             "ms": item["ms"], "process alloc KiB": item["alloc_kib"]}
+            for item in rerun_profile.spans
+        ])
+        st.dataframe(spans, hide_index=True)
+
+        stats = FIGURE_CACHE.stats()
+        st.caption(f"Figure cache: {stats['hits']} hits, {stats['misses']} misses, {stats['waits']} waits, "
+                   f"{stats['evictions']} evictions, {stats['entries']} figures "
+                   f"({stats['bytes'] / 2**20:.1f} MiB)")
+        payloads = pd.DataFrame(PAYLOADS.report())
+        if not payloads.empty:   # name each record's cohort (see figure_cache.dataset_key)
+            payloads["dataset"] = [describe(key[3]) or "everyone" if key else "" for key in payloads["dataset"]]
+        st.dataframe(payloads, hide_index=True)
+
+        st.button("Profile next rerun", on_click=request_profile)
+        if "last_profile_dump" in st.session_state:
+            st.caption(f"cProfile dump: {st.session_state['last_profile_dump']}")
+
+# function to choose the cohort every hypothesis chart is restricted to (see cohort.py)
+def cohort_filters(df):
+    """
+    Sidebar filters for age, sex, income, education and BMI.
+    Filters left at their full range don't restrict anything; the result is
+    the cohort to pass to cohort.view.
+    """
+    bitmaps = get_bitmaps(df)
+    with st.sidebar.expander("Cohort filters"):
+        st.caption("Applied to every chart on the hypothesis pages.")
+        age = st.select_slider("Age", AGE_LABELS, value=(AGE_LABELS[0], AGE_LABELS[-1]), key="cohort_age")
+        sex = st.radio("Sex", ["All"] + SEX_LABELS, horizontal=True, key="cohort_sex")
+        income = st.select_slider("Income", INCOME_LABELS, value=(INCOME_LABELS[0], INCOME_LABELS[-1]),
+                                  key="cohort_income")
+        education = st.select_slider("Education", EDUCATION_LABELS,
+                                     value=(EDUCATION_LABELS[0], EDUCATION_LABELS[-1]), key="cohort_education")
+        bmi = None
+        low, high = bitmaps.bounds("bmi") if bitmaps is not None and "bmi" in bitmaps.order else (None, None)
+        if low is not None:
+            low, high = math.floor(low), math.ceil(high)
+            bmi = st.slider("BMI", low, high, (low, high), key="cohort_bmi")
+            if bmi == (low, high):
+                bmi = None
+
+    return make_cohort(
+        age=code_range(AGE_LABELS, *age),
+        sex=None if sex == "All" else SEX_LABELS.index(sex),
+        income=code_range(INCOME_LABELS, *income),
+        education=code_range(EDUCATION_LABELS, *education),
+        bmi=bmi,
+    )
+
+# Chart module behind each page, imported the first time the page is shown so a cold
+# start only loads plotly and the chart code for the page actually requested
+PAGE_MODULES = {
+    "Introduction": "introduction",
+    "**H1**: Lifestyle Habits and Diabetes": "hypothesis_h1",
+    "**H2**: Education and Diabetes": "hypothesis_h2",
+    "**H3**: Healthcare Access and Diabetes": "hypothesis_h3",
+    "**H4**: Self-Rated Health and Diabetes": "hypothesis_h4",
+    "**H5**: Pre-Existing Health Conditions and Diabetes": "hypothesis_h5",
+    "Conclusion": "conclusion",
+}
+
+def page_module(page):
+    """Import (once per process) and return the chart module of a page."""
+    return importlib.import_module(PAGE_MODULES[page])
+
+import metrics
+import profiling
+from bitmap import get_bitmaps
+from cohort import AGE_LABELS, code_range, cohort_size, describe, make_cohort, view
+from data_loader import load_dataset
+from features import EDUCATION_LABELS, INCOME_LABELS, SEX_LABELS
+from figure_cache import FIGURE_CACHE
+from payload import PAYLOADS
+from warmup import CLIENT_SIDE_VARIANTS, start_warmup, warmup_run
+
+# Export render latency and cache metrics if configured (see metrics.py)
+metrics.start()
+
+# Time this run's hot paths when profiling or metrics are enabled (see profiling.py); the
+# panel's button asks for the next run to be captured with cProfile as well
+rerun_profile = profiling.begin_rerun(capture=st.session_state.pop("profile_next_rerun", False))
+
+# Load dataset (parsed once per process, standardised column names and compact dtypes)
+with profiling.span("load_dataset"):
+    df = load_dataset('diabetes.csv')
+
+# Progress of the background warm-up, once a run has started it (see the end of the script)
+warmup = warmup_run(df)
+
+# ==============
+# INTERACTIVE CHARTS
+# ==============
+
+# Each selectbox-driven chart is a fragment: changing its option reruns only the
+# function below instead of the whole script (data load, sibling tabs, markdown)
+
+# With client-side variants (DASHBOARD_CLIENT_SIDE_VARIANTS=1, see warmup.py) the selectbox
+# is replaced by a dropdown inside the figure, which carries every option's data, so
+# switching needs no round-trip to the server
+
+def profiled_fragment(fn):
+    """
+    st.fragment whose own reruns (a selectbox change) are profiled like full runs,
+    labelled "<page module>/<function>", so metrics and the profiler see them too.
+    """
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        if profiling.current() is not None:   # rendered as part of a profiled full run
+            return fn(*args, **kwargs)
+        profiling.begin_rerun(f"{PAGE_MODULES[page]}/{fn.__name__}")
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiling.end_rerun()
+    return st.fragment(run)
+
+@profiled_fragment
+def physical_activity_chart(tab, h1):
+    """H1 physical activity chart with its demographic selectbox."""
+    if CLIENT_SIDE_VARIANTS:
+        render_chart(tab, h1.create_physical_activity_by_demographics_chart, cohort_df, all_variants=True)
+        return
+    
+    demographic_choice = st.selectbox(
+        "Choose demographic to view:",
+        h1.DEMOGRAPHIC_OPTIONS,
+        key="h1_demographic"
+    )
+    
+    render_chart(tab, h1.create_physical_activity_by_demographics_chart, cohort_df, demographic=demographic_choice)
+
+@profiled_fragment
+def healthcare_coverage_chart(tab, h3):
+    """H3 coverage and cost barrier chart with its income level selectbox."""
+    if CLIENT_SIDE_VARIANTS:
+        render_chart(tab, h3.create_healthcare_coverage_chart, cohort_df, all_variants=True)
+        return
+    
+    selected_income = st.selectbox(
+        "Select income level:",
+        h3.INCOME_LEVELS,
+        index=4,  # Default to $25k-$35k
+        key="h3_income"
+    )
+    
+    render_chart(tab, h3.create_healthcare_coverage_chart, cohort_df, income_level=selected_income)
+
+@profiled_fragment
+def preexisting_conditions_chart(tab, h5):
+    """H5 individual conditions chart with its sort selectbox."""
+    if CLIENT_SIDE_VARIANTS:
+        render_chart(tab, h5.create_preexisting_conditions_chart, cohort_df, all_variants=True)
+        return
+    
+    sort_method = st.selectbox(
+        "Sort by:",
+        h5.SORT_OPTIONS,
+        key="h5_sort"
+    )
+    
+    # Map display name to function parameter
+    sort_param = "Relative Risk" if "Relative" in sort_method else "Prevalence"
+    
+    render_chart(tab, h5.create_preexisting_conditions_chart, cohort_df, sort_by=sort_param)
 
 # ==============
 # PAGE SETUP
@@ -112,24 +272,42 @@ st.set_page_config(page_title="Diabetes Risk Factors Dashboard", layout="wide")
 
 # sidebar nagivation - radio button style
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to:", [
-    "Introduction",
-    "**H1**: Lifestyle Habits and Diabetes",
-    "**H2**: Education and Diabetes",
-    "**H3**: Healthcare Access and Diabetes",
-    "**H4**: Self-Rated Health and Diabetes",
-    "**H5**: Pre-Existing Health Conditions and Diabetes",
-    "Conclusion"
-])
+page = st.sidebar.radio("Go to:", list(PAGE_MODULES))
+if rerun_profile is not None:
+    rerun_profile.label = PAGE_MODULES[page]
+
+if warmup is not None and not warmup.finished:
+    status = warmup.status()
+    st.sidebar.progress(status["done"] / max(status["total"], 1),
+                        text=f"Preparing charts: {status['done']}/{status['total']}")
+elif warmup is not None and warmup.error is not None:
+    st.sidebar.warning(f"Preparing charts stopped early ({warmup.error!r}); charts are built on demand.")
+
+# Cohort filters: the hypothesis charts are built from a view of the dataset restricted to
+# the cohort, counted from the bitmap index (see cohort.py), and cached per cohort
+cohort = cohort_filters(df)
+with profiling.span("cohort"):
+    cohort_df = view(df, cohort)
+    respondents = cohort_size(cohort_df)
+if cohort:
+    st.sidebar.caption(f"Cohort: {respondents:,} of {len(df):,} respondents")
+if cohort and respondents == 0:
+    st.sidebar.warning("No respondents match these filters, so the charts show everyone.")
+    cohort, cohort_df = (), df
 
 # Header with light red background and serif font
 styled_header()
 
+if cohort and page not in ("Introduction", "Conclusion"):
+    st.info(f"Charts show {describe(cohort)} only ({respondents:,} respondents). "
+            "Change this under Cohort filters in the sidebar.")
+
 # ==============
 # PAGE CONTENT
 # ==============
 
 if page == "Introduction":
+    intro = page_module(page)
     styled_heading("Introduction", level=1, align="center")
     st.markdown("""
     <div style='text-align: center; font-size: 18px;'>
@@ -377,13 +555,14 @@ if page == "Introduction":
 
     # BODY DIAGRAM - NEW SECTION
     styled_heading("🫀 How Diabetes Affects Your Body")
-    display_body_diagram()
+    intro.display_body_diagram()
     
 # =====================
 # H1: LIFESTYLE HABITS
 # =====================
 
 elif page == "**H1**: Lifestyle Habits and Diabetes":
+    h1 = page_module(page)
     styled_heading("Hypothesis 1: Lifestyle Habits and Diabetes", level=1, align="center")
     st.write("""
     **Hypothesis**: Modifiable behaviours – including smoking, physical inactivity, insufficient fruit and vegetable intake, and heavy alcohol consumption – are associated with a higher risk of diabetes.
@@ -399,13 +578,12 @@ elif page == "**H1**: Lifestyle Habits and Diabetes":
         "Individual Factors",
         "Risk Factors Accumulation",
         "Physical Activity by Demographics"
-    ])
+    ], key="h1_tabs", on_change="rerun")
     
     with tab1:
         st.write("**Diabetes Prevalence by Lifestyle Habits**")
         st.write("Shows the rate of diabetes for each type of lifestyle habit.")
-        fig0 = create_individual_lifestyle_factors_chart(df)
-        st.plotly_chart(fig0, use_container_width=True)
+        render_chart(tab1, h1.create_individual_lifestyle_factors_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights", level=2)
         st.write("""
@@ -417,8 +595,7 @@ elif page == "**H1**: Lifestyle Habits and Diabetes":
     with tab2:
         st.write("**Diabetes Prevalence by Number of Risk Factors**")
         st.write("Shows how diabetes risk increases as more lifestyle risk factors (smoking, no physical activity, low fruit intake, low veggie intake) accumulate:")
-        fig1 = create_risk_factors_chart(df)
-        st.plotly_chart(fig1, use_container_width=True)
+        render_chart(tab2, h1.create_risk_factors_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights", level=2)
         st.write("""
@@ -431,14 +608,7 @@ elif page == "**H1**: Lifestyle Habits and Diabetes":
         st.write("**Physical Activity vs Diabetes by Education, Age Group, and Sex**")       
         
         # SELECTBOX
-        demographic_choice = st.selectbox(
-            "Choose demographic to view:",
-            ["Age Group", "Sex", "BMI Category"],
-            key="h1_demographic"
-        )
-        
-        fig2 = create_physical_activity_by_demographics_chart(df, demographic=demographic_choice)
-        st.plotly_chart(fig2, use_container_width=True)
+        physical_activity_chart(tab3, h1)
         st.markdown("---")
         styled_heading("Key Insights", level=2)
         st.write("""
@@ -452,6 +622,7 @@ elif page == "**H1**: Lifestyle Habits and Diabetes":
 # ===============
 
 elif page == "**H2**: Education and Diabetes":
+    h2 = page_module(page)
     styled_heading("Hypothesis 2: Education and Diabetes",level=1, align="center")
     st.write("""
     **Hypothesis**: Higher educational attainment reduces the likelihood of diabetes, both directly through health literacy and indirectly via healthier behaviours and improved healthcare access.
@@ -469,13 +640,12 @@ elif page == "**H2**: Education and Diabetes":
         "Diabetes by Education Level",
         "Income vs Education Level",
         "Education Level & Lifestyle Trends"
-    ])
+    ], key="h2_tabs", on_change="rerun")
     
     with tab1:
         st.write("**Health Behaviors Improve with Education**")
         st.write("Shows the prevalence of healthy diet, physical activity, and regular checkup habits by education level:")
-        fig1 = create_education_health_behaviors_chart(df)
-        st.plotly_chart(fig1, use_container_width=True)
+        render_chart(tab1, h2.create_education_health_behaviors_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights", level=2)
         st.write("""
@@ -488,8 +658,7 @@ elif page == "**H2**: Education and Diabetes":
     with tab2:
         st.write("**Diabetes Rates Decline with Higher Education**")
         st.write("Clear trend showing diabetes rates decrease as education level increases:")
-        fig2 = create_education_diabetes_trend_chart(df)
-        st.plotly_chart(fig2, use_container_width=True)
+        render_chart(tab2, h2.create_education_diabetes_trend_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights", level=2)
         st.write("""
@@ -501,8 +670,7 @@ elif page == "**H2**: Education and Diabetes":
     with tab3:
         st.write("**Diabetes by Income and Education Level**")
         st.write("Heatmap showing how both income and education interact to affect diabetes risk:")
-        fig3 = create_income_diabetes_by_education_chart(df)
-        st.plotly_chart(fig3, use_container_width=True)
+        render_chart(tab3, h2.create_income_diabetes_by_education_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights", level=2)
         st.write("""
@@ -514,8 +682,7 @@ elif page == "**H2**: Education and Diabetes":
     with tab4:
         st.write("**Education's Impact on Lifestyle and Diabetes**")
         st.write("Shows how education levels correspond with lifestyle choices and diabetes rates:")
-        fig4 = create_education_lifestyle_diabetes_chart(df)
-        st.plotly_chart(fig4, use_container_width=True)
+        render_chart(tab4, h2.create_education_lifestyle_diabetes_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -529,6 +696,7 @@ elif page == "**H2**: Education and Diabetes":
 # ============================================================================
 
 elif page == "**H3**: Healthcare Access and Diabetes":
+    h3 = page_module(page)
     styled_heading("Hypothesis 3: Healthcare Access and Diabetes", level=1, align="center")
     st.write("""
     **Hypothesis**: Limited access to healthcare – due to cost barriers, lack of regular care, or low income – 
@@ -547,26 +715,14 @@ elif page == "**H3**: Healthcare Access and Diabetes":
         "Coverage & Barriers",
         "Income Trends",
         "Access Barriers",
-    ])
+    ], key="h3_tabs", on_change="rerun")
 
     with tab1:
         st.write("**Healthcare Coverage & Cost Barriers to Doctors by Income Level**")
         st.write("Use the dropdown to view data for different income levels:")
         
         # SELECTBOX FOR INCOME LEVEL
-        income_options = [
-            '< $10k', '$10k-$15k', '$15k-$20k', '$20k-$25k',
-            '$25k-$35k', '$35k-$50k', '$50k-$75k', '> $75k'
-        ]
-        selected_income = st.selectbox(
-            "Select income level:",
-            income_options,
-            index=4,  # Default to $25k-$35k
-            key="h3_income"
-        )
-        
-        fig1 = create_healthcare_coverage_chart(df, income_level=selected_income)
-        st.plotly_chart(fig1, use_container_width=True)
+        healthcare_coverage_chart(tab1, h3)
 
         st.markdown("---")
         styled_heading("Key Insights")
@@ -578,8 +734,7 @@ elif page == "**H3**: Healthcare Access and Diabetes":
     with tab2:
         st.write("**Income Level Impact on Healthcare Access and Diabetes**")
         st.write("Left: Diabetes rate by income | Right: Healthcare coverage gaps by income")
-        fig2 = create_income_trends_dual_chart(df)
-        st.plotly_chart(fig2, use_container_width=True)
+        render_chart(tab2, h3.create_income_trends_dual_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -591,8 +746,7 @@ elif page == "**H3**: Healthcare Access and Diabetes":
     with tab3:
         st.write("**Cumulative Effect of Healthcare Access Barriers**")
         st.write("Shows diabetes rates based on number of access barriers (healthcare coverage, cost barrier to doctor):")
-        fig3 = create_access_barriers_chart(df)
-        st.plotly_chart(fig3, use_container_width=True)
+        render_chart(tab3, h3.create_access_barriers_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -606,6 +760,7 @@ elif page == "**H3**: Healthcare Access and Diabetes":
 # ============================================================================
 
 elif page == "**H4**: Self-Rated Health and Diabetes":
+    h4 = page_module(page)
     styled_heading("Hypothesis 4: Self-Rated Health and Diabetes", level=1, align="center")
     st.write("""
     **Hypothesis**: Poor self-rated health and functional limitations – including low general health ratings, 
@@ -624,13 +779,12 @@ elif page == "**H4**: Self-Rated Health and Diabetes":
         "Health Trends",
         "Functional Limitations",
         "Limitation Impact"
-    ])
+    ], key="h4_tabs", on_change="rerun")
 
     with tab1:
         st.write("**Trends in Diabetes vs Unhealthy Days by General Health Rating**")
         st.write("Dual-axis chart showing diabetes rate versus days of poor mental and physical health:")
-        fig1 = create_health_trends_chart(df)
-        st.plotly_chart(fig1, use_container_width=True)
+        render_chart(tab1, h4.create_health_trends_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -643,8 +797,7 @@ elif page == "**H4**: Self-Rated Health and Diabetes":
     with tab2:
         st.write("**Functional Limitations Comparison**")
         st.write("Left: Difficulty walking | Right: Engagement in Physical Activity")
-        fig2 = create_functional_limitations_comparison_chart(df)
-        st.plotly_chart(fig2, use_container_width=True)
+        render_chart(tab2, h4.create_functional_limitations_comparison_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -656,8 +809,7 @@ elif page == "**H4**: Self-Rated Health and Diabetes":
     with tab3:
         st.write("**Effect of Functional Limitations**")
         st.write("Shows how diabetes rates change by number of functional limitations reported:")
-        fig4 = create_functional_limitations_chart(df)
-        st.plotly_chart(fig4, use_container_width=True)
+        render_chart(tab3, h4.create_functional_limitations_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -670,6 +822,7 @@ elif page == "**H4**: Self-Rated Health and Diabetes":
 # ============================================================================
 
 elif page == "**H5**: Pre-Existing Health Conditions and Diabetes":
+    h5 = page_module(page)
     styled_heading("Hypothesis 5: Pre-Existing Health Conditions and Diabetes", level=1, align="center")
     st.write("""
     **Hypothesis**: Individuals with pre-existing cardiometabolic conditions – such as stroke, heart disease or heart attack, 
@@ -691,24 +844,14 @@ elif page == "**H5**: Pre-Existing Health Conditions and Diabetes":
         "By Demographics",
         "BMI Categories",
         "Condition Count"
-    ])
+    ], key="h5_tabs", on_change="rerun")
 
     with tab1:
         st.write("**Pre-Existing Conditions and Diabetes Risk**")
         st.write("Use the dropdown to sort by Prevalence (diabetes rate) or Relative Risk (yes/no ratio):")
         
         # SELECTBOX FOR SORT METHOD
-        sort_method = st.selectbox(
-            "Sort by:",
-            ["Prevalence", "Relative Risk"],
-            key="h5_sort"
-        )
-        
-        # Map display name to function parameter
-        sort_param = "Relative Risk" if "Relative" in sort_method else "Prevalence"
-        
-        fig1 = create_preexisting_conditions_chart(df, sort_by=sort_param)
-        st.plotly_chart(fig1, use_container_width=True)
+        preexisting_conditions_chart(tab1, h5)
         
         st.markdown("---")
         styled_heading("Key Insights")
@@ -721,8 +864,7 @@ elif page == "**H5**: Pre-Existing Health Conditions and Diabetes":
     with tab2:
         st.write("**Pre-Existing Conditions by Demographics**")
         st.write("Use the dropdown to switch between Age Group and Sex views:")
-        fig2 = create_preexisting_conditions_demographics_chart(df)
-        st.plotly_chart(fig2, use_container_width=True)
+        render_chart(tab2, h5.create_preexisting_conditions_demographics_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -734,8 +876,7 @@ elif page == "**H5**: Pre-Existing Health Conditions and Diabetes":
     with tab3:
         st.write("**Diabetes Rate by BMI Category**")
         st.write("Shows progression across 6 BMI classification levels with color gradient:")
-        fig3 = create_bmi_categories_chart(df)
-        st.plotly_chart(fig3, use_container_width=True)
+        render_chart(tab3, h5.create_bmi_categories_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -747,8 +888,7 @@ elif page == "**H5**: Pre-Existing Health Conditions and Diabetes":
     with tab4:
         st.write("**Effect of Multiple Pre-Existing Conditions**")
         st.write("Shows how diabetes risk increases with each additional condition:")
-        fig4 = create_condition_count_chart(df)
-        st.plotly_chart(fig4, use_container_width=True)
+        render_chart(tab4, h5.create_condition_count_chart, cohort_df)
         st.markdown("---")
         styled_heading("Key Insights")
         st.write("""
@@ -762,6 +902,7 @@ elif page == "**H5**: Pre-Existing Health Conditions and Diabetes":
 # ============================================================================
 
 elif page == "Conclusion":
+    conclusion = page_module(page)
     styled_heading("Conclusion", level=1, align="center")
     
     # Introduction
@@ -935,8 +1076,9 @@ elif page == "Conclusion":
     st.write("This Sankey diagram visualizes how data variables flow through each hypothesis to their conclusions (Accept/Reject):")
     
     # Display the Sankey diagram
-    sankey_fig = create_sankey_diagram()
-    st.plotly_chart(sankey_fig, use_container_width=True)
+    sankey_fig, sankey_bytes = conclusion.create_sankey_diagram.sized()
+    with profiling.span("plotly_chart", "create_sankey_diagram", bytes=sankey_bytes):
+        st.plotly_chart(sankey_fig, width="stretch")
     
     st.info("""
     **Diagram Guide:**
@@ -998,4 +1140,20 @@ elif page == "Conclusion":
     - Lungs -> https://pngtree.com/freepng/vector-illustration-of-lung-anatomy-in-medical-biology-set-against-a-white-background-vector_12922676.html 
     - Pancreas -> https://pngtree.com/freepng/human-pancreas_16414480.html 
     - Stomach -> https://pngtree.com/freepng/visceral-stomach_5420103.html 
-    """)
\ No newline at end of file
+    """)
+
+# ==============
+# PERFORMANCE PANEL
+# ==============
+
+rerun_profile = profiling.end_rerun()
+if rerun_profile is not None and profiling.ENABLED:
+    performance_panel(rerun_profile)
+
+# ==============
+# WARM-UP
+# ==============
+
+# Pre-render every chart variant in the background (once per dataset version), started only
+# now so that it doesn't compete with the first visitor's page for the CPU
+start_warmup(df)
@@ -0,0 +1,155 @@
+"""
+assets.py - Image Assets
+Module for preparing the dashboard's images once per process, at the size they are shown at.
+
+The introduction body diagram overlays ten images on a Plotly figure. The originals are up to
+500x500 px and ~750 KB in total, but most organs are drawn a few dozen pixels tall. Each image
+is resolved once, shrunk to fit its on-screen box (times ``PIXEL_RATIO`` for high-DPI screens),
+recompressed, and cached as the ``source`` the figure references (once: concurrent requests for
+the same image wait for the first one):
+
+- ``MODE = "data_uri"`` embeds the small image in the figure JSON (works everywhere)
+- ``MODE = "static"`` writes it to ``static/`` and returns its URL, so the browser fetches and
+  caches it once; this needs ``server.enableStaticServing = true`` in .streamlit/config.toml
+
+Layout images can't be clipped out of a larger picture, so the images are not packed into a
+sprite; each stays its own (small) source.
+"""
+
+import base64
+import functools
+import io
+import os
+import threading
+from concurrent.futures import Future
+
+from PIL import Image
+
+MODE = "data_uri"
+FORMAT = "WEBP"     # lossy with alpha, far smaller than PNG; "PNG" keeps images lossless
+QUALITY = 85
+WEBP_METHOD = 4    # encoder effort 0-6; 6 is several times slower for a few percent smaller files
+
+# Size of the plot area the paper fractions of a layout image refer to: the full width of the
+# wide layout and Plotly's default height, doubled for high-DPI screens
+PAPER_WIDTH = 1400
+PAPER_HEIGHT = 450
+PIXEL_RATIO = 2
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+
+MIME_TYPES = {"WEBP": "image/webp", "PNG": "image/png", "JPEG": "image/jpeg"}
+
+_LOCK = threading.Lock()
+_SOURCES = {}   # (filename, sizex, sizey) -> Future of the image source
+
+
+@functools.lru_cache(maxsize=None)
+def resolve(filename):
+    """
+    Find an image file, checking the working directory, this directory and their images/ folders.
+
+    Returns:
+    --------
+    str or None
+        Absolute path, or None if the file is nowhere to be found
+    """
+    possible_paths = [
+        filename,
+        os.path.join(BASE_DIR, filename),
+        os.path.join('images', filename),
+        os.path.join(BASE_DIR, 'images', filename),
+    ]
+
+    for path in possible_paths:
+        if os.path.exists(path):
+            return os.path.abspath(path)
+
+    return None
+
+
+def encode(path, max_width=None, max_height=None):
+    """
+    Shrink an image to fit a pixel box (never enlarging it) and recompress it.
+
+    Returns:
+    --------
+    bytes
+        The image in ``FORMAT``
+    """
+    with Image.open(path) as image:
+        image.load()
+        if max_width and max_height:
+            image.thumbnail((max_width, max_height), Image.LANCZOS)
+        if FORMAT == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        if FORMAT == "PNG":
+            image.save(buffer, FORMAT, optimize=True)
+        elif FORMAT == "WEBP":
+            image.save(buffer, FORMAT, quality=QUALITY, method=WEBP_METHOD)
+        else:
+            image.save(buffer, FORMAT, quality=QUALITY, optimize=True)
+        return buffer.getvalue()
+
+
+def image_source(filename, sizex=1.0, sizey=1.0):
+    """
+    Return the layout image ``source`` for an image shown in a ``sizex`` x ``sizey`` paper box.
+
+    Each image is prepared once per process; callers asking for one that is being prepared wait
+    for it.
+
+    Parameters:
+    -----------
+    filename : str
+        Image file name (see ``resolve``)
+    sizex, sizey : float
+        The layout image's size as fractions of the plot area
+
+    Returns:
+    --------
+    str or None
+        Data URI or static URL depending on ``MODE``; None if the file is missing
+    """
+    key = (filename, sizex, sizey)
+    with _LOCK:
+        future = _SOURCES.get(key)
+        owner = future is None
+        if owner:
+            future = _SOURCES[key] = Future()
+    if not owner:
+        return future.result()
+    try:
+        source = _prepare(filename, sizex, sizey)
+    except BaseException as exc:
+        with _LOCK:
+            del _SOURCES[key]   # not cached: the next call tries again
+        future.set_exception(exc)
+        raise
+    future.set_result(source)
+    return source
+
+
+def _prepare(filename, sizex, sizey):
+    """Resize and encode one image and return its ``source`` (see ``image_source``)."""
+    path = resolve(filename)
+    if path is None:
+        print(f"Warning: Image file not found: {filename}")
+        return None
+
+    data = encode(path,
+                  max_width=round(sizex * PAPER_WIDTH * PIXEL_RATIO),
+                  max_height=round(sizey * PAPER_HEIGHT * PIXEL_RATIO))
+    extension = "jpg" if FORMAT == "JPEG" else FORMAT.lower()
+
+    if MODE == "static":
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        name = f"{os.path.splitext(filename)[0]}-{round(sizex * 100)}x{round(sizey * 100)}.{extension}"
+        with open(os.path.join(STATIC_DIR, name), "wb") as out:
+            out.write(data)
+        return f"{STATIC_URL}/{name}"
+
+    return f"data:{MIME_TYPES[FORMAT]};base64,{base64.b64encode(data).decode()}"
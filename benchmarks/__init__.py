@@ -0,0 +1,6 @@
+"""
+benchmarks - Performance Benchmarks
+Scripts for timing the dashboard's data and chart code. Run from the repository root, e.g.:
+
+    python -m benchmarks.prevalence
+"""
@@ -0,0 +1,104 @@
+"""
+bitmaps.py - Bitmap Index Benchmark
+Module for timing bitmap AND + popcount queries against pandas boolean masks on enlarged datasets.
+
+The dataset is tiled up to each requested row count (or generated, with --synthetic) to stand in
+for multi-year BRFSS extracts.
+
+Usage:
+    python -m benchmarks.bitmaps [path/to/diabetes.csv] [--rows 1000000 5000000] [--repeat N]
+                                [--synthetic SEED]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from aggregation import group_rates
+from benchmarks.datasets import sized
+from bitmap import BitmapIndex
+
+H1_FACTORS = {"smoker": 1, "physactivity": 0, "fruits": 0, "veggies": 0}
+H5_CONDITIONS = ["highbp", "highchol", "heartdiseaseorattack", "stroke"]
+
+# Multi-factor filters: {column: value}
+FILTERS = [
+    {"smoker": 1, "physactivity": 0},
+    {"highbp": 1, "highchol": 1, "diffwalk": 1},
+    {"anyhealthcare": 0, "nodocbccost": 1, "fruits": 0, "veggies": 0},
+]
+
+
+def _best_of(fn, repeat):
+    """Return the fastest of ``repeat`` runs in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _with_without_masks(df):
+    """Original style: one pandas boolean mask per side of every factor and condition."""
+    for col, risk in [*H1_FACTORS.items(), *((c, 1) for c in H5_CONDITIONS)]:
+        for mask in (df[col] == risk, df[col] != risk):
+            df["diabetes_binary"][mask].mean()
+
+
+def _with_without_bitmaps(index):
+    for col in [*H1_FACTORS, *H5_CONDITIONS]:
+        index.counts([col])
+
+
+def _filters_masks(df):
+    for where in FILTERS:
+        mask = np.ones(len(df), dtype=bool)
+        for col, value in where.items():
+            mask &= (df[col] == value).to_numpy()
+        df["diabetes_binary"][mask].mean()
+
+
+def _filters_bitmaps(index):
+    for where in FILTERS:
+        index.counts([], where=where)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="diabetes.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic", type=int, metavar="SEED",
+                        help="use synthetic rows with this seed instead of tiling the CSV")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10}{'query':>16}{'masks ms':>11}{'bitmaps ms':>12}{'speedup':>9}")
+    for rows in args.rows:
+        df = sized(args.path, rows, args.synthetic)
+        start = time.perf_counter()
+        index = BitmapIndex(df)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # The bitmaps and the row scan must agree before they are timed
+        for where in FILTERS:
+            fast = group_rates(df, "stroke", where=where)
+            slow = group_rates(df, "stroke", where=where, use_cube=False)
+            assert (fast["cases"].to_numpy() == slow["cases"].to_numpy()).all()
+
+        for name, masks, bitmaps in [
+            ("with/without", lambda: _with_without_masks(df), lambda: _with_without_bitmaps(index)),
+            ("filters", lambda: _filters_masks(df), lambda: _filters_bitmaps(index)),
+        ]:
+            mask_ms = _best_of(masks, args.repeat)
+            bitmap_ms = _best_of(bitmaps, args.repeat)
+            print(f"{rows:>10,}{name:>16}{mask_ms:>11.2f}{bitmap_ms:>12.2f}{mask_ms / bitmap_ms:>8.1f}x")
+
+        column_bytes = sum(df[col].to_numpy().nbytes for col in index.ones)
+        print(f"{'':>10}{'index':>16}  {index.nbytes / 2**20:.1f} MiB vs {column_bytes / 2**20:.1f} MiB "
+              f"of uint8 columns, built in {build_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+charts.py - Chart Builder Benchmark
+Module for timing every chart builder at several dataset sizes and saving the results as JSON.
+
+For each size the dataset is enlarged or generated (see benchmarks/datasets.py), the per-dataset structures
+(features, cube, bitmaps) are built and timed once, and then every chart variant the dashboard
+can show (``warmup.chart_variants``, which covers every ``create_*`` builder) is measured:
+
+- wall time of the uncached builder, best of ``--repeat``
+- peak memory allocated during one build (tracemalloc, in a separate run)
+- size of the JSON the app sends
+
+Usage:
+    python -m benchmarks.charts [path/to/diabetes.csv] [--rows 70000 250000 1000000 5000000]
+                                [--repeat N] [--synthetic SEED] [--out results.json]
+                                [--baseline old.json]
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from benchmarks.datasets import sized
+from bitmap import get_bitmaps
+from cube import get_cube
+from features import get_features
+from payload import measure
+from warmup import chart_variants
+
+DEFAULT_ROWS = [70_000, 250_000, 1_000_000, 5_000_000]
+
+
+def _best_of(fn, repeat):
+    """Return the fastest of ``repeat`` runs in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _peak_kib(fn):
+    """Peak memory allocated by Python while running ``fn``, in KiB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def prepare(df):
+    """Build the per-dataset structures every chart reads from."""
+    get_features(df)
+    get_cube(df)
+    get_bitmaps(df)
+
+
+def run_size(df, repeat):
+    """
+    Measure the shared structures and every chart variant on one dataset.
+
+    Returns:
+    --------
+    dict
+        rows, prepare_ms, prepare_peak_kib and one entry per chart
+    """
+    start = time.perf_counter()
+    prepare(df)
+    prepare_ms = (time.perf_counter() - start) * 1000
+    # Peak memory of a fresh build, on a copy with its own fingerprint
+    fresh = df.copy(deep=False)
+    fresh.attrs["fingerprint"] = f"{df.attrs['fingerprint']}-peak"
+    prepare_peak_kib = _peak_kib(lambda: prepare(fresh))
+
+    charts = []
+    for label, builder, args, kwargs in chart_variants(df, client_side=True):
+        build = builder.__wrapped__   # bypass the figure cache
+        fig = build(*args, **kwargs)
+        charts.append({
+            "label": label,
+            "builder": f"{builder.__module__}.{builder.__name__}",
+            "kwargs": kwargs,
+            "ms": _best_of(lambda: build(*args, **kwargs), repeat),
+            "peak_kib": _peak_kib(lambda: build(*args, **kwargs)),
+            "bytes": measure(fig)[0],
+        })
+
+    return {"rows": len(df), "prepare_ms": prepare_ms, "prepare_peak_kib": prepare_peak_kib, "charts": charts}
+
+
+def print_size(result, baseline=None):
+    """Print one size's results, with the time ratio to a baseline run if given."""
+    print(f"\n{result['rows']:,} rows: shared structures built in {result['prepare_ms']:.0f} ms, "
+          f"peak {result['prepare_peak_kib'] / 1024:.1f} MiB")
+    before = {}
+    if baseline is not None:
+        for old in baseline["results"]:
+            if old["rows"] == result["rows"]:
+                before = {chart["label"]: chart for chart in old["charts"]}
+    header = f"{'chart':<40}{'ms':>9}{'peak KiB':>11}{'KiB':>8}"
+    print(header + (f"{'vs base':>9}" if before else ""))
+    for chart in result["charts"]:
+        line = f"{chart['label']:<40}{chart['ms']:>9.2f}{chart['peak_kib']:>11.0f}{chart['bytes'] / 1024:>8.1f}"
+        if chart["label"] in before:
+            line += f"{chart['ms'] / before[chart['label']]['ms']:>8.2f}x"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="diabetes.csv")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic", type=int, metavar="SEED",
+                        help="use synthetic rows with this seed instead of tiling the CSV")
+    parser.add_argument("--out", default="chart_benchmark.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier JSON results to compare times against")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = []
+    for rows in args.rows:
+        result = run_size(sized(args.path, rows, args.synthetic), args.repeat)
+        print_size(result, baseline)
+        results.append(result)
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "source": args.path if args.synthetic is None else f"synthetic seed {args.synthetic}",
+        "repeat": args.repeat,
+        "versions": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "plotly": plotly.__version__,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+datasets.py - Benchmark Datasets
+Module for building datasets of a given size for the benchmarks.
+
+A dataset is either the real CSV tiled up to the size (``tile``) or synthetic rows from
+synthetic_data.py (``synthetic``), which keep realistic variation at any size instead of
+repeating the same 70k rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+import synthetic_data
+from data_loader import COLUMN_DTYPES, load_dataset, standardize_columns
+
+
+def tile(df, rows):
+    """
+    Repeat the dataset's rows up to ``rows`` rows.
+
+    The result gets its own fingerprint, so the per-dataset caches (features,
+    cube, bitmaps, figures) treat every size as a separate dataset version.
+    """
+    reps = -(-rows // len(df))
+    frame = pd.DataFrame({col: np.tile(df[col].to_numpy(), reps)[:rows] for col in df.columns})
+    frame.attrs["fingerprint"] = f"{df.attrs.get('fingerprint')}x{rows}"
+    return frame
+
+
+def synthetic(rows, seed=0):
+    """
+    Generate ``rows`` synthetic rows, shaped like ``data_loader.load_dataset``'s frame.
+
+    Column names are standardised, dtypes are the loader's compact ones, and the
+    fingerprint names the seed and size.
+    """
+    frame = synthetic_data.generate(rows, seed)
+    frame.columns = standardize_columns(frame.columns)
+    frame = frame.astype({col: dtype for col, dtype in COLUMN_DTYPES.items() if col in frame})
+    frame.attrs["fingerprint"] = f"synthetic-{seed}x{rows}"
+    return frame
+
+
+def sized(path, rows, seed=None):
+    """The CSV at ``path`` tiled to ``rows`` rows, or synthetic rows if a ``seed`` is given."""
+    if seed is not None:
+        return synthetic(rows, seed)
+    return tile(load_dataset(path), rows)
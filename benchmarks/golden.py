@@ -0,0 +1,369 @@
+"""
+golden.py - Golden Output Check
+Module for checking that every aggregation engine draws the same charts.
+
+Every chart variant the dashboard can show (``warmup.chart_variants``) is built once per
+engine in ``aggregation.ENGINES`` and the data arrays of its traces (x, y, z, customdata) are
+compared, with a tolerance for floats and exactly for labels:
+
+- ``pandas``: the groupby reference implementation, the numbers the charts showed before the
+  engine was introduced
+- ``scan``: the np.bincount row scan
+- ``auto``: the contingency cube and bitmap index, falling back to the scan
+
+The figures are taken straight from the builders, before the figure cache. Each chart is checked
+on the real CSV and on synthetic and/or tiled datasets, so counts that only differ at scale show
+up too, for the whole dataset and for each cohort in ``COHORTS`` (see cohort.py).
+
+By default every engine is checked against ``BASELINE``, the arrays the original ``create_*``
+functions drew (baseline commit afae742, with pandas code inside each builder), so a regression
+the engines share (binning, labels, ordering) fails too. That file covers the whole
+CSV; cohorts, other datasets and charts added since (the client-side variants) are checked
+against the live reference engine. Charts whose traces were regrouped since (one trace per bar
+merged into one) match if they draw the same points in the same category order.
+
+``--save`` writes the reference engine's arrays to a JSON file, and ``--check`` compares
+against another such file, e.g. to keep today's numbers as the golden output while the engines
+change; ``--live`` only compares the engines with each other. ``--save-baseline`` regenerates
+``BASELINE`` from a checkout of the baseline commit (``git worktree add ../base afae742``).
+The exit status is 1 if anything differs.
+
+Usage:
+    python -m benchmarks.golden [path/to/diabetes.csv] [--synthetic 200000] [--seed N]
+                                [--tile 1000000] [--engines auto scan] [--reference pandas]
+                                [--rtol R] [--atol A]
+                                [--save golden.json | --check golden.json | --live |
+                                 --save-baseline ../base]
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import aggregation
+from benchmarks.datasets import synthetic, tile
+from cohort import cohort_size, describe, make_cohort, view
+from data_loader import load_dataset
+from warmup import chart_variants
+
+ATTRIBUTES = ["x", "y", "z", "customdata"]
+RTOL = 1e-9
+ATOL = 1e-12
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_baseline.json")
+
+# Whole dataset, then cohorts exercising bitmaps, value lists and the BMI range index
+COHORTS = [
+    make_cohort(),
+    make_cohort(age=(6, 11), sex=0, income=(1, 5)),
+    make_cohort(education=(4, 6), bmi=(25, 35)),
+]
+
+
+# ============================================================================
+# EXTRACTION
+# ============================================================================
+
+def extract(fig):
+    """
+    Data arrays of every trace in a figure.
+
+    Returns:
+    --------
+    dict
+        "trace <i> <attribute>" -> list (nested for 2D arrays), for each attribute a trace sets
+    """
+    arrays = {}
+    for i, trace in enumerate(fig.data):
+        for name in ATTRIBUTES:
+            values = trace[name] if name in trace else None
+            if values is None:
+                continue
+            arrays[f"trace {i} {name}"] = np.asarray(values).tolist()
+    return arrays
+
+
+def build(builder, args, kwargs, engine):
+    """Build one chart with the given aggregation engine, bypassing the figure cache."""
+    previous = aggregation.ENGINE
+    aggregation.ENGINE = engine
+    try:
+        return extract(builder.__wrapped__(*args, **kwargs))
+    finally:
+        aggregation.ENGINE = previous
+
+
+def _numbers(values):
+    """The values as a float array, or None if they aren't all numeric."""
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    return array
+
+
+def points(arrays):
+    """
+    The points an ``extract`` result draws, however they are split into traces.
+
+    Returns:
+    --------
+    tuple
+        (sorted list of (x, y) pairs, or (x, y, z) cells of 2D z arrays; the order in which
+        labels first appear along each axis)
+    """
+    traces = {}
+    for key, values in arrays.items():
+        _, index, name = key.split()
+        traces.setdefault(int(index), {})[name] = values
+    cells, order = [], {"x": [], "y": []}
+    for index in sorted(traces):
+        trace = traces[index]
+        x, y, z = trace.get("x"), trace.get("y"), trace.get("z")
+        for axis, values in (("x", x), ("y", y)):
+            if values is not None and _numbers(values) is None:
+                order[axis] += [value for value in values if value not in order[axis]]
+        if z is not None and z and isinstance(z[0], list):
+            cells += [(x[col] if x else col, y[row] if y else row, value)
+                      for row, values in enumerate(z) for col, value in enumerate(values)]
+        elif x is not None and y is not None:
+            cells += list(zip(x, y))
+    return sorted(cells, key=_sort_key), order
+
+
+def _sort_key(cell):
+    """Order cells by their labels, then numbers (NaN and None last)."""
+    key = []
+    for value in cell:
+        if isinstance(value, str):
+            key.append((0, value, 0.0))
+        elif value is None or (isinstance(value, float) and math.isnan(value)):
+            key.append((2, "", 0.0))
+        else:
+            key.append((1, "", float(value)))
+    return key
+
+
+def _same(want, got, rtol, atol):
+    """Whether two point coordinates match: numbers within tolerance, anything else exactly."""
+    want_numbers, got_numbers = _numbers([want]), _numbers([got])
+    if want_numbers is not None and got_numbers is not None:
+        return bool(np.allclose(got_numbers, want_numbers, rtol=rtol, atol=atol, equal_nan=True))
+    return want == got
+
+
+def compare_points(expected, actual, rtol=RTOL, atol=ATOL):
+    """
+    Compare the ``points`` of two ``extract`` results (the charts may group traces differently).
+
+    Returns:
+    --------
+    list of str
+        Differences (empty if both draw the same points in the same category order)
+    """
+    (want, want_order), (got, got_order) = points(expected), points(actual)
+    if not want and not got:
+        return ["no points to compare"]
+    problems = [f"{axis} order {got_order[axis]!r:.80} expected {want_order[axis]!r:.80}"
+                for axis in ("x", "y") if want_order[axis] != got_order[axis]]
+    if len(want) != len(got):
+        return problems + [f"{len(got)} points, expected {len(want)}"]
+    for want_cell, got_cell in zip(want, got):
+        if len(want_cell) != len(got_cell) or not all(_same(w, g, rtol, atol) for w, g in zip(want_cell, got_cell)):
+            problems.append(f"point {got_cell!r:.80} expected {want_cell!r:.80}")
+    return problems
+
+
+def compare(expected, actual, rtol=RTOL, atol=ATOL):
+    """
+    Compare two ``extract`` results.
+
+    If the arrays differ but both draw the same points (``compare_points``), e.g. because one
+    trace per bar was merged into one trace or hover-only customdata changed, they match.
+
+    Returns:
+    --------
+    list of str
+        One message per differing array (empty if they match)
+    """
+    problems = _compare_arrays(expected, actual, rtol, atol)
+    if not problems:
+        return problems
+    point_problems = compare_points(expected, actual, rtol, atol)
+    if not point_problems:
+        return []
+    # Arrays of differently grouped traces can't be matched up, the points can
+    return problems if expected.keys() == actual.keys() else point_problems
+
+
+def _compare_arrays(expected, actual, rtol, atol):
+    """``compare`` trace by trace and array by array."""
+    problems = [f"{key}: missing" for key in expected if key not in actual]
+    problems += [f"{key}: unexpected" for key in actual if key not in expected]
+    for key in expected.keys() & actual.keys():
+        want, got = expected[key], actual[key]
+        want_numbers, got_numbers = _numbers(want), _numbers(got)
+        if want_numbers is not None and got_numbers is not None:
+            if want_numbers.shape != got_numbers.shape:
+                problems.append(f"{key}: shape {got_numbers.shape}, expected {want_numbers.shape}")
+            elif not np.allclose(got_numbers, want_numbers, rtol=rtol, atol=atol, equal_nan=True):
+                with np.errstate(invalid="ignore"):
+                    error = np.nanmax(np.abs(got_numbers - want_numbers))
+                problems.append(f"{key}: max abs difference {error:.3g}")
+        elif np.asarray(want, dtype=object).tolist() != np.asarray(got, dtype=object).tolist():
+            problems.append(f"{key}: labels differ, got {got!r:.80} expected {want!r:.80}")
+    return sorted(problems)
+
+
+# ============================================================================
+# RUN
+# ============================================================================
+
+def datasets(args):
+    """(name, DataFrame) for every cohort of the CSV and of every requested synthetic / tiled size."""
+    df = load_dataset(args.path)
+    sources = [(args.path, df)]
+    sources += [(f"synthetic seed {args.seed} x{rows}", synthetic(rows, args.seed)) for rows in args.synthetic]
+    sources += [(f"{args.path} tiled x{rows}", tile(df, rows)) for rows in args.tile]
+    for name, source in sources:
+        for cohort in COHORTS:
+            yield f"{name}, {describe(cohort) or 'everyone'}", view(source, cohort)
+
+
+def run(df, engines, reference, golden, rtol, atol):
+    """
+    Build every chart variant on one dataset with each engine and compare it to the reference.
+
+    Parameters:
+    -----------
+    golden : dict or None
+        Saved reference arrays per chart label; charts it doesn't hold (or all, if None) are
+        built live with ``reference``
+
+    Returns:
+    --------
+    tuple
+        (reference arrays per chart label, number of charts checked against ``golden``,
+        list of (label, engine, problems))
+    """
+    saved = {}
+    from_golden = 0
+    failures = []
+    for label, builder, args, kwargs in chart_variants(df, client_side=True):
+        live = golden is None or label not in golden
+        expected = build(builder, args, kwargs, reference) if live else golden[label]
+        from_golden += not live
+        saved[label] = expected
+        for engine in engines:
+            if live and engine == reference:
+                continue
+            problems = compare(expected, build(builder, args, kwargs, engine), rtol, atol)
+            if problems:
+                failures.append((label, engine, problems))
+    return saved, from_golden, failures
+
+
+# Run in a checkout of the baseline commit: load the CSV the way its app.py did and write the
+# arrays of the listed charts, as ``extract`` does, to the file named by the first argument
+BASELINE_SCRIPT = """
+import json, sys
+import numpy as np
+import pandas as pd
+variants, path, attributes = json.load(sys.stdin)
+df = pd.read_csv(path)
+df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_')
+arrays = {}
+for label, module, name, takes_df, kwargs in variants:
+    fig = getattr(__import__(module), name)(*([df] if takes_df else []), **kwargs)
+    arrays[label] = {f"trace {i} {attribute}": np.asarray(trace[attribute]).tolist()
+                     for i, trace in enumerate(fig.data) for attribute in attributes
+                     if attribute in trace and trace[attribute] is not None}
+with open(sys.argv[1], "w") as out:
+    json.dump(arrays, out)
+"""
+
+
+def save_baseline(tree, path, out=BASELINE):
+    """
+    Write the arrays the baseline builders draw on the CSV, in a subprocess run in ``tree``.
+
+    Parameters:
+    -----------
+    tree : str
+        Checkout of the baseline commit
+    path : str
+        The CSV; the file is keyed like ``datasets`` names its whole-dataset entry
+    """
+    df = load_dataset(path)
+    variants = [(label, builder.__module__, builder.__name__, bool(args), kwargs)
+                for label, builder, args, kwargs in chart_variants(df, client_side=False)]
+    subprocess.run([sys.executable, "-c", BASELINE_SCRIPT, os.path.abspath(out)], cwd=tree, check=True,
+                   input=json.dumps([variants, os.path.abspath(path), ATTRIBUTES]), text=True)
+    with open(out) as f:
+        arrays = json.load(f)
+    with open(out, "w") as f:
+        json.dump({f"{path}, {describe(make_cohort()) or 'everyone'}": arrays}, f)
+    print(f"Baseline arrays of {len(arrays)} charts written to {out}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="diabetes.csv")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[200_000], metavar="ROWS",
+                        help="synthetic dataset sizes to check as well")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic datasets")
+    parser.add_argument("--tile", type=int, nargs="*", default=[], metavar="ROWS",
+                        help="sizes to tile the CSV to and check as well")
+    parser.add_argument("--engines", nargs="+", choices=aggregation.ENGINES, default=aggregation.ENGINES)
+    parser.add_argument("--reference", choices=aggregation.ENGINES, default="pandas",
+                        help="engine whose output the others must match where no golden file covers a chart")
+    parser.add_argument("--rtol", type=float, default=RTOL)
+    parser.add_argument("--atol", type=float, default=ATOL)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--save", metavar="JSON", help="write the reference arrays to this file")
+    group.add_argument("--check", metavar="JSON", default=BASELINE,
+                       help="compare every engine against this file (default: the baseline's arrays)")
+    group.add_argument("--live", action="store_true", help="only compare the engines with the reference")
+    group.add_argument("--save-baseline", metavar="TREE",
+                       help="regenerate the baseline file from a checkout of the baseline commit, then check")
+    args = parser.parse_args(argv)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, args.path)
+    golden = {}
+    if not (args.save or args.live):
+        with open(args.check) as f:
+            golden = json.load(f)
+
+    saved = {}
+    failed = 0
+    for name, df in datasets(args):
+        saved[name], from_golden, failures = run(df, args.engines, args.reference, golden.get(name),
+                                                 args.rtol, args.atol)
+        charts = len(saved[name])
+        against = f"against {args.reference}"
+        if from_golden:
+            against = f"{from_golden} against {os.path.basename(args.check)}" + \
+                      (f", the rest {against}" if from_golden < charts else "")
+        print(f"{name} ({cohort_size(df):,} rows): {charts} charts ({against}), "
+              f"{'all engines match' if not failures else f'{len(failures)} mismatches'}")
+        for label, engine, problems in failures:
+            print(f"  {label} [{engine}]")
+            for problem in problems:
+                print(f"    {problem}")
+        failed += len(failures)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(saved, f)
+        print(f"Reference ({args.reference}) arrays written to {args.save}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+import_time.py - Import Time Benchmark
+Module for tracking how long the dashboard's modules take to import in a fresh interpreter.
+
+Each target is imported in its own ``python -X importtime`` subprocess, so nothing is cached
+between measurements, and the per-module report Python writes to stderr is parsed. app.py
+imports only the shared modules up front and each page's chart module when the page is first
+shown (see ``PAGE_MODULES`` in app.py), so the rows below are the cold-start cost and the extra
+cost of opening each page for the first time. The startup row imports whatever app.py imports at
+module level, read from its source, so it stays in step with app.py.
+
+Usage:
+    python -m benchmarks.import_time [--repeat N] [--top N]
+"""
+
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PAGES = ["introduction", "hypothesis_h1", "hypothesis_h2", "hypothesis_h3", "hypothesis_h4",
+         "hypothesis_h5", "conclusion"]
+
+
+def app_imports(path=APP):
+    """
+    Modules app.py imports at module level, in order (the page modules are imported lazily).
+
+    Returns:
+    --------
+    list of str
+        Module names as written in the ``import`` / ``from ... import`` statements
+    """
+    modules = []
+    for node in ast.parse(open(path).read(), path).body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if name not in modules]
+    return modules
+
+
+STARTUP = app_imports()
+
+# (label, modules imported together)
+TARGETS = [
+    ("startup (app.py before any page)", STARTUP),
+    ("page: Introduction", ["introduction"]),
+    ("page: H1", ["hypothesis_h1"]),
+    ("page: H2", ["hypothesis_h2"]),
+    ("page: H3", ["hypothesis_h3"]),
+    ("page: H4", ["hypothesis_h4"]),
+    ("page: H5", ["hypothesis_h5"]),
+    ("page: Conclusion", ["conclusion"]),
+    ("all pages (eager imports)", STARTUP + PAGES),
+]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(modules, baseline=()):
+    """
+    Import ``modules`` in a fresh interpreter with ``-X importtime``.
+
+    Parameters:
+    -----------
+    modules : list of str
+        Modules to import, in order
+    baseline : list of str
+        Modules imported first and left out of the result (e.g. what app.py
+        has already loaded before a page is opened)
+
+    Returns:
+    --------
+    dict
+        Module name -> (self µs, cumulative µs, depth) for every module the import loaded;
+        depth 0 is a module imported by the code itself rather than by another module
+    """
+    code = "; ".join([f"import {name}" for name in baseline]
+                     + ["import sys; sys.stderr.write('--- measured ---\\n')"]
+                     + [f"import {name}" for name in modules])
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    measured = result.stderr.split("--- measured ---\n", 1)[-1]
+    times = {}
+    for match in LINE.finditer(measured):
+        self_us, cumulative_us, indent, name = match.groups()
+        times[name] = (int(self_us), int(cumulative_us), (len(indent) - 1) // 2)
+    return times
+
+
+def total_ms(times, modules):
+    """
+    Wall import time of the requested modules in milliseconds.
+
+    Only top-level imports count: a requested module that another one already pulled in is
+    part of that module's cumulative time.
+    """
+    return sum(times[name][1] for name in modules if name in times and times[name][2] == 0) / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N fresh interpreters")
+    parser.add_argument("--top", type=int, default=5, help="slowest modules to list per target")
+    args = parser.parse_args(argv)
+
+    startup = STARTUP
+    print(f"best of {args.repeat}; pages are measured on top of the startup imports\n")
+    print(f"{'target':<36}{'ms':>9}{'modules':>9}   slowest (self ms)")
+    for label, modules in TARGETS:
+        baseline = startup if label.startswith("page:") else ()
+        runs = [import_times(modules, baseline) for _ in range(args.repeat)]
+        times = min(runs, key=lambda run: total_ms(run, modules))
+        slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        names = ", ".join(f"{name} {us / 1000:.0f}" for name, (us, _, _) in slowest)
+        print(f"{label:<36}{total_ms(times, modules):>9.1f}{len(times):>9}   {names}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""
+load_test.py - Concurrent Session Load Test
+Module for driving app.py with simulated users and measuring rerun latency, throughput and memory.
+
+The test starts app.py on a local ``streamlit run`` server (headless, on a free port) and connects
+one websocket client per simulated user, speaking the same protobuf messages as the browser:
+each rerun sends the user's widget values and waits for the script to finish. All sessions
+share the server process, its dataset, figure cache and warm-up, exactly as real visitors do.
+(``AppTest`` can't be used for this: it swaps Streamlit's global runtime on every run, so
+sessions on several threads break each other.)
+
+Every user runs a seeded random walk of reruns:
+
+- switch to another sidebar page
+- open another tab of the current page
+- pick another option in the ``h1_demographic``, ``h3_income`` or ``h5_sort`` selectbox; like
+  the browser, this reruns only the selectbox's fragment (if the selectbox's tab isn't open,
+  the action opens it instead and counts as a tab action)
+
+For each number of users the report gives throughput (reruns per second), p50/p95/p99 rerun
+latency, errors and the server's resident memory before, at the peak and after. By default the
+server is started once and its figure cache warmed before the first level, like a server that
+has finished starting; --cold starts a fresh server for every level instead. Run it on two
+commits to see what a caching change buys.
+
+Usage:
+    pip install -r benchmarks/requirements.txt   # the websocket client (websockets)
+    python -m benchmarks.load_test [--users 1 4 8] [--actions N] [--seed N] [--think MS]
+                                   [--synthetic ROWS] [--cold] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+import synthetic_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+TIMEOUT = 120
+STARTUP_TIMEOUT = 60
+
+# Selectboxes and the tabs (key, index) they are shown in
+SELECTBOXES = {
+    "h1_demographic": ("h1_tabs", 2),
+    "h3_income": ("h3_tabs", 0),
+    "h5_sort": ("h5_tabs", 0),
+}
+
+ACTION_WEIGHTS = {"page": 3, "tab": 4, "select": 3}
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """
+    app.py on a local headless Streamlit server.
+
+    Parameters:
+    -----------
+    workdir : str
+        Working directory of the server (where app.py finds diabetes.csv)
+    """
+
+    def __init__(self, workdir):
+        self.port = free_port()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", APP,
+             "--server.headless", "true", "--server.port", str(self.port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1)
+                break
+            except OSError:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("Streamlit server did not start")
+                time.sleep(0.2)
+
+    @property
+    def url(self):
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def rss_mib(self):
+        """Resident memory of the server process in MiB."""
+        try:
+            with open(f"/proc/{self.process.pid}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+        except OSError:
+            out = subprocess.run(["ps", "-o", "rss=", "-p", str(self.process.pid)],
+                                 capture_output=True, text=True).stdout
+            return int(out or 0) / 1024
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class RssSampler:
+    """Background thread recording the server's peak RSS while a load level runs."""
+
+    def __init__(self, server, interval=0.05):
+        self.server = server
+        self.interval = interval
+        self.peak = server.rss_mib()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.server.rss_mib())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.server.rss_mib())
+
+
+# ============================================================================
+# SIMULATED USER
+# ============================================================================
+
+class Session:
+    """
+    One browser tab: a websocket session and the values of the widgets it last saw.
+
+    Widgets are named by their key (``h1_demographic``, ``h1_tabs``, ...); the sidebar page
+    radio, which has no key, is named ``page``. ``widgets`` maps each name to its element id,
+    options (tab labels for tabs), default value and the id of the fragment it is drawn in.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.widgets = {}
+        self.values = {}      # element id -> chosen value
+        self.progress = False
+        self.errors = []
+
+    def set(self, name, value):
+        self.values[self.widgets[name]["id"]] = value
+
+    def value(self, name):
+        widget = self.widgets[name]
+        return self.values.get(widget["id"], widget["default"])
+
+    def rerun(self, fragment_id=None):
+        """
+        Run the script, or only one fragment of it, with the current widget values and wait
+        for it to finish.
+
+        Parameters:
+        -----------
+        fragment_id : str, optional
+            Rerun just this fragment, as the browser does when a widget inside it changes
+
+        Returns:
+        --------
+        float
+            Seconds from the request to the script_finished message
+        """
+        message = BackMsg()
+        message.rerun_script.widget_states.SetInParent()
+        if fragment_id:
+            message.rerun_script.fragment_id = fragment_id
+        for element_id, value in self.values.items():
+            message.rerun_script.widget_states.widgets.append(WidgetState(id=element_id, string_value=value))
+
+        start = time.perf_counter()
+        self.connection.send(message.SerializeToString())
+        messages = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.connection.recv(timeout=TIMEOUT))
+            messages.append(forward)
+            if forward.WhichOneof("type") == "script_finished":
+                break
+        seconds = time.perf_counter() - start
+        self._read(messages, fragment_id)
+        return seconds
+
+    def _read(self, messages, fragment_id=None):
+        """Collect the widgets, exceptions and progress bars a script (or fragment) run produced."""
+        # A fragment run only redraws the fragment; the rest of the page keeps its widgets
+        widgets = dict(self.widgets) if fragment_id else {}
+        tabs, self.errors, self.progress = {}, [], False
+        for forward in messages:
+            if forward.WhichOneof("type") != "delta":
+                continue
+            path = tuple(forward.metadata.delta_path)
+            delta = forward.delta
+            if delta.WhichOneof("type") == "new_element":
+                element = delta.new_element
+                kind = element.WhichOneof("type")
+                if kind in ("radio", "selectbox"):
+                    proto = getattr(element, kind)
+                    name = proto.id.rsplit("-", 1)[-1]
+                    options = list(proto.options)
+                    widgets["page" if name == "None" else name] = {
+                        "id": proto.id, "options": options,
+                        "default": options[proto.default] if options else None,
+                        "fragment": delta.fragment_id or None,
+                    }
+                elif kind == "exception":
+                    self.errors.append(element.exception.message)
+                elif kind == "progress":
+                    self.progress = True
+            elif delta.WhichOneof("type") == "add_block":
+                block = delta.add_block
+                if block.WhichOneof("type") == "tab_container":
+                    tabs[path] = {"id": block.tab_container.id, "options": [],
+                                  "index": block.tab_container.default_tab_index}
+                elif block.WhichOneof("type") == "tab" and path[:-1] in tabs:
+                    tabs[path[:-1]]["options"].append(block.tab.label)
+        for tab in tabs.values():
+            tab["default"] = tab["options"][tab["index"]] if tab["options"] else None
+            widgets[tab["id"].rsplit("-", 1)[-1]] = tab
+
+        if fragment_id:
+            self.widgets = widgets
+            return
+        # Like the browser, only send the values of widgets that are still shown
+        shown = {widget["id"] for widget in widgets.values()}
+        self.values = {element_id: value for element_id, value in self.values.items() if element_id in shown}
+        self.widgets = widgets
+
+
+def open_connection(url):
+    """Connect to the server's websocket the way the browser does (use as a context manager)."""
+    return connect(url, subprotocols=["streamlit"], max_size=None, open_timeout=TIMEOUT)
+
+
+def next_action(rng, session):
+    """
+    Change one widget value at random (without running the script).
+
+    Returns:
+    --------
+    tuple
+        (kind, fragment id): kind is page, tab or select; a select action reruns only the
+        fragment holding the selectbox, the others the whole script (fragment id None)
+    """
+    tabs = next((name for name in session.widgets if name.endswith("_tabs")), None)
+    selectboxes = [name for name, (key, _) in SELECTBOXES.items() if key == tabs]
+    kinds = [kind for kind in ACTION_WEIGHTS
+             if kind == "page" or (kind == "tab" and tabs) or (kind == "select" and selectboxes)]
+    kind = rng.choices(kinds, weights=[ACTION_WEIGHTS[kind] for kind in kinds])[0]
+
+    if kind == "page":
+        page = session.value("page")
+        session.set("page", rng.choice([option for option in session.widgets["page"]["options"] if option != page]))
+    elif kind == "tab":
+        session.set(tabs, rng.choice(session.widgets[tabs]["options"]))
+    else:
+        name = rng.choice(selectboxes)
+        key, index = SELECTBOXES[name]
+        tab = session.widgets[key]["options"][index]
+        if name not in session.widgets or session.value(key) != tab:
+            # The selectbox isn't on screen: open its tab first (a full rerun)
+            session.set(key, tab)
+            return "tab", None
+        session.set(name, rng.choice(session.widgets[name]["options"]))
+        return kind, session.widgets[name]["fragment"]
+    return kind, None
+
+
+def simulate_user(url, user, actions, seed, think, latencies, errors):
+    """
+    Run one user's random walk, appending (kind, seconds) per rerun to ``latencies``.
+    """
+    rng = random.Random(f"{seed}-{user}")
+    kind = "connect"
+    try:
+        with open_connection(url) as connection:
+            session = Session(connection)
+            for step in range(actions + 1):
+                kind, fragment_id = next_action(rng, session) if step else ("start", None)
+                latencies.append((kind, session.rerun(fragment_id)))
+                errors.extend(f"user {user} {kind}: {error}" for error in session.errors)
+                if think:
+                    time.sleep(rng.expovariate(1000 / think))
+    except Exception as exc:   # a timeout or dropped connection ends this user's walk
+        errors.append(f"user {user} {kind}: {exc!r}")
+
+
+# ============================================================================
+# LOAD LEVELS
+# ============================================================================
+
+def prime(server):
+    """Open one session and rerun it until the figure cache warm-up has finished."""
+    with open_connection(server.url) as connection:
+        session = Session(connection)
+        session.rerun()   # starts the warm-up when it finishes
+        session.rerun()
+        while session.progress:
+            time.sleep(0.25)
+            session.rerun()
+
+
+def run_level(server, users, actions, seed, think):
+    """
+    Run ``users`` simulated users concurrently against ``server``.
+
+    Returns:
+    --------
+    dict
+        users, reruns, errors, seconds, throughput, p50/p95/p99 latency (ms), server RSS (MiB)
+        and latency per kind of action
+    """
+    latencies, errors = [], []
+    rss_before = server.rss_mib()
+    threads = [threading.Thread(target=simulate_user,
+                                args=(server.url, user, actions, seed, think, latencies, errors))
+               for user in range(users)]
+    start = time.perf_counter()
+    with RssSampler(server) as sampler:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    seconds = time.perf_counter() - start
+
+    ms = np.array([latency for _, latency in latencies]) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (np.nan,) * 3
+    by_action = {}
+    for kind in sorted({kind for kind, _ in latencies}):
+        kind_ms = np.array([latency for k, latency in latencies if k == kind]) * 1000
+        by_action[kind] = {"reruns": len(kind_ms), "p50_ms": np.percentile(kind_ms, 50),
+                           "p95_ms": np.percentile(kind_ms, 95)}
+    return {
+        "users": users,
+        "reruns": len(latencies),
+        "errors": errors,
+        "seconds": seconds,
+        "throughput": len(latencies) / seconds,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "rss_before_mib": rss_before,
+        "rss_peak_mib": sampler.peak,
+        "rss_after_mib": server.rss_mib(),
+        "by_action": by_action,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--actions", type=int, default=20, help="reruns per user after the first page load")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--think", type=float, default=0, help="mean pause between a user's actions, in ms")
+    parser.add_argument("--synthetic", type=int, metavar="ROWS",
+                        help="serve synthetic data with this many rows instead of ./diabetes.csv")
+    parser.add_argument("--cold", action="store_true",
+                        help="start a fresh server (cold caches) for every level instead of warming one")
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    workdir = os.getcwd()
+    if args.synthetic:
+        workdir = tempfile.mkdtemp(prefix="load-test-")
+        synthetic_data.write_csv(os.path.join(workdir, "diabetes.csv"), args.synthetic, args.seed)
+        print(f"Serving {args.synthetic:,} synthetic rows from {workdir}")
+
+    server = None
+    results = []
+    try:
+        if not args.cold:
+            start = time.perf_counter()
+            server = Server(workdir)
+            prime(server)
+            print(f"Server started and figure cache warmed in {time.perf_counter() - start:.1f} s\n")
+
+        print(f"{'users':>6}{'reruns':>8}{'errors':>8}{'rerun/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'RSS MiB':>9}{'peak':>7}{'after':>7}")
+        for users in args.users:
+            if args.cold:
+                if server is not None:
+                    server.stop()
+                server = Server(workdir)
+            result = run_level(server, users, args.actions, args.seed, args.think)
+            results.append(result)
+            print(f"{users:>6}{result['reruns']:>8}{len(result['errors']):>8}{result['throughput']:>9.1f}"
+                  f"{result['p50_ms']:>9.0f}{result['p95_ms']:>9.0f}{result['p99_ms']:>9.0f}"
+                  f"{result['rss_before_mib']:>9.0f}{result['rss_peak_mib']:>7.0f}{result['rss_after_mib']:>7.0f}")
+            for error in result["errors"][:3]:
+                print(f"        {error}")
+    finally:
+        if server is not None:
+            server.stop()
+        if args.synthetic:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
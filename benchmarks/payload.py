@@ -0,0 +1,77 @@
+"""
+payload.py - Figure Payload Benchmark
+Module for measuring how large every chart is once serialized for the browser, and how long the
+serialization takes (see the top-level payload.py).
+
+Each figure is sent to the browser as JSON on every rerun that renders it, and every trace repeats
+its marker, hover template and layout references. The check fails (exit status 1) if a chart
+draws bars one trace per bar, which multiplies that overhead by the number of bars, or if a
+figure is larger than the byte budget.
+
+Usage:
+    python -m benchmarks.payload [path/to/diabetes.csv] [--repeat N] [--budget KIB]
+"""
+
+import argparse
+import sys
+import time
+
+import payload
+from data_loader import load_dataset
+from payload import measure
+from warmup import chart_variants
+
+
+def _best_of(fn, repeat):
+    """Return the fastest of ``repeat`` runs in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def single_bar_traces(fig):
+    """Number of bar traces holding a single bar (0 or 1 is fine, more means one trace per bar)."""
+    count = sum(1 for trace in fig.data if trace.type == "bar" and trace.x is not None and len(trace.x) == 1)
+    return count if count > 1 else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="diabetes.csv")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=payload.BUDGET_BYTES / 1024,
+                        help="largest acceptable figure size in KiB")
+    args = parser.parse_args(argv)
+
+    budget = args.budget * 1024
+    df = load_dataset(args.path)
+    print(f"budget {args.budget:.0f} KiB per chart\n")
+    print(f"{'chart':<40}{'traces':>7}{'KiB':>9}{'ms':>8}")
+
+    failures = []
+    totals = [0, 0.0]
+    for label, builder, builder_args, kwargs in chart_variants(df, client_side=True):
+        fig = builder.__wrapped__(*builder_args, **kwargs)   # uncached, fresh figure
+        row = [measure(fig)[0], _best_of(fig.to_json, args.repeat)]
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f"{label:<40}{len(fig.data):>7}{row[0] / 1024:>9.1f}{row[1]:>8.2f}")
+
+        if single_bar_traces(fig):
+            failures.append(f"{label}: {single_bar_traces(fig)} single-bar traces")
+        if row[0] > budget:
+            failures.append(f"{label}: {row[0] / 1024:.1f} KiB over the {args.budget:.0f} KiB budget")
+
+    print(f"{'total':<40}{'':>7}{totals[0] / 1024:>9.1f}{totals[1]:>8.2f}")
+
+    if failures:
+        print("\nFailed:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+prevalence.py - Prevalence Engine Benchmark
+Module for timing aggregation.group_rates (row scan and contingency cube) against the per-chart
+pandas code it replaced.
+
+Usage:
+    python -m benchmarks.prevalence [path/to/diabetes.csv] [--repeat N]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from aggregation import group_rates, group_rates_pandas, wilson_interval
+from cube import get_cube
+from data_loader import load_dataset
+from features import get_features
+
+# (grouping keys, outcome) pairs used by the hypothesis charts
+QUERIES = [
+    (["smoker"], "diabetes_binary"),
+    (["risk_behaviors"], "diabetes_binary"),
+    (["age_group_h1", "physactivity_label"], "diabetes_binary"),
+    (["education_group"], "healthy_diet"),
+    (["education_label", "income_band"], "diabetes_binary"),
+    (["income_label", "anyhealthcare"], "diabetes_binary"),
+    (["barriers_count"], "diabetes_binary"),
+    (["genhlth"], "menthlth"),
+    (["limitation_count"], "diabetes_binary"),
+    (["age_group", "conditions_binary"], "diabetes_binary"),
+    (["bmi_class"], "diabetes_binary"),
+]
+
+H1_FACTORS = {"smoker": 1, "physactivity": 0, "fruits": 0, "veggies": 0}
+
+
+def _best_of(fn, repeat):
+    """Return the fastest of ``repeat`` runs in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _row_stats_filters(df):
+    """The original hypothesis_h1 code: two boolean filters and scalar Wilson per factor."""
+    for col, risk_value in H1_FACTORS.items():
+        for mask in (df[col] == risk_value, df[col] != risk_value):
+            a = df["diabetes_binary"][mask]
+            wilson_interval(a.sum(), a.count())
+
+
+def _row_stats_engine(df, use_cube):
+    for col in H1_FACTORS:
+        group_rates(df, col, use_cube=use_cube)
+
+
+def _check(df, by, outcome):
+    """Make sure all implementations agree before timing them."""
+    ref = group_rates_pandas(df, by, outcome)
+    for use_cube in (False, True):
+        fast = group_rates(df, by, outcome, use_cube=use_cube)
+        for column in ["n", "cases", "rate", "lo", "hi"]:
+            np.testing.assert_allclose(fast[column].to_numpy(float), ref[column].to_numpy(float), rtol=1e-9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="diabetes.csv")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    df = load_dataset(args.path)
+    # Derived columns and the cube are built once per dataset, keep them out of the timings
+    get_features(df)
+    start = time.perf_counter()
+    cube = get_cube(df)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(df):,} rows, best of {args.repeat}")
+    print(f"cube: {len(cube.cuboids)} cuboids, {cube.nbytes / 1024:.0f} KiB, built in {build_ms:.1f} ms\n")
+    print(f"{'query':<54}{'pandas ms':>11}{'scan ms':>10}{'cube ms':>10}{'speedup':>9}")
+
+    totals = [0.0, 0.0, 0.0]
+    rows = [(f"h1 row_stats x{len(H1_FACTORS)}",
+             lambda: _row_stats_filters(df),
+             lambda: _row_stats_engine(df, use_cube=False),
+             lambda: _row_stats_engine(df, use_cube=True))]
+    for by, outcome in QUERIES:
+        _check(df, by, outcome)
+        rows.append((
+            f"{' x '.join(by)} -> {outcome}",
+            lambda by=by, outcome=outcome: group_rates_pandas(df, by, outcome),
+            lambda by=by, outcome=outcome: group_rates(df, by, outcome, use_cube=False),
+            lambda by=by, outcome=outcome: group_rates(df, by, outcome, use_cube=True),
+        ))
+
+    for name, *variants in rows:
+        times = [_best_of(fn, args.repeat) for fn in variants]
+        totals = [total + ms for total, ms in zip(totals, times)]
+        print(f"{name:<54}{times[0]:>11.2f}{times[1]:>10.2f}{times[2]:>10.2f}{times[0] / times[2]:>8.1f}x")
+
+    print(f"{'total':<54}{totals[0]:>11.2f}{totals[1]:>10.2f}{totals[2]:>10.2f}{totals[0] / totals[2]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+bitmap.py - Bitmap Index
+Module for storing the 0/1 health indicators as bit-packed bitmaps.
+
+Each indicator (and diabetes itself) is kept as one bit per row, packed into 64-bit words, so the
+index is 8x smaller than the uint8 columns. A "with vs without" rate is an AND plus a popcount,
+and a filter such as smokers without physical activity is a bitwise expression over the words,
+with no pandas boolean masks per query. The index is built once per dataset version.
+
+The cohort dimensions (see cohort.py) are indexed too: small integer codes (age, sex, income,
+education) get one bitmap per value, and continuous columns (BMI) keep their rows sorted by
+value, so a range is a slice of row indices. A cohort is then an AND of ORs of bitmaps.
+Small integer outcomes (days of poor health) are stored bit-sliced, one bitmap per binary
+digit, so their sums within a selection are popcounts as well.
+"""
+
+import threading
+
+import numpy as np
+
+from cube import INDICATORS, OUTCOME, column, has_column, key_codes
+
+BITMAP_COLUMNS = INDICATORS + [OUTCOME]
+VALUE_COLUMNS = ["age", "sex", "income", "education"]   # one bitmap per value
+RANGE_COLUMNS = ["bmi"]                                   # rows sorted by value
+MAX_VALUES = 32
+MAX_SLICES = 8   # small non-negative integer outcomes (e.g. 0-30 days) are bit-sliced
+
+_CACHE_SIZE = 4
+_CACHE = {}
+_LOCK = threading.Lock()
+
+_SELECTIONS_CACHE_SIZE = 16
+_ROWS = {}   # (fingerprint, rows, conditions) -> selected row indices
+
+
+# ============================================================================
+# CONDITIONS
+# ============================================================================
+
+class Between:
+    """
+    ``where`` condition matching ``lo <= value <= hi``.
+
+    Hashable, so conditions built from it can be part of a figure cache key.
+    """
+
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.hi = hi
+
+    def __eq__(self, other):
+        return isinstance(other, Between) and (self.lo, self.hi) == (other.lo, other.hi)
+
+    def __hash__(self):
+        return hash((Between, self.lo, self.hi))
+
+    def __repr__(self):
+        return f"Between({self.lo!r}, {self.hi!r})"
+
+
+def conditions(where):
+    """``where`` as a list of (column, condition) pairs; accepts a dict, pairs or None."""
+    if not where:
+        return []
+    return list(where.items()) if isinstance(where, dict) else list(where)
+
+
+def conditions_key(pairs):
+    """Hashable form of (column, condition) pairs for cache keys, or None if a condition isn't hashable."""
+    key = tuple((col, tuple(condition) if isinstance(condition, (list, set)) else condition)
+                for col, condition in pairs)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def condition_mask(series, condition):
+    """Boolean row mask of one condition (a value, a list of values or a ``Between``)."""
+    if isinstance(condition, Between):
+        return series.between(condition.lo, condition.hi).to_numpy()
+    values = condition if isinstance(condition, (list, tuple, set)) else [condition]
+    return series.isin(values).to_numpy()
+
+
+# ============================================================================
+# PACKED BITS
+# ============================================================================
+
+def pack(mask):
+    """Pack a boolean array into uint64 words (bit i of the result is row i)."""
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view(np.uint64)
+
+
+def unpack(words, rows):
+    """Inverse of ``pack``: a boolean array with one entry per row."""
+    return np.unpackbits(words.view(np.uint8), count=rows, bitorder="little").view(bool)
+
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        """Number of set bits."""
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+else:  # numpy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Number of set bits."""
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class BitmapIndex:
+    """
+    Bit-packed 0/1 columns of one dataset version.
+
+    ``ones[col]`` marks rows where the column is 1 and ``known[col]`` rows where
+    it is 0 or 1 (the same object as ``all`` when nothing is missing). Columns
+    holding any other value are left out of the index.
+
+    ``values[col]`` maps each value of a coded column to its bitmap, and
+    ``order[col]`` / ``sorted[col]`` hold a continuous column's row indices
+    sorted by value and the sorted values (NaN last). ``slices[col]`` holds
+    bit k of a small non-negative integer column in entry k. Other coded keys
+    and outcomes are added on first use by ``extend``.
+    """
+
+    def __init__(self, df, columns=BITMAP_COLUMNS, value_columns=VALUE_COLUMNS, range_columns=RANGE_COLUMNS):
+        self.rows = len(df)
+        self.all = pack(np.ones(self.rows, dtype=bool))
+        self.ones = {}
+        self.known = {}
+        self.labels = {}
+        self.floats = set()
+        self.values = {}
+        self.order = {}
+        self.sorted = {}
+        self.slices = {}
+        self.skipped = set()   # columns that can't be indexed
+        self._selections = {}   # conditions -> bitmap, for the most recent selections
+        self._lock = threading.Lock()
+        for col in columns:
+            self._add_binary(df, col)
+        for col in value_columns:
+            self._add_values(df, col)
+        for col in range_columns:
+            if not has_column(df, col):
+                continue
+            values = column(df, col).to_numpy()
+            order = np.argsort(values, kind="stable")
+            self.order[col] = order.astype(np.int32) if self.rows < 2**31 else order
+            self.sorted[col] = values[order]
+
+    def _add_binary(self, df, col):
+        """Index a column holding only 0, 1 and NaN as ``ones`` / ``known``."""
+        if not has_column(df, col):
+            return False
+        series = column(df, col)
+        values = series.to_numpy()
+        if values.dtype.kind not in "uifb":
+            return False
+        is_one = values == 1
+        known = is_one | (values == 0)
+        missing = np.isnan(values) if values.dtype.kind == "f" else np.zeros(self.rows, dtype=bool)
+        if not (known | missing).all():
+            return False
+        self.labels[col] = key_codes(series)[1]
+        if values.dtype.kind == "f":
+            self.floats.add(col)
+        self.known[col] = self.all if known.all() else pack(known)
+        self.ones[col] = pack(is_one)   # set last: ``ones`` is what queries check
+        return True
+
+    def _add_outcome(self, df, col):
+        """Index an outcome: 0/1 columns as ``ones``, small non-negative integers as ``slices``."""
+        if self._add_binary(df, col):
+            return True
+        if not has_column(df, col):
+            return False
+        values = column(df, col).to_numpy()
+        if values.dtype.kind not in "ui" or values.min(initial=0) < 0:
+            return False
+        digits = int(values.max(initial=0)).bit_length()
+        if digits > MAX_SLICES:
+            return False
+        self.known[col] = self.all
+        self.slices[col] = [pack((values >> k) & 1) for k in range(digits)]
+        return True
+
+    def _add_values(self, df, col):
+        """Index a coded column with one bitmap per value (up to ``MAX_VALUES`` values)."""
+        if not has_column(df, col):
+            return False
+        codes, labels = key_codes(column(df, col))
+        if len(labels) > MAX_VALUES:
+            return False
+        self.labels[col] = labels
+        self.values[col] = {label: pack(codes == i) for i, label in enumerate(labels)}
+        return True
+
+    def extend(self, df, by, outcome):
+        """
+        Index the keys and outcome of a query on first use, so filtered queries
+        over derived columns (age bands, income labels, ...) can use bitmaps too.
+
+        Parameters:
+        -----------
+        df : pandas.DataFrame
+            The dataset this index was built from
+        by : list of str
+            Grouping keys, indexed by value
+        outcome : str
+            Outcome column, indexed if it holds 0/1 or small non-negative integers
+        """
+        with self._lock:
+            for col, add in [*((key, self._add_values) for key in by), (outcome, self._add_outcome)]:
+                if col in self.ones or col in self.values or col in self.slices or col in self.skipped:
+                    continue
+                if not add(df, col):
+                    self.skipped.add(col)
+
+    @property
+    def nbytes(self):
+        return (self.all.nbytes + sum(bits.nbytes for bits in self.ones.values())
+                + sum(bits.nbytes for col, bits in self.known.items() if bits is not self.all)
+                + sum(bits.nbytes for by_value in self.values.values() for bits in by_value.values())
+                + sum(bits.nbytes for digits in self.slices.values() for bits in digits)
+                + sum(order.nbytes for order in self.order.values())
+                + sum(values.nbytes for values in self.sorted.values()))
+
+    def indexes(self, col):
+        """True if conditions on ``col`` can be evaluated from the index."""
+        return col in self.ones or col in self.values or col in self.order
+
+    def bounds(self, col):
+        """Smallest and largest non-missing value of a range column."""
+        values = self.sorted[col]
+        present = np.searchsorted(values, np.inf, side="right")
+        if present == 0:
+            return None, None
+        return values[0].item(), values[present - 1].item()
+
+    def bitmap(self, col, value):
+        """Rows where ``col == value`` (a coded column's value, or 0 or 1)."""
+        if col in self.values:
+            bits = self.values[col].get(value)
+            return bits if bits is not None else np.zeros_like(self.all)
+        if value == 1:
+            return self.ones[col]
+        if value == 0:
+            return self.known[col] & ~self.ones[col]
+        return np.zeros_like(self.all)
+
+    def between(self, col, lo, hi):
+        """Rows where ``lo <= col <= hi`` for a range column: a slice of its sorted row indices."""
+        values = self.sorted[col]
+        start = np.searchsorted(values, lo, side="left")
+        stop = np.searchsorted(values, hi, side="right")
+        mask = np.zeros(self.rows, dtype=bool)
+        mask[self.order[col][start:stop]] = True
+        return pack(mask)
+
+    def accepted(self, col, condition):
+        """Rows meeting one condition (a value, a list of values or a ``Between``)."""
+        if isinstance(condition, Between):
+            if col in self.order:
+                return self.between(col, condition.lo, condition.hi)
+            condition = [value for value in self.labels[col] if condition.lo <= value <= condition.hi]
+        values = condition if isinstance(condition, (list, tuple, set)) else [condition]
+        bits = np.zeros_like(self.all)
+        for value in values:
+            bits |= self.bitmap(col, value)
+        return bits
+
+    def select(self, where):
+        """
+        AND together the conditions of ``where``.
+
+        Parameters:
+        -----------
+        where : dict or list of tuple
+            {column: value, list of accepted values or ``Between``}, or
+            (column, condition) pairs
+
+        Returns:
+        --------
+        numpy.ndarray
+            Packed bitmap of the selected rows (shared, don't modify it)
+        """
+        pairs = conditions(where)
+        key = conditions_key(pairs)
+        bits = self._selections.get(key) if key is not None else None
+        if bits is not None:
+            return bits
+
+        bits = self.all
+        for col, condition in pairs:
+            bits = bits & self.accepted(col, condition)
+        if key is not None:
+            with self._lock:
+                if len(self._selections) >= _SELECTIONS_CACHE_SIZE:
+                    self._selections.pop(next(iter(self._selections)))   # drop the oldest selection
+                self._selections[key] = bits
+        return bits
+
+    def covers(self, by, outcome, where):
+        """True if the query can be answered from bitmaps alone."""
+        return (all(col in self.ones or col in self.values for col in by)
+                and (outcome in self.ones or outcome in self.slices)
+                and all(self.indexes(col) for col, _ in conditions(where)))
+
+    def _cells(self, bits, by, labels, cell=()):
+        """Yield (cell index, bitmap) for every combination of key values, ANDing each key once per prefix."""
+        if not by:
+            yield cell, bits
+            return
+        for i, label in enumerate(labels[0]):
+            yield from self._cells(bits & self.bitmap(by[0], label), by[1:], labels[1:], cell + (i,))
+
+    def counts(self, by, outcome=OUTCOME, where=None):
+        """
+        Count group sizes and cases (outcome sums) with AND + popcount.
+
+        Returns:
+        --------
+        tuple
+            (n, cases, labels) in the same form as ``aggregation.dense_counts``
+        """
+        selected = self.select(where or {}) & self.known[outcome]
+        labels = [self.labels[col] for col in by]
+        shape = tuple(len(key_labels) for key_labels in labels)
+        n = np.zeros(shape, dtype=np.int64)
+        cases = np.zeros(shape, dtype=np.int64)
+        for cell, bits in self._cells(selected, by, labels):
+            n[cell] = popcount(bits)
+            if outcome in self.ones:
+                cases[cell] = popcount(bits & self.ones[outcome])
+            else:
+                cases[cell] = sum(popcount(bits & digit) << k for k, digit in enumerate(self.slices[outcome]))
+        if outcome in self.floats:
+            cases = cases.astype(np.float64)   # a row scan sums float columns as floats
+        return n, cases, labels
+
+
+def get_bitmaps(df):
+    """
+    Return the bitmap index for a dataset, building it once per dataset version.
+
+    Frames without a ``df.attrs["fingerprint"]`` (see ``data_loader.load_dataset``)
+    get None.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The standardised diabetes dataset
+
+    Returns:
+    --------
+    BitmapIndex or None
+    """
+    fingerprint = df.attrs.get("fingerprint")
+    if fingerprint is None:
+        return None
+
+    key = (fingerprint, len(df))
+    with _LOCK:
+        index = _CACHE.get(key)
+        if index is None:
+            index = BitmapIndex(df)
+            if len(_CACHE) >= _CACHE_SIZE:
+                _CACHE.pop(next(iter(_CACHE)))   # drop the oldest dataset version
+            _CACHE[key] = index
+    return index
+
+
+def selection_mask(df, where):
+    """
+    Boolean row mask for ``where`` ({column: condition} or (column, condition) pairs).
+
+    Uses the bitmap index where it covers the columns and compares the
+    column values otherwise.
+    """
+    index = get_bitmaps(df)
+    pairs = conditions(where)
+    indexed = [(col, condition) for col, condition in pairs if index is not None and index.indexes(col)]
+    mask = unpack(index.select(indexed), len(df)) if indexed else np.ones(len(df), dtype=bool)
+    for col, condition in pairs:
+        if index is None or not index.indexes(col):
+            mask &= condition_mask(column(df, col), condition)
+    return mask
+
+
+def selected_rows(df, where):
+    """
+    Indices of the rows matching ``where``, kept for the most recent selections.
+
+    Row scans gather just these rows, so a filtered query costs time in
+    proportion to the selection rather than to the dataset.
+    """
+    pairs = conditions(where)
+    fingerprint = df.attrs.get("fingerprint")
+    selection = conditions_key(pairs)
+    key = None if fingerprint is None or selection is None else (fingerprint, len(df), selection)
+    with _LOCK:
+        rows = _ROWS.get(key) if key is not None else None
+    if rows is not None:
+        return rows
+
+    rows = np.flatnonzero(selection_mask(df, pairs))
+    if key is not None:
+        with _LOCK:
+            if len(_ROWS) >= _SELECTIONS_CACHE_SIZE:
+                _ROWS.pop(next(iter(_ROWS)))   # drop the oldest selection
+            _ROWS[key] = rows
+    return rows
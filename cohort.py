@@ -0,0 +1,130 @@
+"""
+cohort.py - Cohort Filters
+Module for restricting every hypothesis chart to a cohort, e.g. women aged 45-74 earning under $35k.
+
+A cohort is a tuple of (column, condition) pairs over the dataset's age, sex, income, education
+and BMI columns, ANDed together. ``view`` attaches it to a shallow copy of the dataset (no rows
+are copied) and every ``aggregation.group_rates`` call on that view counts only the cohort's rows:
+
+- the selection is an AND of precomputed bitmaps (see bitmap.py), never a pandas mask
+- queries the bitmaps cover are answered with AND + popcount
+- the rest scan only the selected rows, gathered by index (cached per cohort)
+
+The chart builders need no changes, and because the figure cache key includes the cohort, each
+cohort's figures are cached separately from the full dataset's.
+"""
+
+import numpy as np
+
+from bitmap import Between, conditions, get_bitmaps, popcount, selection_mask
+from features import EDUCATION_LABELS, INCOME_LABELS, SEX_LABELS
+
+ATTR = "cohort"
+
+# BRFSS age codes 1-13
+AGE_LABELS = ['18-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54',
+              '55-59', '60-64', '65-69', '70-74', '75-79', '80+']
+
+# Coded filters: column -> labels of codes 1, 2, ... (sex is coded 0/1)
+CODED_FILTERS = {
+    "age": AGE_LABELS,
+    "income": INCOME_LABELS,
+    "education": EDUCATION_LABELS,
+}
+
+
+def make_cohort(age=None, sex=None, income=None, education=None, bmi=None):
+    """
+    Build a cohort; dimensions left as None are not filtered.
+
+    Parameters:
+    -----------
+    age, income, education : tuple of int, optional
+        First and last code to include, e.g. age=(6, 11) for 45-74
+    sex : int, optional
+        0 for female, 1 for male (see ``features.SEX_LABELS``)
+    bmi : tuple of float, optional
+        Lowest and highest BMI to include
+
+    Returns:
+    --------
+    tuple
+        (column, condition) pairs, empty for the whole dataset
+    """
+    cohort = []
+    for col, value in [("age", age), ("sex", sex), ("income", income), ("education", education), ("bmi", bmi)]:
+        if value is None:
+            continue
+        cohort.append((col, Between(*value) if isinstance(value, tuple) else value))
+    return tuple(cohort)
+
+
+def code_range(labels, first, last):
+    """
+    Codes of a label range chosen with a range slider, or None if it spans every label.
+
+    Parameters:
+    -----------
+    labels : list of str
+        Labels of codes 1, 2, ... (e.g. ``AGE_LABELS``)
+    first, last : str
+        The labels at the ends of the range
+    """
+    lo, hi = labels.index(first) + 1, labels.index(last) + 1
+    if (lo, hi) == (1, len(labels)):
+        return None
+    return lo, hi
+
+
+def view(df, cohort):
+    """
+    The dataset restricted to a cohort, for passing to the chart builders.
+
+    Returns the dataset itself for an empty cohort. The view shares the
+    dataset's columns and fingerprint (and so its features, cube and bitmaps).
+    """
+    if not cohort:
+        return df
+    filtered = df.copy(deep=False)
+    filtered.attrs[ATTR] = tuple(cohort)
+    return filtered
+
+
+def active_conditions(df, where=None):
+    """
+    The conditions a query on ``df`` must apply: the view's cohort plus ``where``.
+
+    Returns:
+    --------
+    list of tuple
+        (column, condition) pairs
+    """
+    return conditions(df.attrs.get(ATTR)) + conditions(where)
+
+
+def cohort_size(df):
+    """Number of rows in the view's cohort (all rows for a plain dataset)."""
+    pairs = active_conditions(df)
+    if not pairs:
+        return len(df)
+    index = get_bitmaps(df)
+    if index is not None and all(index.indexes(col) for col, _ in pairs):
+        return popcount(index.select(pairs))
+    return int(np.count_nonzero(selection_mask(df, pairs)))
+
+
+def describe(cohort):
+    """Readable summary of a cohort, e.g. ``Female, age 45 to 74, income < $10k to $25k-$35k``."""
+    parts = []
+    for col, condition in cohort:
+        if col == "sex":
+            parts.append(SEX_LABELS[condition])
+        elif col in CODED_FILTERS:
+            labels = CODED_FILTERS[col]
+            first, last = labels[condition.lo - 1], labels[condition.hi - 1]
+            if col == "age":
+                first, last = first.split("-")[0], last.split("-")[-1]
+            parts.append(f"{col} {first}" if first == last else f"{col} {first} to {last}")
+        elif col == "bmi":
+            parts.append(f"BMI {condition.lo:g}-{condition.hi:g}")
+    return ", ".join(parts)
@@ -6,7 +6,10 @@ and their conclusions (Accept/Reject).
 
 import plotly.graph_objects as go
 
+from figure_cache import cached_figure
 
+
+@cached_figure
 def create_sankey_diagram():
     """
     Create and return a Sankey diagram showing hypothesis flow and conclusions.
@@ -0,0 +1,242 @@
+"""
+cube.py - Contingency Cube
+Module for counting the dataset once into small dense cuboids over its low-cardinality dimensions.
+
+Every chart asks for a rate over a few coded columns (0/1 indicators, age bands, sex, education,
+income, general health, BMI class and the derived counters). The cube holds, for a handful of
+dimension sets, the number of rows and the outcome sums in every cell. A query is answered by
+slicing and summing a cuboid, so once the cube is built chart latency no longer depends on how
+many rows the dataset has. The cube is built once per dataset version, like the features.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from features import get_features
+
+OUTCOME = "diabetes_binary"
+
+# 0/1 health indicators counted jointly (2^12 cells), so any with/without split is a slice
+INDICATORS = [
+    "smoker", "physactivity", "fruits", "veggies", "hvyalcoholconsump",
+    "highbp", "highchol", "stroke", "heartdiseaseorattack",
+    "anyhealthcare", "nodocbccost", "diffwalk",
+]
+
+# (dimensions, outcomes summed per cell); 0/1 and ordinal dimensions can also be used as outcomes
+CUBOIDS = [
+    (INDICATORS, [OUTCOME]),
+    (["age_group", "age_group_h1", "sex_label", "bmi_category", "bmi_class",
+      "physactivity_label", "conditions_binary"], [OUTCOME]),
+    (["education_group", "education_label", "income_label", "income_band",
+      "anyhealthcare", "nodocbccost"],
+     [OUTCOME, "healthy_diet", "physactivity", "fruits", "veggies", "cholcheck"]),
+    (["genhlth", "risk_behaviors", "barriers_count", "limitation_count", "condition_count"],
+     [OUTCOME, "menthlth", "physhlth"]),
+]
+
+_CACHE_SIZE = 4
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+# ============================================================================
+# CODED DIMENSIONS
+# ============================================================================
+
+def column(df, name):
+    """Look a name up in the dataset first, then in the derived features."""
+    if name in df.columns:
+        return df[name]
+    return get_features(df)[name]
+
+
+def has_column(df, name):
+    """True if ``column`` can resolve the name for this dataset."""
+    return name in df.columns or name in get_features(df).columns
+
+
+def key_codes(series):
+    """
+    Convert a grouping column into integer codes.
+
+    Returns:
+    --------
+    tuple
+        (codes, labels) where codes index into labels and -1 marks a missing key
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        return series.cat.codes.to_numpy(), pd.CategoricalIndex(
+            categories, categories=categories, ordered=series.cat.ordered
+        )
+
+    values = series.to_numpy()
+    if values.dtype.kind == "b":
+        values = values.view(np.uint8)
+    if values.dtype.kind == "u" or (values.dtype.kind == "i" and values.min(initial=0) >= 0):
+        size = int(values.max()) + 1 if len(values) else 0
+        return values, pd.Index(np.arange(size, dtype=values.dtype))
+
+    codes, labels = pd.factorize(series, sort=True)
+    return codes, labels
+
+
+# ============================================================================
+# CUBOIDS
+# ============================================================================
+
+class Cuboid:
+    """
+    Dense counts over one set of coded dimensions.
+
+    Each dimension gets one slot per label plus, if the column has missing
+    values, a trailing slot for them. ``n`` holds row counts and ``sums`` the
+    per-cell outcome sums; ``valid`` holds the non-missing outcome counts for
+    outcomes that can be NaN.
+    """
+
+    def __init__(self, df, dims, outcomes):
+        keys = [key_codes(column(df, name)) for name in dims]
+        self.dims = list(dims)
+        self.labels = [labels for _, labels in keys]
+        self.missing = [bool(codes.min(initial=0) < 0) for codes, _ in keys]
+        self.shape = tuple(len(labels) + missing for labels, missing in zip(self.labels, self.missing))
+
+        codes = [np.where(codes < 0, len(labels), codes) if missing else codes
+                 for (codes, labels), missing in zip(keys, self.missing)]
+        size = int(np.prod(self.shape))
+        flat = np.ravel_multi_index(codes, self.shape) if len(codes) > 1 else codes[0]
+
+        self.n = np.bincount(flat, minlength=size).reshape(self.shape)
+        self.sums = {}
+        self.valid = {}
+        for outcome in outcomes:
+            values = column(df, outcome).to_numpy()
+            if values.dtype.kind == "f":
+                isnan = np.isnan(values)
+                if isnan.any():
+                    self.valid[outcome] = np.bincount(flat, weights=~isnan, minlength=size).astype(
+                        np.int64).reshape(self.shape)
+                    values = np.where(isnan, 0, values)
+            sums = np.bincount(flat, weights=values, minlength=size)
+            if values.dtype.kind in "uib":
+                sums = np.rint(sums).astype(np.int64)
+            self.sums[outcome] = sums.reshape(self.shape)
+
+    @property
+    def nbytes(self):
+        return self.n.nbytes + sum(a.nbytes for a in self.sums.values()) + sum(
+            a.nbytes for a in self.valid.values())
+
+    def can_answer(self, by, outcome):
+        if not set(by) <= set(self.dims) or len(set(by)) != len(by):
+            return False
+        if outcome in self.sums:
+            return True
+        # A numeric dimension that is not also a key can serve as the outcome
+        return (outcome in self.dims and outcome not in by
+                and not isinstance(self.labels[self.dims.index(outcome)], pd.CategoricalIndex))
+
+    def query(self, by, outcome):
+        """
+        Sum the cuboid down to the ``by`` dimensions.
+
+        Returns:
+        --------
+        tuple
+            (n, cases, labels) in the same form as a row scan: arrays shaped
+            by the key sizes, missing keys and missing outcomes excluded
+        """
+        if outcome in self.sums:
+            n = self.valid.get(outcome, self.n)
+            cases = self.sums[outcome]
+        else:
+            axis = self.dims.index(outcome)
+            labels = np.asarray(self.labels[axis])
+            weights = np.zeros(self.shape[axis], dtype=np.float64 if labels.dtype.kind == "f" else np.int64)
+            weights[:len(labels)] = labels
+            present = np.zeros(self.shape[axis], dtype=np.int64)
+            present[:len(labels)] = 1
+            view = [1] * len(self.shape)
+            view[axis] = -1
+            n = self.n * present.reshape(view)
+            cases = self.n * weights.reshape(view)
+
+        # Keys exclude their missing slot; every other dimension is summed out
+        axes = [self.dims.index(name) for name in by]
+        index = tuple(slice(0, len(self.labels[i])) if i in axes else slice(None)
+                      for i in range(len(self.shape)))
+        other = tuple(i for i in range(len(self.shape)) if i not in axes)
+        n = n[index].sum(axis=other)
+        cases = cases[index].sum(axis=other)
+
+        order = np.argsort(np.argsort(axes))   # kept axes are in dimension order
+        n = np.transpose(n, order)
+        cases = np.transpose(cases, order)
+        return n, cases, [self.labels[i] for i in axes]
+
+
+class Cube:
+    """The set of cuboids built for one dataset version."""
+
+    def __init__(self, df, cuboids=CUBOIDS):
+        self.cuboids = []
+        for dims, outcomes in cuboids:
+            dims = [name for name in dims if has_column(df, name)]
+            outcomes = [name for name in outcomes if has_column(df, name)]
+            if dims:
+                self.cuboids.append(Cuboid(df, dims, outcomes))
+
+    @property
+    def nbytes(self):
+        return sum(cuboid.nbytes for cuboid in self.cuboids)
+
+    def query(self, by, outcome=OUTCOME):
+        """
+        Answer a grouped count from the smallest cuboid that covers it.
+
+        Returns:
+        --------
+        tuple or None
+            (n, cases, labels) as from ``Cuboid.query``, or None if no
+            cuboid holds these dimensions and outcome
+        """
+        candidates = [c for c in self.cuboids if c.can_answer(by, outcome)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: c.n.size).query(by, outcome)
+
+
+def get_cube(df):
+    """
+    Return the cube for a dataset, building it once per dataset version.
+
+    Like ``features.get_features`` this relies on the fingerprint that
+    ``data_loader.load_dataset`` stores in ``df.attrs``; frames without one
+    get None and callers fall back to scanning rows.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The standardised diabetes dataset
+
+    Returns:
+    --------
+    Cube or None
+    """
+    fingerprint = df.attrs.get("fingerprint")
+    if fingerprint is None:
+        return None
+
+    key = (fingerprint, len(df))
+    with _LOCK:
+        cube = _CACHE.get(key)
+        if cube is None:
+            cube = Cube(df)
+            if len(_CACHE) >= _CACHE_SIZE:
+                _CACHE.pop(next(iter(_CACHE)))   # drop the oldest dataset version
+            _CACHE[key] = cube
+    return cube
@@ -0,0 +1,231 @@
+"""
+data_loader.py - Cached, Typed Dataset Loader
+Module for loading diabetes.csv once per process with compact dtypes and standardised column names.
+Every Streamlit rerun gets the same read-only frame back until the file on disk changes.
+
+After the first parse the columns are also written to a binary sidecar directory next to the
+CSV (one .npy file per column plus a manifest), so server restarts and new workers skip the
+CSV text parse until the CSV changes.
+
+The frame's columns are read-only np.memmap views of those .npy files, so every session and
+every worker process on the machine shares the same page-cache pages instead of holding a
+private copy of the data.
+
+Chart builders receive this frame as-is: column names are already standardised, builders never
+copy or modify it, and derived columns come from features.get_features.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Compact dtypes for the standardised column names
+# 0/1 indicators fit in uint8, the ordinal survey codes (age 1-13, genhlth 1-5,
+# education 1-6, income 1-8) and the day counts (0-30) fit in small unsigned ints
+BINARY_COLUMNS = [
+    "diabetes_binary", "highbp", "highchol", "cholcheck", "smoker", "stroke",
+    "heartdiseaseorattack", "physactivity", "fruits", "veggies",
+    "hvyalcoholconsump", "anyhealthcare", "nodocbccost", "diffwalk", "sex",
+]
+
+COLUMN_DTYPES = {
+    **{col: np.uint8 for col in BINARY_COLUMNS},
+    "bmi": np.float32,
+    "genhlth": np.uint8,
+    "menthlth": np.uint8,
+    "physhlth": np.uint8,
+    "age": np.uint8,
+    "education": np.uint8,
+    "income": np.uint8,
+}
+
+SIDECAR_SUFFIX = ".columns"
+SIDECAR_VERSION = 1
+
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def standardize_columns(columns):
+    """Lower-case column names and replace spaces/dashes with underscores."""
+    return pd.Index(columns).str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_')
+
+
+def file_fingerprint(path):
+    """
+    Hash the contents of a file.
+
+    Parameters:
+    -----------
+    path : str
+        Path to the file
+
+    Returns:
+    --------
+    str
+        Hex digest identifying this version of the file
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sidecar_path(path):
+    """Return the sidecar directory used for a CSV file (diabetes.csv -> diabetes.columns)."""
+    return os.path.splitext(path)[0] + SIDECAR_SUFFIX
+
+
+def _read_csv(path):
+    """Parse the CSV and apply column standardisation and compact dtypes."""
+    df = pd.read_csv(path, dtype=np.float32)
+    df.columns = standardize_columns(df.columns)
+
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        dtype = COLUMN_DTYPES.get(col)
+        # Columns with missing values stay as float32 so NaN survives
+        if dtype is not None and not np.isnan(values).any():
+            values = values.astype(dtype)
+        columns[col] = values
+
+    return columns
+
+
+def _read_manifest(directory):
+    """Return the sidecar manifest, or None if it is missing or unreadable."""
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != SIDECAR_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(directory, manifest):
+    tmp = os.path.join(directory, f"manifest.json.{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, "manifest.json"))
+
+
+def _read_sidecar(directory, manifest):
+    """Map every column listed in the manifest from its .npy file (read-only)."""
+    return {col: np.load(os.path.join(directory, f"{col}.npy"), mmap_mode='r')
+            for col in manifest["columns"]}
+
+
+def _write_sidecar(directory, columns, manifest):
+    """
+    Write one .npy file per column plus the manifest.
+
+    Files are written to a temporary directory first and swapped in, so a
+    concurrent reader never sees a half-written sidecar.
+    """
+    tmp = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp)
+    try:
+        for col, values in columns.items():
+            np.save(os.path.join(tmp, f"{col}.npy"), values)
+        _write_manifest(tmp, manifest)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp, directory)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _load_columns(path, stamp):
+    """
+    Return (columns, fingerprint) from the sidecar if it matches the CSV,
+    otherwise parse the CSV and rebuild the sidecar.
+    """
+    directory = sidecar_path(path)
+    manifest = _read_manifest(directory)
+
+    # Same size and mtime as when the sidecar was written: skip hashing the CSV
+    if manifest is not None and (manifest["mtime_ns"], manifest["size"]) == stamp:
+        return _read_sidecar(directory, manifest), manifest["fingerprint"]
+
+    fingerprint = file_fingerprint(path)
+    if manifest is not None and manifest["fingerprint"] == fingerprint:
+        manifest["mtime_ns"], manifest["size"] = stamp
+        try:
+            _write_manifest(directory, manifest)
+        except OSError:
+            pass
+        return _read_sidecar(directory, manifest), fingerprint
+
+    columns = _read_csv(path)
+    manifest = {
+        "version": SIDECAR_VERSION,
+        "fingerprint": fingerprint,
+        "mtime_ns": stamp[0],
+        "size": stamp[1],
+        "rows": len(next(iter(columns.values()), [])),
+        "columns": list(columns),
+    }
+    try:
+        _write_sidecar(directory, columns, manifest)
+    except OSError as e:
+        # A read-only deployment still works, it just parses the CSV on every start
+        # and keeps the columns in private memory
+        print(f"Warning: could not write column cache {directory}: {e}")
+        return columns, fingerprint
+    # Drop the parsed arrays and map the files instead so this process shares pages too
+    return _read_sidecar(directory, manifest), fingerprint
+
+
+def load_dataset(path='diabetes.csv'):
+    """
+    Load the diabetes dataset, parsing the CSV at most once per file version.
+
+    The result is cached per process and keyed by the file's mtime, size and
+    content hash, so Streamlit reruns get the cached frame back without
+    re-reading the file. Across processes the columns are read from the
+    binary sidecar (see ``sidecar_path``), which is rebuilt whenever the CSV
+    content changes. Columns are memory-mapped from the sidecar, so the frame
+    is shared between sessions and processes and is read-only; its content
+    hash is stored in ``df.attrs["fingerprint"]``.
+
+    Parameters:
+    -----------
+    path : str
+        Path to diabetes.csv
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The standardised, read-only dataset
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    with _LOCK:
+        entry = _CACHE.get(path)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry["df"]
+
+        columns, fingerprint = _load_columns(path, stamp)
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            # File was touched but not changed
+            entry["stamp"] = stamp
+            return entry["df"]
+
+        for values in columns.values():
+            values.flags.writeable = False
+        df = pd.DataFrame(columns, copy=False)
+        df.attrs["fingerprint"] = fingerprint
+        df.attrs["source"] = path
+        _CACHE[path] = {"stamp": stamp, "fingerprint": fingerprint, "df": df}
+        return df
@@ -0,0 +1,213 @@
+"""
+features.py - Shared Derived Features
+Module for computing the derived columns used across the hypothesis charts (age bands, BMI classes,
+income/education labels, risk/limitation/condition counters) once per dataset version.
+
+Everything is vectorised: bands are binned with np.searchsorted and labels are categoricals built
+from integer codes, so no chart needs a Python-level pass over the rows.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Age bands over the 13 BRFSS age codes (1 = 18-24 ... 13 = 80+)
+AGE_GROUP_LABELS = ['18-29', '30-44', '45-59', '60-74', '75+']
+AGE_GROUP_EDGES = [2, 5, 8, 11]      # codes 1-2, 3-5, 6-8, 9-11, 12-13
+AGE_GROUP_H1_EDGES = [2, 4, 6, 12]   # H1 has always grouped codes 7-12 under 60-74
+
+SEX_LABELS = ['Female', 'Male']
+YES_NO_LABELS = ['No', 'Yes']
+
+# BMI classes
+BMI_CATEGORY_LABELS = ['Underweight', 'Normal', 'Overweight', 'Obese']
+BMI_CATEGORY_EDGES = [18.5, 25, 30]
+BMI_CLASS_LABELS = [
+    'Underweight (<18.5)',
+    'Healthy (18.5-25)',
+    'Overweight (25-30)',
+    'Class 1 Obesity (30-35)',
+    'Class 2 Obesity (35-40)',
+    'Class 3 Obesity (>40)'
+]
+BMI_CLASS_EDGES = [18.5, 25, 30, 35, 40]
+
+# Income codes 1-8
+INCOME_LABELS = [
+    '< $10k', '$10k-$15k', '$15k-$20k', '$20k-$25k',
+    '$25k-$35k', '$35k-$50k', '$50k-$75k', '> $75k'
+]
+INCOME_BAND_LABELS = ["< $10k", "$10–15k", "$15–20k", "$20–25k",
+                      "$25–35k", "$35–50k", "$50–75k", "≥ $75k"]
+
+# Education codes 1-6
+EDUCATION_LABELS = ["K-only", "Grades 1–8", "Grades 9–11", "HS Grad", "Some College", "College+"]
+EDUCATION_GROUP_LABELS = ["Less than HS", "HS Graduate", "Some College", "College Grad"]
+EDUCATION_GROUP_CODES = [-1, 0, 0, 0, 1, 2, 3]   # lookup indexed by education code
+
+# (column, value that counts as a risk)
+RISK_BEHAVIORS = [
+    ("smoker", 1),
+    ("physactivity", 0),
+    ("fruits", 0),
+    ("veggies", 0),
+    ("hvyalcoholconsump", 1),
+]
+ACCESS_BARRIERS = [
+    ("nodocbccost", 1),
+    ("anyhealthcare", 0),
+]
+
+_CACHE_SIZE = 4
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def _values(df, col):
+    """Column as a float array (NaN for non-numeric values)."""
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def _categorical(codes, labels, index):
+    """Build an ordered categorical Series from integer codes (-1 = missing)."""
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels, ordered=True), index=index)
+
+
+def _bin(values, edges, side):
+    """Bin values with np.searchsorted, returning int8 codes with -1 for NaN."""
+    codes = np.searchsorted(np.asarray(edges, dtype=float), values, side=side).astype(np.int8)
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def _lookup(values, table):
+    """Map small integer codes through a lookup array; out-of-range and NaN become -1."""
+    table = np.asarray(table, dtype=np.int8)
+    valid = ~np.isnan(values) & (values >= 0) & (values < len(table))
+    codes = np.full(len(values), -1, dtype=np.int8)
+    codes[valid] = table[values[valid].astype(np.intp)]
+    return codes
+
+
+def _count(df, rules):
+    """Count how many (column, value) rules each row matches."""
+    total = np.zeros(len(df), dtype=np.uint8)
+    for col, value in rules:
+        if col in df.columns:
+            total += _values(df, col) == value
+    return total
+
+
+def compute_features(df):
+    """
+    Compute every derived column from the standardised dataset.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The standardised diabetes dataset
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Derived columns aligned with ``df.index``
+    """
+    index = df.index
+    features = {}
+
+    age = _values(df, "age")
+    age_codes = _bin(age, AGE_GROUP_EDGES, side="left")
+    age_codes[age > 13] = -1
+    features["age_group"] = _categorical(age_codes, AGE_GROUP_LABELS, index)
+    features["age_group_h1"] = _categorical(_bin(age, AGE_GROUP_H1_EDGES, side="left"),
+                                            AGE_GROUP_LABELS, index)
+
+    features["sex_label"] = _categorical(_lookup(_values(df, "sex"), [0, 1]), SEX_LABELS, index)
+    features["physactivity_label"] = _categorical(_lookup(_values(df, "physactivity"), [0, 1]),
+                                                  YES_NO_LABELS, index)
+
+    bmi = _values(df, "bmi")
+    features["bmi_category"] = _categorical(_bin(bmi, BMI_CATEGORY_EDGES, side="right"),
+                                            BMI_CATEGORY_LABELS, index)
+    bmi_class = _bin(bmi, BMI_CLASS_EDGES, side="right")
+    bmi_class[bmi_class < 0] = 0
+    features["bmi_class"] = pd.Series(bmi_class.astype(np.uint8), index=index)
+
+    income = _values(df, "income")
+    income_codes = _lookup(income, [-1, 0, 1, 2, 3, 4, 5, 6, 7])
+    features["income_label"] = _categorical(income_codes, INCOME_LABELS, index)
+    features["income_band"] = _categorical(income_codes, INCOME_BAND_LABELS, index)
+
+    education = _values(df, "educa" if "educa" in df.columns else "education")
+    features["education_label"] = _categorical(_lookup(education, [-1, 0, 1, 2, 3, 4, 5]),
+                                               EDUCATION_LABELS, index)
+    features["education_group"] = _categorical(_lookup(education, EDUCATION_GROUP_CODES),
+                                               EDUCATION_GROUP_LABELS, index)
+
+    # Fruits and vegetables both eaten daily (falls back to whichever column exists)
+    diet = [col for col in ("fruits", "veggies") if col in df.columns]
+    healthy_diet = np.ones(len(df), dtype=bool) if diet else np.zeros(len(df), dtype=bool)
+    for col in diet:
+        healthy_diet &= _values(df, col) == 1
+    features["healthy_diet"] = pd.Series(healthy_diet.astype(np.uint8), index=index)
+
+    features["risk_behaviors"] = pd.Series(_count(df, RISK_BEHAVIORS), index=index)
+    features["barriers_count"] = pd.Series(_count(df, ACCESS_BARRIERS), index=index)
+
+    # Functional limitations: inactive, fair/poor general health, any bad mental or
+    # physical health days, difficulty walking
+    limitations = np.zeros(len(df), dtype=np.uint8)
+    if "physactivity" in df.columns:
+        limitations += _values(df, "physactivity") == 0
+    if "genhlth" in df.columns:
+        limitations += _values(df, "genhlth") >= 4
+    if "menthlth" in df.columns:
+        limitations += _values(df, "menthlth") > 0
+    if "physhlth" in df.columns:
+        limitations += _values(df, "physhlth") > 0
+    if "diffwalk" in df.columns:
+        limitations += _values(df, "diffwalk") == 1
+    features["limitation_count"] = pd.Series(limitations, index=index)
+
+    # Pre-existing conditions: stroke, heart disease/attack, high BP, high cholesterol, BMI >= 30
+    conditions = _count(df, [("stroke", 1), ("heartdiseaseorattack", 1),
+                             ("highbp", 1), ("highchol", 1)])
+    conditions += bmi >= 30
+    features["condition_count"] = pd.Series(conditions, index=index)
+    features["conditions_binary"] = pd.Series((conditions > 0).astype(np.uint8), index=index)
+
+    return pd.DataFrame(features, index=index)
+
+
+def get_features(df):
+    """
+    Return the derived columns for a dataset, computing them once per dataset version.
+
+    Frames loaded through ``data_loader.load_dataset`` carry a content fingerprint
+    in ``df.attrs``; their features are cached and shared across sessions. Other
+    frames are computed on every call.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The standardised diabetes dataset
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Derived columns aligned with ``df.index`` (treat as read-only)
+    """
+    fingerprint = df.attrs.get("fingerprint")
+    if fingerprint is None:
+        return compute_features(df)
+
+    key = (fingerprint, len(df))
+    with _LOCK:
+        features = _CACHE.get(key)
+        if features is None:
+            features = compute_features(df)
+            if len(_CACHE) >= _CACHE_SIZE:
+                _CACHE.pop(next(iter(_CACHE)))   # drop the oldest dataset version
+            _CACHE[key] = features
+    return features
@@ -0,0 +1,242 @@
+"""
+figure_cache.py - Shared Figure Cache
+Module for memoizing the chart builders across reruns and sessions.
+
+Every ``create_*`` builder is wrapped with ``cached_figure``. The cache key is the builder, its
+arguments and the dataset fingerprint that ``data_loader.load_dataset`` stores in ``df.attrs``,
+so the same option rendered for another user (or seconds earlier) is a cache hit, and a new
+dataset version never sees stale figures. Entries live in one process-wide LRU bounded by entry
+count and by serialized size. A miss is built once: callers that miss the same key while it is
+being built (the warm-up and the first visitor, or two sessions) wait for that build and share it.
+
+Each figure is measured once, when it is built (see payload.py), and its size is kept with the
+cache entry (``builder.sized``). Cached figures are shared: callers pass them to
+``st.plotly_chart`` as-is and never modify them. Calls, builds and serialization are timed as
+profiling spans (see profiling.py).
+"""
+
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+from payload import PAYLOADS, measure
+from profiling import span
+
+MAX_ENTRIES = 256
+MAX_BYTES = 64 * 2**20
+
+
+class FigureCache:
+    """
+    Thread-safe LRU of built figures with an entry and a byte budget.
+
+    Parameters:
+    -----------
+    max_entries : int
+        Most figures kept at once
+    max_bytes : int
+        Most total serialized figure size (JSON bytes) kept at once
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (figure, nbytes)
+        self._pending = {}              # key -> Future of the figure being built
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached figure for ``key`` (marking it recently used) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached figure for ``key`` and its size, building it with ``build()`` on a miss.
+
+        Only the first caller to miss a key builds it; callers that miss it while the build runs
+        wait for it and get the same figure (or its exception).
+
+        Parameters:
+        -----------
+        build : callable
+            Returns (figure, serialized size in bytes)
+
+        Returns:
+        --------
+        tuple
+            (figure, serialized size in bytes)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._pending[key] = Future()
+            else:
+                self.waits += 1
+        if not owner:
+            return future.result()
+        try:
+            fig, nbytes = build()
+        except BaseException as exc:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(exc)
+            raise
+        self.put(key, fig, nbytes)
+        with self._lock:
+            del self._pending[key]
+        future.set_result((fig, nbytes))
+        return fig, nbytes
+
+    def put(self, key, fig, nbytes):
+        """Store a figure, evicting least recently used entries to stay within budget."""
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (fig, nbytes)
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for monitoring: hits, misses, waits, evictions, entries and bytes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+FIGURE_CACHE = FigureCache()
+
+
+def dataset_key(df):
+    """
+    Identify a dataset version, and the cohort of a view (see cohort.py), for cache keys.
+
+    Returns None for frames without a fingerprint, which are never cached.
+    """
+    fingerprint = df.attrs.get("fingerprint")
+    if fingerprint is None:
+        return None
+    return ("dataset", fingerprint, len(df), df.attrs.get("cohort", ()))
+
+
+def make_key(builder, signature, args, kwargs):
+    """
+    Build the cache key for one builder call, or None if the call can't be cached.
+
+    DataFrame arguments are replaced by their ``dataset_key``; every other
+    argument (after applying defaults) must be hashable.
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    parts = [f"{builder.__module__}.{builder.__qualname__}"]
+    for name, value in bound.arguments.items():
+        if isinstance(value, pd.DataFrame):
+            value = dataset_key(value)
+            if value is None:
+                return None
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        parts.append((name, value))
+    return tuple(parts)
+
+
+def call_label(builder, signature, args, kwargs):
+    """Readable name of one builder call for the payload report, e.g. ``create_x(sort_by='Prevalence')``."""
+    bound = signature.bind(*args, **kwargs)
+    options = [f"{name}={value!r}" for name, value in bound.arguments.items()
+               if not isinstance(value, pd.DataFrame)]
+    return f"{builder.__name__}({', '.join(options)})"
+
+
+def call_dataset(signature, args, kwargs):
+    """The ``dataset_key`` of a builder call's DataFrame argument (None if it takes none), for ``PAYLOADS``."""
+    bound = signature.bind(*args, **kwargs)
+    return next((dataset_key(value) for value in bound.arguments.values() if isinstance(value, pd.DataFrame)), None)
+
+
+def build_figure(builder, signature, args, kwargs):
+    """
+    Run a builder and record its figure's payload.
+
+    Returns:
+    --------
+    tuple
+        (figure, serialized size in bytes)
+    """
+    fig = builder(*args, **kwargs)
+    with span("serialize", builder.__name__):
+        nbytes, ms = measure(fig)
+    PAYLOADS.record(call_label(builder, signature, args, kwargs), nbytes, ms,
+                    call_dataset(signature, args, kwargs))
+    return fig, nbytes
+
+
+def cached_figure(builder):
+    """
+    Decorator memoizing a chart builder in ``FIGURE_CACHE``.
+
+    The undecorated builder stays available as ``builder.__wrapped__``, and
+    ``builder.sized(...)`` returns the figure with its serialized size in bytes.
+    """
+    signature = inspect.signature(builder)
+
+    def sized(*args, **kwargs):
+        with span("create", builder.__name__):
+            def build():
+                with span("build", builder.__name__):
+                    return build_figure(builder, signature, args, kwargs)
+
+            key = make_key(builder, signature, args, kwargs)
+            if key is None:
+                return build()
+            return FIGURE_CACHE.get_or_build(key, build)
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        return sized(*args, **kwargs)[0]
+
+    wrapper.sized = sized
+    return wrapper
@@ -7,6 +7,10 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 
+from aggregation import group_rates, wilson_interval
+from figure_cache import cached_figure
+from variants import add_variant_menu
+
 # Color Constants
 PRIMARY = "#931A23"        # Your brand
 SECONDARY = "#E8C6AE"      # Accent
@@ -14,35 +18,26 @@ BACKGROUND = "white"
 GRID = "rgba(0, 0, 0, 0.08)"
 CHART_COLORS = ["#FFF1A4", '#EEC8A3', '#DD9C7C', '#D24C49', '#A64A47', '#931A23']
 
-
-def wilson(success, n, z=1.96):
-    """Calculate Wilson score confidence interval"""
-    if n == 0:
-        return (np.nan, np.nan)
-    p = success / n
-    denom = 1 + z**2/n
-    center = (p + z**2/(2*n)) / denom
-    half = (z*np.sqrt((p*(1-p) + z**2/(4*n)) / n)) / denom
-    return center - half, center + half
+# Options for create_physical_activity_by_demographics_chart
+DEMOGRAPHIC_OPTIONS = ["Age Group", "Sex", "BMI Category"]
 
 
 def row_stats(df, col, risk_value):
     """Calculate statistics for a risk factor"""
-    # With risk
-    a = df[df[col] == risk_value]['diabetes_binary']
-    n1, c1 = a.count(), a.sum()
-    p1 = c1 / n1 if n1 else np.nan
-    lo1, hi1 = wilson(c1, n1)
-    
-    # Without risk
-    b = df[df[col] != risk_value]['diabetes_binary']
-    n0, c0 = b.count(), b.sum()
-    p0 = c0 / n0 if n0 else np.nan
-    lo0, hi0 = wilson(c0, n0)
-    
-    return p1, lo1, hi1, n1, int(c1), p0, lo0, hi0, n0, int(c0)
+    groups = group_rates(df, col)
+    risky = (groups[col] == risk_value).to_numpy()
+    
+    # With risk vs without risk, pooled from the per-value counts
+    n = np.array([groups['n'][risky].sum(), groups['n'][~risky].sum()])
+    cases = np.array([groups['cases'][risky].sum(), groups['cases'][~risky].sum()])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = cases / n
+    lo, hi = wilson_interval(cases, n)
+    
+    return p[0], lo[0], hi[0], n[0], int(cases[0]), p[1], lo[1], hi[1], n[1], int(cases[1])
 
 
+@cached_figure
 def create_individual_lifestyle_factors_chart(df):
     """
     Create grouped bar chart comparing diabetes rates with vs without individual lifestyle risk factors.
@@ -61,9 +56,6 @@ def create_individual_lifestyle_factors_chart(df):
     plotly.graph_objects.Figure
         Grouped bar chart with error bars
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
     FACTOR_ORDER = [
         ("smoker", "Smoking"),
         ("physactivity", "No Physical Activity"),
@@ -137,6 +129,7 @@ def create_individual_lifestyle_factors_chart(df):
 
 
 
+@cached_figure
 def create_risk_factors_chart(df):
     """
     Create a bar chart showing diabetes prevalence increases with multiple lifestyle risk factors.
@@ -154,33 +147,12 @@ def create_risk_factors_chart(df):
     plotly.graph_objects.Figure
         Bar chart with soft background bands
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    cols = {
-        "smoke":    ("smoker",            1),
-        "inactive": ("physactivity",      0),
-        "lowfruit": ("fruits",            0),
-        "lowveg":   ("veggies",           0),
-        "heavyalc": ("hvyalcoholconsump", 1),
-    }
-    
-    rb = pd.DataFrame(index=df.index)
-    for new, (col, risky) in cols.items():
-        if col in df.columns:
-            rb[new] = (pd.to_numeric(df[col], errors="coerce") == risky).astype(int)
-    
-    if rb.shape[1] == 0:
-        rb["none"] = 0
-    
-    df["risk_behaviors"] = rb.sum(axis=1).fillna(0).astype(int)
-    
+    # Lifestyle risks per person: smoking, inactivity, low fruit/veg, heavy alcohol
     order = ["0 factors", "1 factor", "2 factors", "3 factors", "4+ factors"]
     labels = lambda k: "4+ factors" if k >= 4 else f"{k} factor{'s' if k != 1 else ''}"
     
-    prev_rb = (df.assign(diabetes_binary=(pd.to_numeric(df["diabetes_binary"], errors="coerce") == 1).astype(float))
-                 .groupby("risk_behaviors", as_index=False)["diabetes_binary"].mean()
-                 .rename(columns={"diabetes_binary":"prevalence"}))
+    prev_rb = (group_rates(df, "risk_behaviors")[["risk_behaviors", "rate"]]
+                 .rename(columns={"rate": "prevalence"}))
     
     prev_rb["group"] = prev_rb["risk_behaviors"].map(labels)
     prev_rb = (prev_rb.groupby("group", as_index=False)["prevalence"].mean())
@@ -221,7 +193,8 @@ def create_risk_factors_chart(df):
     return fig
 
 
-def create_physical_activity_by_demographics_chart(df, demographic="Age Group"):
+@cached_figure
+def create_physical_activity_by_demographics_chart(df, demographic="Age Group", all_variants=False):
     """
     Create an interactive chart showing diabetes rates by physical activity
     across a selected demographic.
@@ -232,135 +205,80 @@ def create_physical_activity_by_demographics_chart(df, demographic="Age Group"):
         The diabetes dataset
     demographic : str
         One of: "Age Group", "Sex", "BMI Category"
+    all_variants : bool
+        Include every demographic view with a dropdown to switch between
+        them in the browser, starting on ``demographic``
     
     Returns:
     --------
     plotly.graph_objects.Figure
         Plotly figure showing the selected demographic view
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    def map_age_to_range(age):
-        if age <= 2:
-            return '18-29'
-        elif age <= 4:
-            return '30-44'
-        elif age <= 6:
-            return '45-59'
-        elif age <= 12:
-            return '60-74'
-        else:
-            return '75+'
-    
-    sex_mapping = {0: 'Female', 1: 'Male'}
-    
-    def categorize_bmi(bmi):
-        if bmi < 18.5:
-            return 'Underweight'
-        elif bmi < 25:
-            return 'Normal'
-        elif bmi < 30:
-            return 'Overweight'
-        else:
-            return 'Obese'
-    
-    df['age_group'] = df['age'].apply(map_age_to_range)
-    df['sex_label'] = df['sex'].map(sex_mapping)
-    df['bmi_category'] = df['bmi'].apply(categorize_bmi)
-    df['physactivity_label'] = df['physactivity'].map({0: 'No', 1: 'Yes'})
-    
     def calculate_rates(group_by_col):
-        results = df.groupby([group_by_col, 'physactivity_label']).agg({
-            'diabetes_binary': ['mean', 'count']
-        }).reset_index()
+        results = group_rates(df, [group_by_col, 'physactivity_label'])
+        results = results[[group_by_col, 'physactivity_label', 'rate', 'n']]
         
         results.columns = [group_by_col, 'PhysActivity', 'Diabetes Rate', 'Count']
         results['Diabetes Rate (%)'] = results['Diabetes Rate'] * 100
         
         return results
     
-    age_data = calculate_rates('age_group')
-    sex_data = calculate_rates('sex_label')
-    bmi_data = calculate_rates('bmi_category')
-    
-    age_order = ['18-29', '30-44', '45-59', '60-74', '75+']
-    age_data['age_group'] = pd.Categorical(age_data['age_group'], categories=age_order, ordered=True)
-    age_data = age_data.sort_values('age_group')
-    
-    bmi_order = ['Underweight', 'Normal', 'Overweight', 'Obese']
-    bmi_data['bmi_category'] = pd.Categorical(bmi_data['bmi_category'], categories=bmi_order, ordered=True)
-    bmi_data = bmi_data.sort_values('bmi_category')
-    
-    # Select data based on demographic parameter
-    if demographic == "Age Group":
-        data = age_data
-        group_col = 'age_group'
-        groups_order = age_order
-        x_title = "Age Group"
-    elif demographic == "Sex":
-        data = sex_data
-        group_col = 'sex_label'
-        groups_order = None
-        x_title = "Sex"
-    else:  # BMI Category
-        data = bmi_data
-        group_col = 'bmi_category'
-        groups_order = bmi_order
-        x_title = "BMI Category"
-    
     color_no = "#E8C6AE"
     color_yes = "#931A23"
     
-    fig = go.Figure()
-    
-    if groups_order is None:
-        groups = data[group_col].unique()
-    else:
-        groups = groups_order
-    
-    for group in groups:
-        group_data = data[data[group_col] == group]
-        
-        no_activity = group_data[group_data['PhysActivity'] == 'No']
-        if not no_activity.empty:
+    def add_demographic_traces(fig, demographic):
+        """Add the bars of one demographic view and return its x-axis title."""
+        # Select data based on demographic parameter
+        if demographic == "Age Group":
+            group_col = 'age_group_h1'
+            x_title = "Age Group"
+        elif demographic == "Sex":
+            group_col = 'sex_label'
+            x_title = "Sex"
+        else:  # BMI Category
+            group_col = 'bmi_category'
+            x_title = "BMI Category"
+    
+        data = calculate_rates(group_col)
+    
+        # group_rates returns the groups in category order, which is the display order
+        for activity, color, offset in [('No', color_no, 0), ('Yes', color_yes, 1)]:
+            activity_data = data[data['PhysActivity'] == activity]
+            if activity_data.empty:
+                continue
+            
+            # One trace per activity level across all groups
             fig.add_trace(go.Bar(
-                name='No',
-                x=[group],
-                y=no_activity['Diabetes Rate (%)'].values,
-                marker=dict(color=color_no, line=dict(color='white', width=2)),
-                text=[f"{val:.1f}%" for val in no_activity['Diabetes Rate (%)'].values],
+                name=activity,
+                x=activity_data[group_col].astype(str),
+                y=activity_data['Diabetes Rate (%)'],
+                marker=dict(color=color, line=dict(color='white', width=2)),
+                text=[f"{val:.1f}%" for val in activity_data['Diabetes Rate (%)']],
                 textposition='outside',
-                customdata=np.column_stack((
-                    no_activity['Diabetes Rate (%)'].values,
-                    no_activity['Count'].values,
-                    [group] * len(no_activity)
-                )),
-                hovertemplate='<b>%{customdata[2]}</b><br>No Physical Activity<br>Diabetes Rate: %{customdata[0]:.1f}%<br>Count: %{customdata[1]:,}<extra></extra>',
-                legendgroup='No',
-                showlegend=(group == groups[0]),
-                offsetgroup=0
+                customdata=activity_data[['Count']],
+                hovertemplate=f'<b>%{{x}}</b><br>{activity} Physical Activity<br>Diabetes Rate: %{{y:.1f}}%<br>Count: %{{customdata[0]:,}}<extra></extra>',
+                legendgroup=activity,
+                offsetgroup=offset
             ))
         
-        yes_activity = group_data[group_data['PhysActivity'] == 'Yes']
-        if not yes_activity.empty:
-            fig.add_trace(go.Bar(
-                name='Yes',
-                x=[group],
-                y=yes_activity['Diabetes Rate (%)'].values,
-                marker=dict(color=color_yes, line=dict(color='white', width=2)),
-                text=[f"{val:.1f}%" for val in yes_activity['Diabetes Rate (%)'].values],
-                textposition='outside',
-                customdata=np.column_stack((
-                    yes_activity['Diabetes Rate (%)'].values,
-                    yes_activity['Count'].values,
-                    [group] * len(yes_activity)
-                )),
-                hovertemplate='<b>%{customdata[2]}</b><br>Yes Physical Activity<br>Diabetes Rate: %{customdata[0]:.1f}%<br>Count: %{customdata[1]:,}<extra></extra>',
-                legendgroup='Yes',
-                showlegend=(group == groups[0]),
-                offsetgroup=1
-            ))
+        return x_title
+    
+    fig = go.Figure()
+    
+    if all_variants:
+        # Every view in one figure, switched in the browser
+        variants = []
+        for option in DEMOGRAPHIC_OPTIONS:
+            first = len(fig.data)
+            option_title = add_demographic_traces(fig, option)
+            groups = list(dict.fromkeys(x for trace in fig.data[first:] for x in trace.x))
+            variants.append((option, len(fig.data) - first, {'xaxis.title.text': option_title,
+                                                            'xaxis.categoryorder': 'array',
+                                                            'xaxis.categoryarray': groups}))
+            if option == demographic:
+                x_title = option_title
+    else:
+        x_title = add_demographic_traces(fig, demographic)
     
     fig.update_layout(
         title={
@@ -404,5 +322,8 @@ def create_physical_activity_by_demographics_chart(df, demographic="Age Group"):
     fig.update_xaxes(showline=True, linewidth=1, linecolor='black', mirror=False)
     fig.update_yaxes(showline=True, linewidth=1, linecolor='black', mirror=False, range=[0, 100])
     
+    if all_variants:
+        add_variant_menu(fig, variants, DEMOGRAPHIC_OPTIONS.index(demographic))
+    
     return fig
 
@@ -8,6 +8,10 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 
+from aggregation import group_rates
+from features import EDUCATION_GROUP_LABELS
+from figure_cache import cached_figure
+
 # Color Constants
 PRIMARY = "#931A23"        # Your brand
 SECONDARY = "#E8C6AE"      # Accent
@@ -15,6 +19,7 @@ GRID = "rgba(0, 0, 0, 0.08)"
 CHART_COLORS = ["#FFF1A4", '#EEC8A3', '#DD9C7C', '#D24C49', '#A64A47', '#931A23']
 
 
+@cached_figure
 def create_education_health_behaviors_chart(df):
     """
     Create grouped bar chart showing health behaviors improve with higher education.
@@ -31,45 +36,28 @@ def create_education_health_behaviors_chart(df):
     plotly.graph_objects.Figure
         Grouped bar chart showing health behaviors by education
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    edu_col = "educa" if "educa" in df.columns else "education"
-    map4 = {1:"Less than HS", 2:"Less than HS", 3:"Less than HS",
-            4:"HS Graduate", 5:"Some College", 6:"College Grad"}
-    order4 = ["Less than HS","HS Graduate","Some College","College Grad"]
-    
-    edu_num = pd.to_numeric(df.get(edu_col), errors="coerce")
-    df = df.dropna(subset=[edu_col]).copy()
-    df["Education"] = pd.Categorical(edu_num.map(map4), categories=order4, ordered=True)
-    
-    def as01(s):
-        s = pd.to_numeric(df.get(s), errors="coerce")
-        return s.where(s.isin([0,1])).fillna(0).astype(int)
-    
-    if {"fruits","veggies"}.issubset(df.columns):
-        fruits  = as01("fruits")
-        veggies = as01("veggies")
-        df["Healthy Diet"] = ((fruits==1) & (veggies==1)).astype(int)
-    elif "fruits" in df.columns:
-        df["Healthy Diet"] = as01("fruits")
-    else:
-        df["Healthy Diet"] = as01("veggies") if "veggies" in df.columns else 0
+    order4 = EDUCATION_GROUP_LABELS
     
-    df["Physical Activity"] = as01("physactivity") if "physactivity" in df.columns else 0
+    behaviors = {"Healthy Diet": "healthy_diet"}
+    behaviors["Physical Activity"] = "physactivity" if "physactivity" in df.columns else None
     
     if "cholcheck" in df.columns:
-        df["Regular Checkups"] = as01("cholcheck")
+        behaviors["Regular Checkups"] = "cholcheck"
     elif "anyhealthcare" in df.columns:
-        df["Regular Checkups"] = as01("anyhealthcare")
+        behaviors["Regular Checkups"] = "anyhealthcare"
     else:
-        df["Regular Checkups"] = 0
+        behaviors["Regular Checkups"] = None
     
-    agg = (df.groupby("Education", observed=True)[
-            ["Healthy Diet","Physical Activity","Regular Checkups"]
-          ].mean().mul(100).reset_index())
+    frames = []
+    for metric, col in behaviors.items():
+        agg = group_rates(df, "education_group", outcome=col or "healthy_diet")
+        frames.append(pd.DataFrame({
+            "Education": agg["education_group"],
+            "Metric": metric,
+            "Prevalence": agg["rate"] * 100 if col else 0.0,
+        }))
     
-    long = agg.melt(id_vars="Education", var_name="Metric", value_name="Prevalence")
+    long = pd.concat(frames, ignore_index=True)
     
     # Colors
     colors = {
@@ -101,6 +89,7 @@ def create_education_health_behaviors_chart(df):
     return fig
 
 
+@cached_figure
 def create_education_diabetes_trend_chart(df):
     """
     Create line chart showing diabetes rate declines with higher education.
@@ -115,32 +104,8 @@ def create_education_diabetes_trend_chart(df):
     plotly.graph_objects.Figure
         Line chart showing diabetes trends by education
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    EDU_MAP = {
-        1: "Less than HS",
-        2: "Less than HS",
-        3: "Less than HS",
-        4: "HS Graduate",
-        5: "Some College",
-        6: "College Grad"
-    }
-    order4 = ["Less than HS","HS Graduate","Some College","College Grad"]
-    
-    df = df.dropna(subset=["diabetes_binary"])
-    
-    edu_col = "educa" if "educa" in df.columns else "education"
-    edu_num = pd.to_numeric(df.get(edu_col), errors="coerce")
-    df = df.dropna(subset=[edu_col]).copy()
-    df["edu4"] = pd.Categorical(edu_num.map(EDU_MAP), categories=order4, ordered=True)
-    
-    diab = (pd.to_numeric(df["diabetes_binary"], errors="coerce") == 1).astype(int)
-    g = df.assign(d=diab).groupby("edu4", observed=True)["d"]
-    tab = (g.agg(n="count", cases="sum", prev="mean")
-             .reset_index()
-             .rename(columns={"edu4":"Education"}))
-    tab["rate"] = (tab["prev"]*100)
+    tab = group_rates(df, "education_group").rename(columns={"education_group": "Education"})
+    tab["rate"] = (tab["rate"]*100)
     
     # plot
     x  = tab["Education"].astype(str)
@@ -180,6 +145,7 @@ def create_education_diabetes_trend_chart(df):
     return fig
 
 
+@cached_figure
 def create_income_diabetes_by_education_chart(df):
     """
     Create heatmap showing diabetes rates by income and education level.
@@ -194,40 +160,10 @@ def create_income_diabetes_by_education_chart(df):
     plotly.graph_objects.Figure
         Heatmap showing income vs education impact on diabetes
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    INCOME_MAP = {1:"< $10k", 2:"$10–15k", 3:"$15–20k", 4:"$20–25k",
-                  5:"$25–35k", 6:"$35–50k", 7:"$50–75k", 8:"≥ $75k"}
-    INC_ORDER = [INCOME_MAP[k] for k in (1,2,3,4,5,6,7,8)]
-    
-    EDU_MAP = {
-        1: "K-only",
-        2: "Grades 1–8",
-        3: "Grades 9–11",
-        4: "HS Grad",
-        5: "Some College",
-        6: "College+",
-    }
-    EDU_ORDER = [EDU_MAP[k] for k in (1,2,3,4,5,6)]
-    
-    # Clean data
-    db = pd.to_numeric(df.get("diabetes_binary"), errors="coerce")
-    df["diabetes"] = (db == 1).astype(int)
-    
-    edu = pd.to_numeric(df.get("education"), errors="coerce").astype("Int64")
-    df["education_lbl"] = pd.Categorical(edu.map(EDU_MAP), categories=EDU_ORDER, ordered=True)
-    
-    inc = pd.to_numeric(df.get("income"), errors="coerce").astype("Int64")
-    df["income_lbl"] = pd.Categorical(inc.map(INCOME_MAP), categories=INC_ORDER, ordered=True)
-    
     # Aggregate
-    df = df.dropna(subset=["education_lbl", "income_lbl", "diabetes"])
-    pivot = (df.groupby(["education_lbl", "income_lbl"], observed=True)["diabetes"]
-             .mean()
-             .mul(100)
-             .reset_index()
-             .pivot(index="education_lbl", columns="income_lbl", values="diabetes"))
+    pivot = (group_rates(df, ["education_label", "income_band"])
+             .assign(diabetes=lambda t: t["rate"] * 100)
+             .pivot(index="education_label", columns="income_band", values="diabetes"))
     
     fig = go.Figure(data=go.Heatmap(
         z=pivot.values,
@@ -253,6 +189,7 @@ def create_income_diabetes_by_education_chart(df):
     return fig
 
 
+@cached_figure
 def create_education_lifestyle_diabetes_chart(df):
     """
     Create line chart showing education's impact on lifestyle factors and diabetes.
@@ -269,55 +206,24 @@ def create_education_lifestyle_diabetes_chart(df):
     plotly.graph_objects.Figure
         Multi-line chart with lifestyle and diabetes trends
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
     COLOR_ACTIVE = "#386cb0"
     COLOR_FRUIT  = "#66a61e"
     COLOR_VEG    = "#e6ab02"
     COLOR_DIAB   = "#a64a47"
     
-    EDU_MAP = {
-        1: "K-only",
-        2: "Grades 1–8",
-        3: "Grades 9–11",
-        4: "HS Grad",
-        5: "Some College",
-        6: "College+",
-    }
-    EDU_ORDER = [EDU_MAP[k] for k in (1,2,3,4,5,6)]
-    
-    # Normalize
-    edu = pd.to_numeric(df.get("education"), errors="coerce").astype("Int64")
-    df["education_lbl"] = edu.map(EDU_MAP)
-    df["education_lbl"] = pd.Categorical(df["education_lbl"], categories=EDU_ORDER, ordered=True)
-    
-    db = pd.to_numeric(df.get("diabetes_binary"), errors="coerce")
-    df["diabetes"] = db.astype(int) if db.dropna().isin([0,1]).all() else (db == 1).astype(int)
-    
-    def _as01(col):
-        s = pd.to_numeric(df.get(col), errors="coerce")
-        return s.where(s.isin([0,1]), np.nan)
-    
-    df["phys_ok"]   = _as01("physactivity")   # 1 = active
-    df["fruit_ok"]  = _as01("fruits")         # 1 = eats fruit (not low)
-    df["veg_ok"]    = _as01("veggies")        # 1 = eats veg (not low)
-    
-    df = df.dropna(subset=["education_lbl", "diabetes"])
-    
     # Aggregate
-    grp = (df.groupby("education_lbl", observed=True)
-             .agg(n=("diabetes","size"),
-                  diab=("diabetes","mean"),
-                  phys_rate=("phys_ok","mean"),
-                  fruit_rate=("fruit_ok","mean"),
-                  veg_rate=("veg_ok","mean"))
-             .reset_index())
-    
-    grp["phys_pct"] = grp["phys_rate"] * 100
-    grp["fruit_pct"] = grp["fruit_rate"] * 100
-    grp["veg_pct"] = grp["veg_rate"] * 100
-    grp["diab_pct"] = grp["diab"] * 100
+    diab = group_rates(df, "education_label")
+    grp = pd.DataFrame({"education_lbl": diab["education_label"], "n": diab["n"]})
+    grp["diab_pct"] = diab["rate"].values * 100
+    
+    lifestyle = {
+        "phys_pct":  "physactivity",   # 1 = active
+        "fruit_pct": "fruits",         # 1 = eats fruit (not low)
+        "veg_pct":   "veggies",        # 1 = eats veg (not low)
+    }
+    for pct, col in lifestyle.items():
+        rates = group_rates(df, "education_label", outcome=col).set_index("education_label")["rate"]
+        grp[pct] = rates.reindex(diab["education_label"]).values * 100
     
     fig = go.Figure()
     
@@ -10,14 +10,23 @@ import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from aggregation import group_rates
+from features import INCOME_LABELS
+from figure_cache import cached_figure
+from variants import add_variant_menu
+
 # Color Constants
 PRIMARY = "#931A23"        # Your brand
 SECONDARY = "#E8C6AE"      # Accent
 GRID = "rgba(0, 0, 0, 0.08)"
 CHART_COLORS = ['#D24C49', '#A64A47', '#931A23']
 
+# Options for create_healthcare_coverage_chart
+INCOME_LEVELS = INCOME_LABELS
+
 
-def create_healthcare_coverage_chart(df, income_level='$25k-$35k'):
+@cached_figure
+def create_healthcare_coverage_chart(df, income_level='$25k-$35k', all_variants=False):
     """
     Create subplots showing healthcare coverage indicators for a specific income level.
     Displays side-by-side comparison of healthcare coverage and cost barriers.
@@ -29,41 +38,59 @@ def create_healthcare_coverage_chart(df, income_level='$25k-$35k'):
     income_level : str
         One of: '< $10k', '$10k-$15k', '$15k-$20k', '$20k-$25k', 
                 '$25k-$35k', '$35k-$50k', '$50k-$75k', '> $75k'
+    all_variants : bool
+        Include every income level with a dropdown to switch between them
+        in the browser, starting on ``income_level``
     
     Returns:
     --------
     plotly.graph_objects.Figure
         Side-by-side bar chart
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Map income to labels
-    income_mapping = {
-        1: '< $10k',
-        2: '$10k-$15k',
-        3: '$15k-$20k',
-        4: '$20k-$25k',
-        5: '$25k-$35k',
-        6: '$35k-$50k',
-        7: '$50k-$75k',
-        8: '> $75k'
-    }
-    
-    df['income_label'] = df['income'].map(income_mapping)
-    
-    # Filter data for this income level
-    income_data = df[df['income_label'] == income_level]
-    
-    # Healthcare Coverage
-    coverage_df = income_data.groupby('anyhealthcare', observed=True)['diabetes_binary'].mean() * 100
-    coverage_no = coverage_df.get(0, np.nan)
-    coverage_yes = coverage_df.get(1, np.nan)
-    
-    # Cost Barriers
-    cost_df = income_data.groupby('nodocbccost', observed=True)['diabetes_binary'].mean() * 100
-    cost_no = cost_df.get(0, np.nan)
-    cost_yes = cost_df.get(1, np.nan)
+    # One grouped count per indicator covers every income level
+    rates = {col: group_rates(df, ['income_label', col]) for col in ['anyhealthcare', 'nodocbccost']}
+    
+    def level_rates(col, level):
+        level_df = rates[col][rates[col]['income_label'] == level]
+        return level_df.set_index(col)['rate'] * 100
+    
+    def chart_title(level):
+        return f"Diabetes Rate by Healthcare Access Barriers - {level} Income"
+    
+    def add_level_traces(fig, level):
+        # Healthcare Coverage
+        coverage_df = level_rates('anyhealthcare', level)
+        coverage_no = coverage_df.get(0, np.nan)
+        coverage_yes = coverage_df.get(1, np.nan)
+        
+        # Cost Barriers
+        cost_df = level_rates('nodocbccost', level)
+        cost_no = cost_df.get(0, np.nan)
+        cost_yes = cost_df.get(1, np.nan)
+        
+        # Add trace for Healthcare Coverage
+        fig.add_trace(go.Bar(
+            x=['No', 'Yes'],
+            y=[coverage_no, coverage_yes],
+            marker=dict(color=["#E8C6AE", "#931A23"]),
+            text=[f"{coverage_no:.1f}%" if not np.isnan(coverage_no) else "", 
+                  f"{coverage_yes:.1f}%" if not np.isnan(coverage_yes) else ""],
+            textposition='outside',
+            showlegend=False,
+            hovertemplate='Response: %{x}<br>Diabetes Rate: %{y:.1f}%<extra></extra>',
+        ), row=1, col=1)
+        
+        # Add trace for Cost Barriers
+        fig.add_trace(go.Bar(
+            x=['No', 'Yes'],
+            y=[cost_no, cost_yes],
+            marker=dict(color=["#E8C6AE", "#931A23"]),
+            text=[f"{cost_no:.1f}%" if not np.isnan(cost_no) else "", 
+                  f"{cost_yes:.1f}%" if not np.isnan(cost_yes) else ""],
+            textposition='outside',
+            showlegend=False,
+            hovertemplate='Response: %{x}<br>Diabetes Rate: %{y:.1f}%<extra></extra>',
+        ), row=1, col=2)
     
     fig = make_subplots(
         rows=1, cols=2,
@@ -71,29 +98,8 @@ def create_healthcare_coverage_chart(df, income_level='$25k-$35k'):
         horizontal_spacing=0.15
     )
     
-    # Add trace for Healthcare Coverage
-    fig.add_trace(go.Bar(
-        x=['No', 'Yes'],
-        y=[coverage_no, coverage_yes],
-        marker=dict(color=["#E8C6AE", "#931A23"]),
-        text=[f"{coverage_no:.1f}%" if not np.isnan(coverage_no) else "", 
-              f"{coverage_yes:.1f}%" if not np.isnan(coverage_yes) else ""],
-        textposition='outside',
-        showlegend=False,
-        hovertemplate='Response: %{x}<br>Diabetes Rate: %{y:.1f}%<extra></extra>',
-    ), row=1, col=1)
-    
-    # Add trace for Cost Barriers
-    fig.add_trace(go.Bar(
-        x=['No', 'Yes'],
-        y=[cost_no, cost_yes],
-        marker=dict(color=["#E8C6AE", "#931A23"]),
-        text=[f"{cost_no:.1f}%" if not np.isnan(cost_no) else "", 
-              f"{cost_yes:.1f}%" if not np.isnan(cost_yes) else ""],
-        textposition='outside',
-        showlegend=False,
-        hovertemplate='Response: %{x}<br>Diabetes Rate: %{y:.1f}%<extra></extra>',
-    ), row=1, col=2)
+    for level in (INCOME_LEVELS if all_variants else [income_level]):
+        add_level_traces(fig, level)
     
     fig.update_xaxes(title_text="Response", row=1, col=1)
     fig.update_xaxes(title_text="Response", row=1, col=2)
@@ -101,7 +107,7 @@ def create_healthcare_coverage_chart(df, income_level='$25k-$35k'):
     fig.update_yaxes(title_text="Diabetes Rate (%)", row=1, col=2, range=[0, 100])
     
     fig.update_layout(
-        title_text=f"Diabetes Rate by Healthcare Access Barriers - {income_level} Income",
+        title_text=chart_title(income_level),
         height=500,
         barmode='group',
         plot_bgcolor='white',
@@ -110,145 +116,39 @@ def create_healthcare_coverage_chart(df, income_level='$25k-$35k'):
         showlegend=False,
     )
     
-    return fig
-
-
-def create_income_trends_dual_chart(df):
-    """
-    Create side-by-side line charts showing:
-    1. Diabetes rate by income level
-    2. Percentage lacking healthcare coverage by income level
-    """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Diabetes rate by income
-    income_data = df.groupby('income')['diabetes_binary'].mean() * 100
-    income_counts = df.groupby('income').size()
-    
-    income_df = pd.DataFrame({
-        'Income Group': income_data.index.map({
-            1: '< $10k', 2: '$10k-$15k', 3: '$15k-$20k', 4: '$20k-$25k',
-            5: '$25k-$35k', 6: '$35k-$50k', 7: '$50k-$75k', 8: '> $75k'
-        }),
-        'Diabetes Rate (%)': income_data.values,
-        'Count': income_counts.values
-    })
-    
-    # No healthcare coverage by income
-    no_coverage = df[df['anyhealthcare'] == 0]
-    coverage_income_data = (
-        no_coverage.groupby('income').size() / 
-        df.groupby('income').size() * 100
-    )
-    total_counts = df.groupby('income').size()
-    no_coverage_counts = no_coverage.groupby('income').size()
-    
-    coverage_df = pd.DataFrame({
-        'Income Group': coverage_income_data.index.map({
-            1: '< $10k', 2: '$10k-$15k', 3: '$15k-$20k', 4: '$20k-$25k',
-            5: '$25k-$35k', 6: '$35k-$50k', 7: '$50k-$75k', 8: '> $75k'
-        }),
-        'No Coverage (%)': coverage_income_data.values,
-        'Total Count': total_counts.values,
-        'No Coverage Count': no_coverage_counts.values
-    })
-    
-    # Create subplots
-    fig = make_subplots(
-        rows=1, cols=2,
-        subplot_titles=('Diabetes Rate by Income', 'Lack of Healthcare Coverage by Income'),
-        horizontal_spacing=0.12
-    )
-    
-    # Left plot: Diabetes rate
-    fig.add_trace(go.Scatter(
-        x=income_df['Income Group'],
-        y=income_df['Diabetes Rate (%)'],
-        mode='lines+markers',
-        name='Diabetes Rate',
-        line=dict(color='#931A23', width=3),
-        marker=dict(size=8, color='white', line=dict(color='#931A23', width=2)),
-        text=[f"{val:.1f}%" for val in income_df['Diabetes Rate (%)']],
-        textposition='top center',
-        customdata=income_df[['Count']],
-        hovertemplate='Income: %{x}<br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,}<extra></extra>',
-    ), row=1, col=1)
-    
-    # Right plot: No coverage
-    fig.add_trace(go.Scatter(
-        x=coverage_df['Income Group'],
-        y=coverage_df['No Coverage (%)'],
-        mode='lines+markers',
-        name='No Coverage Rate',
-        line=dict(color='#E8C6AE', width=3),
-        marker=dict(size=8, color='white', line=dict(color='#E8C6AE', width=2)),
-        text=[f"{val:.1f}%" for val in coverage_df['No Coverage (%)']],
-        textposition='top center',
-        customdata=np.column_stack((
-            coverage_df['No Coverage (%)'].values,
-            coverage_df['No Coverage Count'].values,
-            coverage_df['Total Count'].values
-        )),
-        hovertemplate='Income: %{x}<br>No Coverage: %{y:.1f}%<br>Uninsured: %{customdata[1]:,}<br>Total: %{customdata[2]:,}<extra></extra>',
-        showlegend=False
-    ), row=1, col=2)
-    
-    fig.update_xaxes(title_text="Income Group", row=1, col=1)
-    fig.update_xaxes(title_text="Income Group", row=1, col=2)
-    fig.update_yaxes(title_text="Diabetes Rate (%)", row=1, col=1, range=[0, 100])
-    fig.update_yaxes(title_text="No Coverage (%)", row=1, col=2, range=[0, 100])
-    
-    fig.update_layout(
-        title_text="Income Level: Relationship with Diabetes and Healthcare Coverage",
-        height=500,
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='x unified',
-    )
+    if all_variants:
+        variants = [(level, 2, {'title.text': chart_title(level)}) for level in INCOME_LEVELS]
+        add_variant_menu(fig, variants, INCOME_LEVELS.index(income_level), x=1, xanchor='right')
     
     return fig
 
 
+@cached_figure
 def create_income_trends_dual_chart(df):
     """
     Create side-by-side line charts showing:
     1. Diabetes rate by income level
     2. Percentage lacking healthcare coverage by income level
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
     # Diabetes rate by income
-    income_data = df.groupby('income')['diabetes_binary'].mean() * 100
-    income_counts = df.groupby('income').size()
+    income_data = group_rates(df, 'income_label')
     
     income_df = pd.DataFrame({
-        'Income Group': income_data.index.map({
-            1: '< $10k', 2: '$10k-$15k', 3: '$15k-$20k', 4: '$20k-$25k',
-            5: '$25k-$35k', 6: '$35k-$50k', 7: '$50k-$75k', 8: '> $75k'
-        }),
-        'Diabetes Rate (%)': income_data.values,
-        'Count': income_counts.values
+        'Income Group': income_data['income_label'].astype(str),
+        'Diabetes Rate (%)': income_data['rate'].values * 100,
+        'Count': income_data['n'].values
     })
     
-    # No healthcare coverage by income
-    no_coverage = df[df['anyhealthcare'] == 0]
-    coverage_income_data = (
-        no_coverage.groupby('income').size() / 
-        df.groupby('income').size() * 100
-    )
-    total_counts = df.groupby('income').size()
-    no_coverage_counts = no_coverage.groupby('income').size()
+    # No healthcare coverage by income (people without coverage = n - covered)
+    coverage_income_data = group_rates(df, 'income_label', outcome='anyhealthcare')
+    total_counts = coverage_income_data['n'].values
+    no_coverage_counts = total_counts - coverage_income_data['cases'].values
     
     coverage_df = pd.DataFrame({
-        'Income Group': coverage_income_data.index.map({
-            1: '< $10k', 2: '$10k-$15k', 3: '$15k-$20k', 4: '$20k-$25k',
-            5: '$25k-$35k', 6: '$35k-$50k', 7: '$50k-$75k', 8: '> $75k'
-        }),
-        'No Coverage (%)': coverage_income_data.values,
-        'Total Count': total_counts.values,
-        'No Coverage Count': no_coverage_counts.values
+        'Income Group': coverage_income_data['income_label'].astype(str),
+        'No Coverage (%)': no_coverage_counts / total_counts * 100,
+        'Total Count': total_counts,
+        'No Coverage Count': no_coverage_counts
     })
     
     # Create subplots
@@ -307,18 +207,11 @@ def create_income_trends_dual_chart(df):
     return fig
 
 
+@cached_figure
 def create_access_barriers_chart(df):
     """Create bar chart showing cumulative effect of access barriers."""
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Create barriers variable (0, 1, or 2)
-    df['barriers_count'] = 0
-    df.loc[df['nodocbccost'] == 1, 'barriers_count'] += 1
-    df.loc[df['anyhealthcare'] == 0, 'barriers_count'] += 1
-    
-    barriers_data = df.groupby('barriers_count')['diabetes_binary'].mean() * 100
-    barriers_counts = df.groupby('barriers_count').size()
+    # Barriers per person (0, 1, or 2): cost barrier to doctor, no healthcare coverage
+    barriers_data = group_rates(df, 'barriers_count')
     
     barrier_labels = {
         0: 'No Barriers',
@@ -327,9 +220,9 @@ def create_access_barriers_chart(df):
     }
     
     barriers_df = pd.DataFrame({
-        'Barriers': [barrier_labels[i] for i in barriers_data.index],
-        'Diabetes Rate (%)': barriers_data.values,
-        'Count': barriers_counts.values
+        'Barriers': [barrier_labels[i] for i in barriers_data['barriers_count']],
+        'Diabetes Rate (%)': barriers_data['rate'].values * 100,
+        'Count': barriers_data['n'].values
     })
     
     fig = go.Figure()
@@ -8,11 +8,15 @@ import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from aggregation import group_rates
+from figure_cache import cached_figure
+
 # Color Constants
 PRIMARY = "#931A23"        # Your brand
 SECONDARY = "#E8C6AE"      # Accent
 GRID = "rgba(0, 0, 0, 0.08)"
 
+@cached_figure
 def create_health_trends_chart(df):
     """
     Create a dual-axis chart showing diabetes rates vs unhealthy days trends.
@@ -27,13 +31,9 @@ def create_health_trends_chart(df):
     plotly.graph_objects.Figure
         Dual-axis line chart
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    grouped_df = df.groupby('genhlth').agg({
-        'diabetes_binary': 'mean',
-        'menthlth': 'mean',
-        'physhlth': 'mean'
+    grouped_df = pd.DataFrame({
+        col: group_rates(df, 'genhlth', outcome=col).set_index('genhlth')['rate']
+        for col in ['diabetes_binary', 'menthlth', 'physhlth']
     }) * 100
     grouped_df.index.name = 'General Health'
     
@@ -112,6 +112,7 @@ def create_health_trends_chart(df):
     return fig
 
 
+@cached_figure
 def create_functional_limitations_comparison_chart(df):
     """
     Create subplots comparing difficulty walking and physical activity.
@@ -126,30 +127,22 @@ def create_functional_limitations_comparison_chart(df):
     plotly.graph_objects.Figure
         Subplots with difficulty walking and physical activity
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Difficulty walking
-    diffwalk_data = df.groupby('diffwalk')['diabetes_binary'].mean() * 100
-    diffwalk_counts = df.groupby('diffwalk').size()
+    # Difficulty walking; both responses are kept even in a small cohort, a missing one
+    # with n=0 and no rate (no bar)
+    diffwalk_data = group_rates(df, 'diffwalk').set_index('diffwalk').reindex([0, 1])
     diffwalk_df = pd.DataFrame({
         'Response': ['No Difficulty', 'Difficulty'],
-        'Diabetes Rate (%)': diffwalk_data.values,
-        'Count': diffwalk_counts.values
+        'Diabetes Rate (%)': diffwalk_data['rate'].values * 100,
+        'Count': diffwalk_data['n'].fillna(0).astype(int).values
     })
-    diffwalk_no = diffwalk_df[diffwalk_df['Response'] == 'No Difficulty']
-    diffwalk_yes = diffwalk_df[diffwalk_df['Response'] == 'Difficulty']
     
     # Physical activity
-    physactivity_data = df.groupby('physactivity')['diabetes_binary'].mean() * 100
-    physactivity_counts = df.groupby('physactivity').size()
+    physactivity_data = group_rates(df, 'physactivity').set_index('physactivity').reindex([0, 1])
     physactivity_df = pd.DataFrame({
         'Response': ['No Activity', 'Has Activity'],
-        'Diabetes Rate (%)': physactivity_data.values,
-        'Count': physactivity_counts.values
+        'Diabetes Rate (%)': physactivity_data['rate'].values * 100,
+        'Count': physactivity_data['n'].fillna(0).astype(int).values
     })
-    physactivity_no = physactivity_df[physactivity_df['Response'] == 'No Activity']
-    physactivity_yes = physactivity_df[physactivity_df['Response'] == 'Has Activity']
     
     fig = make_subplots(
         rows=1, cols=2,
@@ -157,61 +150,19 @@ def create_functional_limitations_comparison_chart(df):
         horizontal_spacing=0.15
     )
     
-    # Difficulty walking - No
-    fig.add_trace(go.Bar(
-        x=diffwalk_no['Response'],
-        y=diffwalk_no['Diabetes Rate (%)'],
-        name='No Difficulty',
-        marker=dict(color="#E8C6AE", line=dict(color='white', width=2)),
-        text=[f"{val:.1f}%" for val in diffwalk_no['Diabetes Rate (%)']],
-        textposition='outside',
-        customdata=diffwalk_no[['Count']],
-        hovertemplate='%{x}<br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,}<extra></extra>',
-        legendgroup='diffwalk',
-        showlegend=True,
-    ), row=1, col=1)
-    
-    # Difficulty walking - Yes
-    fig.add_trace(go.Bar(
-        x=diffwalk_yes['Response'],
-        y=diffwalk_yes['Diabetes Rate (%)'],
-        name='Has Difficulty',
-        marker=dict(color="#931A23", line=dict(color='white', width=2)),
-        text=[f"{val:.1f}%" for val in diffwalk_yes['Diabetes Rate (%)']],
-        textposition='outside',
-        customdata=diffwalk_yes[['Count']],
-        hovertemplate='%{x}<br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,}<extra></extra>',
-        legendgroup='diffwalk',
-        showlegend=False,
-    ), row=1, col=1)
-    
-    # Physical activity - No
-    fig.add_trace(go.Bar(
-        x=physactivity_no['Response'],
-        y=physactivity_no['Diabetes Rate (%)'],
-        name='No',
-        marker=dict(color="#E8C6AE", line=dict(color='white', width=2)),
-        text=[f"{val:.1f}%" for val in physactivity_no['Diabetes Rate (%)']],
-        textposition='outside',
-        customdata=physactivity_no[['Count']],
-        hovertemplate='%{x}<br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,}<extra></extra>',
-        legendgroup='physactivity',
-        showlegend=False,
-    ), row=1, col=2)
-    
-    # Physical activity - Yes
-    fig.add_trace(go.Bar(
-        x=physactivity_yes['Response'],
-        y=physactivity_yes['Diabetes Rate (%)'],
-        name='Yes',
-        marker=dict(color="#931A23", line=dict(color='white', width=2)),
-        text=[f"{val:.1f}%" for val in physactivity_yes['Diabetes Rate (%)']],
-        textposition='outside',
-        customdata=physactivity_yes[['Count']],
-        hovertemplate='%{x}<br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,}<extra></extra>',
-        legendgroup='physactivity',
-        showlegend=False,
-    ), row=1, col=2)
+    # One trace per subplot, coloured per bar (No / Yes)
+    for col, (name, data) in enumerate([('diffwalk', diffwalk_df), ('physactivity', physactivity_df)], start=1):
+        fig.add_trace(go.Bar(
+            x=data['Response'],
+            y=data['Diabetes Rate (%)'],
+            name=name,
+            marker=dict(color=["#E8C6AE", "#931A23"], line=dict(color='white', width=2)),
+            text=[f"{val:.1f}%" if not np.isnan(val) else "" for val in data['Diabetes Rate (%)']],
+            textposition='outside',
+            customdata=data[['Count']],
+            hovertemplate='%{x}<br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,}<extra></extra>',
+            showlegend=False,
+        ), row=1, col=col)
     
     fig.update_yaxes(title_text="Diabetes Rate (%)", row=1, col=1)
     fig.update_yaxes(title_text="Diabetes Rate (%)", row=1, col=2)
@@ -229,6 +180,7 @@ def create_functional_limitations_comparison_chart(df):
     return fig
 
 
+@cached_figure
 def create_functional_limitations_chart(df):
     """
     Create a bar chart showing diabetes rates by number of functional limitations.
@@ -245,41 +197,15 @@ def create_functional_limitations_chart(df):
     plotly.graph_objects.Figure
         Bar chart of diabetes rates by limitation count (0-5)
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Create composite limitation score (0-5)
-    # Count limitations based on:
+    # Composite limitation score (0-5), counting:
     # 1. No physical activity (physactivity == 0)
     # 2. Poor general health (genhlth >= 4, where 5 is worst)
     # 3. Mental health days (menthlth > 0)
     # 4. Physical health days (physhlth > 0)
     # 5. Difficulty walking (diffwalk == 1)
-    
-    df['limitation_count'] = 0
-    
-    # Physical activity limitation
-    if 'physactivity' in df.columns:
-        df.loc[df['physactivity'] == 0, 'limitation_count'] += 1
-    
-    # General health limitation
-    if 'genhlth' in df.columns:
-        df.loc[df['genhlth'] >= 4, 'limitation_count'] += 1
-    
-    # Mental health limitation
-    if 'menthlth' in df.columns:
-        df.loc[df['menthlth'] > 0, 'limitation_count'] += 1
-    
-    # Physical health limitation
-    if 'physhlth' in df.columns:
-        df.loc[df['physhlth'] > 0, 'limitation_count'] += 1
-    
-    # Difficulty walking limitation
-    if 'diffwalk' in df.columns:
-        df.loc[df['diffwalk'] == 1, 'limitation_count'] += 1
-    
-    limit_data = df.groupby('limitation_count')['diabetes_binary'].mean() * 100
-    limit_counts = df.groupby('limitation_count').size()
+    limit_data = group_rates(df, 'limitation_count').set_index('limitation_count')
+    limit_counts = limit_data['n']
+    limit_data = limit_data['rate'] * 100
     
     limit_labels = {
         0: 'No Other Limitations',
@@ -301,18 +227,18 @@ def create_functional_limitations_chart(df):
     # Color gradient from yellow to dark red
     colors = ["#FFF1A4", '#EEC8A3', '#DD9C7C', '#D24C49', '#A64A47', '#931A23']
     
-    for i, (idx, row) in enumerate(limit_df.iterrows()):
-        fig.add_trace(go.Bar(
-            x=[row['Limitations']],
-            y=[row['Diabetes Rate (%)']],
-            name=row['Limitations'],
-            marker=dict(color=colors[i]),
-            text=[f"{row['Diabetes Rate (%)']:.1f}%"],
-            textposition='outside',
-            customdata=[[row['Count']]],
-            hovertemplate='<b>%{x}</b><br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,} <extra></extra>',
-            showlegend=False,
-        ))
+    # One trace for all bars, coloured per point
+    fig.add_trace(go.Bar(
+        x=limit_df['Limitations'],
+        y=limit_df['Diabetes Rate (%)'],
+        name='Diabetes Rate',
+        marker=dict(color=colors[:len(limit_df)]),
+        text=[f"{val:.1f}%" for val in limit_df['Diabetes Rate (%)']],
+        textposition='outside',
+        customdata=limit_df[['Count']],
+        hovertemplate='<b>%{x}</b><br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,} <extra></extra>',
+        showlegend=False,
+    ))
     
     fig.update_layout(
         title="Diabetes Rate by No. of Pre-Existing Limitations",
@@ -7,18 +7,25 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 
+from aggregation import group_rates
+from features import BMI_CLASS_LABELS
+from figure_cache import cached_figure
+from variants import add_variant_menu
+
 # Color Constants
 PRIMARY = "#931A23"        # Your brand
 SECONDARY = "#E8C6AE"      # Accent
 GRID = "rgba(0, 0, 0, 0.08)"
 
-def create_preexisting_conditions_chart(df, sort_by="Prevalence"):
+# Options for create_preexisting_conditions_chart
+SORT_OPTIONS = ["Prevalence", "Relative Risk"]
+
+@cached_figure
+def create_preexisting_conditions_chart(df, sort_by="Prevalence", all_variants=False):
     """
     Create an interactive chart showing diabetes rates and relative risk for individual pre-existing conditions.
+    With ``all_variants`` both sort orders are included, switched by a dropdown in the browser.
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
     conditions = {
         'High Blood Pressure': 'highbp',
         'High Cholesterol': 'highchol',
@@ -30,8 +37,9 @@ def create_preexisting_conditions_chart(df, sort_by="Prevalence"):
     prevalence_data = []
     
     for condition_name, condition_col in conditions.items():
-        no_rate = df[df[condition_col] == 0]['diabetes_binary'].mean() * 100
-        yes_rate = df[df[condition_col] == 1]['diabetes_binary'].mean() * 100
+        rates = group_rates(df, condition_col).set_index(condition_col)['rate'] * 100
+        no_rate = rates.get(0, np.nan)
+        yes_rate = rates.get(1, np.nan)
         relative_risk = yes_rate / no_rate if no_rate > 0 else 1.0
         
         prevalence_data.append({
@@ -41,41 +49,48 @@ def create_preexisting_conditions_chart(df, sort_by="Prevalence"):
             'Relative Risk': relative_risk
         })
     
-    if sort_by == "Relative Risk":
-        sorted_data = sorted(prevalence_data, key=lambda x: x['Relative Risk'], reverse=True)
-    else:  # Prevalence
-        sorted_data = sorted(prevalence_data, key=lambda x: x['Yes Rate'], reverse=True)
+    def chart_title(sort_by):
+        return f"Effect of Pre-Existing Factors on Diabetes Rates (Sorted by {sort_by})"
     
-    sorted_df = pd.DataFrame(sorted_data)
+    def add_sorted_traces(fig, sort_by):
+        if sort_by == "Relative Risk":
+            sorted_data = sorted(prevalence_data, key=lambda x: x['Relative Risk'], reverse=True)
+        else:  # Prevalence
+            sorted_data = sorted(prevalence_data, key=lambda x: x['Yes Rate'], reverse=True)
+        
+        sorted_df = pd.DataFrame(sorted_data)
+        
+        # Add "No" trace (all conditions)
+        fig.add_trace(go.Bar(
+            x=sorted_df['Condition'],
+            y=sorted_df['No Rate'],
+            name='No',
+            marker=dict(color='#E8C6AE'),
+            text=[f"{val:.1f}%" for val in sorted_df['No Rate']],
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>No Condition: %{y:.1f}%<extra></extra>',
+        ))
+        
+        # Add "Yes" trace (all conditions)
+        fig.add_trace(go.Bar(
+            x=sorted_df['Condition'],
+            y=sorted_df['Yes Rate'],
+            name='Yes',
+            marker=dict(color='#931A23'),
+            text=[f"{val:.1f}%" for val in sorted_df['Yes Rate']],
+            textposition='outside',
+            customdata=sorted_df['Relative Risk'],
+            hovertemplate='<b>%{x}</b><br>Has Condition: %{y:.1f}%<br>Relative Risk: %{customdata:.2f}x<extra></extra>',
+        ))
     
-    # Create figure with 2 traces total
+    # Create figure with 2 traces per sort order
     fig = go.Figure()
     
-    # Add "No" trace (all conditions)
-    fig.add_trace(go.Bar(
-        x=sorted_df['Condition'],
-        y=sorted_df['No Rate'],
-        name='No',
-        marker=dict(color='#E8C6AE'),
-        text=[f"{val:.1f}%" for val in sorted_df['No Rate']],
-        textposition='outside',
-        hovertemplate='<b>%{x}</b><br>No Condition: %{y:.1f}%<extra></extra>',
-    ))
-    
-    # Add "Yes" trace (all conditions)
-    fig.add_trace(go.Bar(
-        x=sorted_df['Condition'],
-        y=sorted_df['Yes Rate'],
-        name='Yes',
-        marker=dict(color='#931A23'),
-        text=[f"{val:.1f}%" for val in sorted_df['Yes Rate']],
-        textposition='outside',
-        customdata=sorted_df['Relative Risk'],
-        hovertemplate='<b>%{x}</b><br>Has Condition: %{y:.1f}%<br>Relative Risk: %{customdata:.2f}x<extra></extra>',
-    ))
+    for option in (SORT_OPTIONS if all_variants else [sort_by]):
+        add_sorted_traces(fig, option)
     
     fig.update_layout(
-        title_text=f"Effect of Pre-Existing Factors on Diabetes Rates (Sorted by {sort_by})",
+        title_text=chart_title(sort_by),
         height=500,
         barmode='group',
         plot_bgcolor='white',
@@ -93,8 +108,19 @@ def create_preexisting_conditions_chart(df, sort_by="Prevalence"):
     fig.update_xaxes(title_text="Pre-Existing Factors")
     fig.update_yaxes(title_text="Diabetes Rate (%)", range=[0, 100])
     
+    if all_variants:
+        # Category order follows the first trace shown, so each sort order sets it explicitly
+        variants = []
+        for option in SORT_OPTIONS:
+            order = list(fig.data[2 * SORT_OPTIONS.index(option)].x)
+            variants.append((option, 2, {'title.text': chart_title(option),
+                                         'xaxis.categoryorder': 'array',
+                                         'xaxis.categoryarray': order}))
+        add_variant_menu(fig, variants, SORT_OPTIONS.index(sort_by), x=1, xanchor='right')
+    
     return fig
 
+@cached_figure
 def create_preexisting_conditions_demographics_chart(df):
     """
     Create an interactive chart showing diabetes rates by pre-existing conditions across demographics.
@@ -116,49 +142,21 @@ def create_preexisting_conditions_demographics_chart(df):
     plotly.graph_objects.Figure
         Interactive figure with dropdown to switch between Age and Sex groupings
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Create conditions count (0-5)
-    df['conditions_count'] = 0
-    df.loc[df['stroke'] == 1, 'conditions_count'] += 1
-    df.loc[df['heartdiseaseorattack'] == 1, 'conditions_count'] += 1
-    df.loc[df['highbp'] == 1, 'conditions_count'] += 1
-    df.loc[df['highchol'] == 1, 'conditions_count'] += 1
-    df.loc[df['bmi'] >= 30, 'conditions_count'] += 1
-    
-    # Create binary conditions variable (0 = no conditions, 1 = any conditions)
-    df['conditions_binary'] = 0
-    df.loc[df['conditions_count'] > 0, 'conditions_binary'] = 1
-    
-    # Create age groups
-    df['age_group'] = pd.cut(
-        df['age'],
-        bins=[0, 2, 5, 8, 11, 13],
-        labels=['18-29', '30-44', '45-59', '60-74', '75+'],
-        include_lowest=True
-    )
-    
-    # Create sex mapping
-    sex_mapping = {0: 'Female', 1: 'Male'}
-    df['sex_label'] = df['sex'].map(sex_mapping)
+    # Conditions count (0-5) reduced to any/none, plus age and sex labels
+    def calculate_rates(group_by_col):
+        results = group_rates(df, [group_by_col, 'conditions_binary']).rename(columns={'n': 'Count'})
+        results['diabetes_rate_pct'] = results['rate'] * 100
+        results['Response'] = results['conditions_binary'].map({0: 'No', 1: 'Yes'})
+        return results
     
     # ========== AGE GROUPS ==========
-    age_conditions_grouped = df.groupby(['age_group', 'conditions_binary'], observed=True)['diabetes_binary'].mean().reset_index()
-    age_conditions_grouped['diabetes_rate_pct'] = age_conditions_grouped['diabetes_binary'] * 100
-    age_conditions_grouped['Response'] = age_conditions_grouped['conditions_binary'].map({0: 'No', 1: 'Yes'})
-    age_conditions_counts = df.groupby(['age_group', 'conditions_binary'], observed=True).size().reset_index(name='Count')
-    age_conditions_grouped = age_conditions_grouped.merge(age_conditions_counts, on=['age_group', 'conditions_binary'])
+    age_conditions_grouped = calculate_rates('age_group')
     
     df_age_no = age_conditions_grouped[age_conditions_grouped['Response'] == 'No']
     df_age_yes = age_conditions_grouped[age_conditions_grouped['Response'] == 'Yes']
     
     # ========== SEX GROUPS ==========
-    sex_conditions_grouped = df.groupby(['sex_label', 'conditions_binary'], observed=True)['diabetes_binary'].mean().reset_index()
-    sex_conditions_grouped['diabetes_rate_pct'] = sex_conditions_grouped['diabetes_binary'] * 100
-    sex_conditions_grouped['Response'] = sex_conditions_grouped['conditions_binary'].map({0: 'No', 1: 'Yes'})
-    sex_conditions_counts = df.groupby(['sex_label', 'conditions_binary'], observed=True).size().reset_index(name='Count')
-    sex_conditions_grouped = sex_conditions_grouped.merge(sex_conditions_counts, on=['sex_label', 'conditions_binary'])
+    sex_conditions_grouped = calculate_rates('sex_label')
     
     df_sex_no = sex_conditions_grouped[sex_conditions_grouped['Response'] == 'No']
     df_sex_yes = sex_conditions_grouped[sex_conditions_grouped['Response'] == 'Yes']
@@ -308,6 +306,7 @@ def create_preexisting_conditions_demographics_chart(df):
     return fig
 
 
+@cached_figure
 def create_bmi_categories_chart(df):
     """
     Create a bar chart showing diabetes rates by BMI category.
@@ -330,44 +329,17 @@ def create_bmi_categories_chart(df):
     plotly.graph_objects.Figure
         Bar chart of diabetes rates by BMI category
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Create BMI categories
-    df['bmi_class'] = 0
-    df.loc[df['bmi'] < 18.5, 'bmi_class'] = 0
-    df.loc[(df['bmi'] >= 18.5) & (df['bmi'] < 25), 'bmi_class'] = 1
-    df.loc[(df['bmi'] >= 25) & (df['bmi'] < 30), 'bmi_class'] = 2
-    df.loc[(df['bmi'] >= 30) & (df['bmi'] < 35), 'bmi_class'] = 3
-    df.loc[(df['bmi'] >= 35) & (df['bmi'] < 40), 'bmi_class'] = 4
-    df.loc[(df['bmi'] >= 40), 'bmi_class'] = 5
-    
-    # Calculate data
-    bmi_data = df.groupby('bmi_class')['diabetes_binary'].mean() * 100
-    bmi_counts = df.groupby('bmi_class').size()
+    # BMI class codes 0-5 (see docstring)
+    bmi_data = group_rates(df, 'bmi_class')
+    
+    category_order = BMI_CLASS_LABELS
     
     bmi_df = pd.DataFrame({
-        'Category': bmi_data.index.map({
-            0: 'Underweight (<18.5)',
-            1: 'Healthy (18.5-25)',
-            2: 'Overweight (25-30)',
-            3: 'Class 1 Obesity (30-35)',
-            4: 'Class 2 Obesity (35-40)',
-            5: 'Class 3 Obesity (>40)'
-        }),
-        'Diabetes Rate (%)': bmi_data.values,
-        'Count': bmi_counts.values
+        'Category': [category_order[i] for i in bmi_data['bmi_class']],
+        'Diabetes Rate (%)': bmi_data['rate'].values * 100,
+        'Count': bmi_data['n'].values
     })
     
-    category_order = [
-        'Underweight (<18.5)',
-        'Healthy (18.5-25)',
-        'Overweight (25-30)',
-        'Class 1 Obesity (30-35)',
-        'Class 2 Obesity (35-40)',
-        'Class 3 Obesity (>40)'
-    ]
-    
     bmi_df['Category'] = pd.Categorical(bmi_df['Category'], categories=category_order, ordered=True)
     bmi_df = bmi_df.sort_values('Category')
     
@@ -376,19 +348,19 @@ def create_bmi_categories_chart(df):
     # Color gradient: yellow to dark red
     colors = ["#FFF1A4", '#EEC8A3', '#DD9C7C', '#D24C49', '#A64A47', '#931A23']
     
-    for i, (idx, row) in enumerate(bmi_df.iterrows()):
-        fig.add_trace(go.Bar(
-            x=[row['Category']],
-            y=[row['Diabetes Rate (%)']],
-            name=row['Category'],
-            marker=dict(color=colors[i]),
-            text=[f"{row['Diabetes Rate (%)']:.1f}"],
-            textposition='outside',
-            textfont=dict(size=11),
-            customdata=[[row['Category'], row['Diabetes Rate (%)'], row['Count']]],
-            hovertemplate='<b>%{customdata[0]}</b><br>Diabetes Rate (%): %{customdata[1]:.1f}<br>Count: %{customdata[2]:,}<extra></extra>',
-            showlegend=True,
-        ))
+    # One trace for all bars, coloured per point (the x axis names each category)
+    fig.add_trace(go.Bar(
+        x=bmi_df['Category'].astype(str),
+        y=bmi_df['Diabetes Rate (%)'],
+        name='Diabetes Rate',
+        marker=dict(color=colors[:len(bmi_df)]),
+        text=[f"{val:.1f}" for val in bmi_df['Diabetes Rate (%)']],
+        textposition='outside',
+        textfont=dict(size=11),
+        customdata=bmi_df[['Count']],
+        hovertemplate='<b>%{x}</b><br>Diabetes Rate (%): %{y:.1f}<br>Count: %{customdata[0]:,}<extra></extra>',
+        showlegend=False,
+    ))
     
     fig.update_layout(
         title=dict(
@@ -425,14 +397,6 @@ def create_bmi_categories_chart(df):
         plot_bgcolor='white',
         paper_bgcolor='white',
         hovermode='closest',
-        legend=dict(
-            title='BMI Category',
-            orientation='v',
-            yanchor='top',
-            y=1,
-            xanchor='left',
-            x=1.02
-        )
     )
     
     fig.update_yaxes(range=[0, 100])
@@ -440,6 +404,7 @@ def create_bmi_categories_chart(df):
     return fig
 
 
+@cached_figure
 def create_condition_count_chart(df):
     
     """
@@ -457,21 +422,11 @@ def create_condition_count_chart(df):
     plotly.graph_objects.Figure
         Bar chart of diabetes rates by condition count
     """
-    df = df.copy()
-    df.columns = df.columns.str.lower()
-    
-    # Count number of pre-existing conditions
+    # Number of pre-existing conditions
     # Conditions: stroke, heartdiseaseorattack, highbp, highchol, bmi >= 30
-    df['condition_count'] = (
-        df['stroke'].astype(int) + 
-        df['heartdiseaseorattack'].astype(int) + 
-        df['highbp'].astype(int) + 
-        df['highchol'].astype(int) +
-        (df['bmi'] >= 30).astype(int)
-    )
-    
-    cond_data = df.groupby('condition_count')['diabetes_binary'].mean() * 100
-    cond_counts = df.groupby('condition_count').size()
+    cond_data = group_rates(df, 'condition_count').set_index('condition_count')
+    cond_counts = cond_data['n']
+    cond_data = cond_data['rate'] * 100
     
     condition_labels = {
         0: 'No Conditions',
@@ -493,18 +448,18 @@ def create_condition_count_chart(df):
     # Color gradient from yellow to dark red
     colors = ["#FFF1A4", '#EEC8A3', '#DD9C7C', '#D24C49', '#A64A47', '#931A23']
     
-    for i, (idx, row) in enumerate(cond_df.iterrows()):
-        fig.add_trace(go.Bar(
-            x=[row['Conditions']],
-            y=[row['Diabetes Rate (%)']],
-            name=row['Conditions'],
-            marker=dict(color=colors[i]),
-            text=[f"{row['Diabetes Rate (%)']:.1f}%"],
-            textposition='outside',
-            customdata=[[row['Count']]],
-            hovertemplate='<b>%{x}</b><br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0][0]:,}<extra></extra>',
-            showlegend=False,
-        ))
+    # One trace for all bars, coloured per point
+    fig.add_trace(go.Bar(
+        x=cond_df['Conditions'],
+        y=cond_df['Diabetes Rate (%)'],
+        name='Diabetes Rate',
+        marker=dict(color=colors[:len(cond_df)]),
+        text=[f"{val:.1f}%" for val in cond_df['Diabetes Rate (%)']],
+        textposition='outside',
+        customdata=cond_df[['Count']],
+        hovertemplate='<b>%{x}</b><br>Diabetes Rate: %{y:.1f}%<br>Count: %{customdata[0]:,}<extra></extra>',
+        showlegend=False,
+    ))
     
     fig.update_layout(
         title="Diabetes Rate by Number of Pre-Existing Conditions",
@@ -1,68 +1,119 @@
 """
 introduction.py - Interactive Human Body Diagram for Diabetes Education
-VERSION: Base64 Embedded Images (No File Path Issues)
+VERSION: Resized, Cached Images (see assets.py)
 
-This version converts images to base64 so they work everywhere in Streamlit.
+Images are shrunk to their on-screen size once per process and embedded as small data URIs
+(or served as static files), so they work everywhere in Streamlit.
 """
 
 import plotly.graph_objects as go
 import streamlit as st
-import os
-import base64
 
-
-def image_to_base64(image_path):
-    """
-    Convert an image file to base64 string for embedding in Plotly.
-    
-    Args:
-        image_path (str): Path to image file
-        
-    Returns:
-        str: Base64 encoded image URI
+from assets import image_source
+from figure_cache import cached_figure
+from profiling import span
+
+# ============================================================================
+# DIAGRAM DATA
+# ============================================================================
+
+# Layout images in drawing order; the organ index is the position in this list (0 = base body)
+ORGAN_IMAGES = [
+    # (organ, file, x, y, sizex, sizey, layer, opacity)
+    ('Base body', "base_body.jpg", 0.265, 1, 1, 1, "below", None),
+    ('Arteries', "arteries.png", 0.255, 0.83, 0.8, 0.7, "above", 0.2),          # 1
+    ('Pancreas', "pancreas.png", 0.361, 0.60, 0.09, 0.09, "below", 0.2),        # 2
+    ('Left Kidney', "leftkidney.png", 0.345, 0.61, 0.08, 0.08, "below", 0.2),   # 3
+    ('Right Kidney', "rightkidney.png", 0.395, 0.61, 0.08, 0.08, "below", 0.2), # 4
+    ('Stomach', "stomach.png", 0.338, 0.70, 0.16, 0.16, "above", 0.2),          # 5
+    ('Liver', "liver.png", 0.33, 0.70, 0.16, 0.16, "above", 0.2),               # 6
+    ('Heart', "heart.png", 0.35, 0.78, 0.17, 0.13, "above", 0.2),               # 7
+    ('Lungs', "lungs.png", 0.33, 0.85, 0.22, 0.22, "above", 0.2),               # 8
+    ('Brain', "brain.png", 0.335, 1.02, 0.15, 0.15, "above", 0.2),              # 9
+]
+
+# Hover points (arteries are plotted 3 times so users can find them easily)
+ORGAN_HOVERS = [
+    # (organ, x, y, info, affected by, organ index)
+    ('Brain', 2.237, 19, 'Controls the nervous system',
+     'Stroke, High BP, Mental Health, High Cholesterol, and Heavy Alcohol Consumptions', 9),
+    ('Heart', 2.2, 14, 'Pumps blood',
+     'High Cholesterol, High BP, Stroke, Smoker, and Heart Disease or Attack', 7),
+    ('Liver', 2.1, 13, 'Filters blood', 'High Cholesterol and Heavy Alcohol Consumptions', 6),
+    ('Pancreas', 2.2, 11.5, 'Produces insulin', 'Heavy Alcohol Consumptions', 2),
+    ('Left Kidney', 2.1, 11.3, 'Filter blood', 'High BP, Heavy Alcohol Consumptions', 3),
+    ('Right Kidney', 2.25, 11.3, 'Filter blood', 'High BP, Heavy Alcohol Consumptions', 4),
+    ('Stomach', 2.2, 12.5, 'Digests Food', '-', 5),
+    ('Lungs', 2.2, 15, 'Oxygen exchange', 'Smoker', 8),
+    ('Arteries', 2.5, 12, 'Carries Oxygen to the body',
+     'High Cholesterol, High BP, Stroke, and Heart Disease or Attack', 1),
+    ('Arteries', 2.35, 16, 'Carries Oxygen to the body',
+     'High Cholesterol, High BP, Stroke, and Heart Disease or Attack', 1),
+    ('Arteries', 2.3, 8, 'Carries Oxygen to the body',
+     'High Cholesterol, High BP, Stroke, and Heart Disease or Attack', 1),
+]
+
+# Conditions in the dropdown and the organ indices they highlight
+CONDITIONS = {
+    'None': [0],  # none
+    'Show All': [1, 2, 3, 4, 5, 6, 7, 8, 9],  # all organs
+    'High Cholesterol': [1, 6, 7, 9],  # arteries, liver, heart, brain
+    'High Blood Pressure': [1, 7, 9, 3, 4],  # arteries, heart, brain, kidneys
+    'Heavy Alcohol Consumptions': [2, 3, 4, 6, 9],  # pancreas, kidneys, liver, brain
+    'Mental Health': [9],  # brain
+    'Stroke': [9, 7, 1],  # brain, heart, arteries
+    'Heart Disease or Attack': [7, 1],  # heart, arteries
+    'Smoker': [7, 8],  # lungs, heart
+}
+
+HIGHLIGHT_OPACITY = 1.0
+GRAYED_OPACITY = 0.3
+
+
+def condition_states(image_positions):
     """
-    try:
-        with open(image_path, 'rb') as img_file:
-            img_data = base64.b64encode(img_file.read()).decode()
-            # Determine file extension
-            if image_path.lower().endswith('.jpg') or image_path.lower().endswith('.jpeg'):
-                return f"data:image/jpeg;base64,{img_data}"
-            elif image_path.lower().endswith('.png'):
-                return f"data:image/png;base64,{img_data}"
-    except FileNotFoundError:
-        print(f"Warning: Image file not found: {image_path}")
-        return None
+    Precompute the dropdown state of every condition.
 
+    Parameters:
+    -----------
+    image_positions : dict
+        Organ index -> position of its image in ``fig.layout.images``
+        (organs whose image is missing are left out)
 
-def get_image_path(filename):
-    """
-    Get the full path to an image file.
-    Checks multiple possible locations.
-    
-    Args:
-        filename (str): Name of the image file
-        
     Returns:
-        str: Full path to image file or None if not found
+    --------
+    list of dict
+        One plotly "update" button per condition: hover trace visibility and image opacities
     """
-    possible_paths = [
-        filename,
-        os.path.join(os.path.dirname(__file__), filename),
-        os.path.join('images', filename),
-        os.path.join(os.path.dirname(__file__), 'images', filename),
-    ]
-    
-    for path in possible_paths:
-        if os.path.exists(path):
-            return os.path.abspath(path)
-    
-    return None
+    buttons = []
+    for condition_name, organ_indices in CONDITIONS.items():
+        highlighted = set(organ_indices)
+        # Gray out all organs or highlight based on selection
+        opacities = {
+            f'images[{position}].opacity': HIGHLIGHT_OPACITY if organ in highlighted else GRAYED_OPACITY
+            for organ, position in image_positions.items() if organ > 0
+        }
+        visible_traces = [hover[5] in highlighted for hover in ORGAN_HOVERS]
+        buttons.append(dict(
+            label=condition_name,
+            method="update",
+            args=[{"visible": visible_traces}, opacities]
+        ))
+    return buttons
+
 
+# ============================================================================
+# FIGURE
+# ============================================================================
 
+@cached_figure
 def create_body_diagram():
     """
     Create an interactive human body diagram showing how diabetes affects different organs.
-    Uses base64 embedded images for reliable display in Streamlit.
+    Uses images prepared by assets.image_source for reliable display in Streamlit.
+    
+    The organs, hover points and conditions come from the tables above; the
+    figure is built once per process and served from the figure cache after that.
     
     Returns:
         plotly.graph_objects.Figure: Interactive body diagram
@@ -71,246 +122,25 @@ def create_body_diagram():
     # Creating the base figure
     fig = go.Figure()
 
-    # Get image paths and convert to base64
-    print("Loading images...")
-    
-    # Base body
-    base_body_path = get_image_path("base_body.jpg")
-    if base_body_path:
-        base_body_b64 = image_to_base64(base_body_path)
-        if base_body_b64:
-            fig.add_layout_image(
-                source=base_body_b64,
-                x=0.265, y=1, sizex=1, sizey=1,
-                xref="paper", yref="paper",
-                layer="below"
-            )
-
-    # Arteries 1
-    arteries_path = get_image_path("arteries.png")
-    if arteries_path:
-        arteries_b64 = image_to_base64(arteries_path)
-        if arteries_b64:
-            fig.add_layout_image(
-                source=arteries_b64,
-                x=0.255, y=0.83, sizex=0.8, sizey=0.7,
-                xref="paper", yref="paper",
-                layer="above",
-                opacity=0.2
-            )
-
-    # Pancreas 2
-    pancreas_path = get_image_path("pancreas.png")
-    if pancreas_path:
-        pancreas_b64 = image_to_base64(pancreas_path)
-        if pancreas_b64:
-            fig.add_layout_image(
-                source=pancreas_b64,
-                x=0.361, y=0.60, sizex=0.09, sizey=0.09,
-                xref="paper", yref="paper",
-                layer="below",
-                opacity=0.2
-            )
-    
-    # Left Kidney 3
-    left_kidney_path = get_image_path("leftkidney.png")
-    if left_kidney_path:
-        left_kidney_b64 = image_to_base64(left_kidney_path)
-        if left_kidney_b64:
-            fig.add_layout_image(
-                source=left_kidney_b64,
-                x=0.345, y=0.61, sizex=0.08, sizey=0.08,
-                xref="paper", yref="paper",
-                layer="below",
-                opacity=0.2
-            )
-
-    # Right Kidney 4
-    right_kidney_path = get_image_path("rightkidney.png")
-    if right_kidney_path:
-        right_kidney_b64 = image_to_base64(right_kidney_path)
-        if right_kidney_b64:
+    # Images are resized to their on-screen size and cached once per process (see assets.py)
+    image_positions = {}
+    for organ, (_, filename, x, y, sizex, sizey, layer, opacity) in enumerate(ORGAN_IMAGES):
+        source = image_source(filename, sizex, sizey)
+        if source:
+            image_positions[organ] = len(fig.layout.images)
             fig.add_layout_image(
-                source=right_kidney_b64,
-                x=0.395, y=0.61, sizex=0.08, sizey=0.08,
+                source=source,
+                x=x, y=y, sizex=sizex, sizey=sizey,
                 xref="paper", yref="paper",
-                layer="below",
-                opacity=0.2
+                layer=layer,
+                opacity=opacity
             )
 
-    # Stomach 5
-    stomach_path = get_image_path("stomach.png")
-    if stomach_path:
-        stomach_b64 = image_to_base64(stomach_path)
-        if stomach_b64:
-            fig.add_layout_image(
-                source=stomach_b64,
-                x=0.338, y=0.70, sizex=0.16, sizey=0.16,
-                xref="paper", yref="paper",
-                layer="above",
-                opacity=0.2
-            )
-
-    # Liver 6
-    liver_path = get_image_path("liver.png")
-    if liver_path:
-        liver_b64 = image_to_base64(liver_path)
-        if liver_b64:
-            fig.add_layout_image(
-                source=liver_b64,
-                x=0.33, y=0.70, sizex=0.16, sizey=0.16,
-                xref="paper", yref="paper",
-                layer="above",
-                opacity=0.2
-            )
-
-    # Heart 7
-    heart_path = get_image_path("heart.png")
-    if heart_path:
-        heart_b64 = image_to_base64(heart_path)
-        if heart_b64:
-            fig.add_layout_image(
-                source=heart_b64,
-                x=0.35, y=0.78, sizex=0.17, sizey=0.13,
-                xref="paper", yref="paper",
-                layer="above",
-                opacity=0.2
-            )
-
-    # Lungs 8 
-    lungs_path = get_image_path("lungs.png")
-    if lungs_path:
-        lungs_b64 = image_to_base64(lungs_path)
-        if lungs_b64:
-            fig.add_layout_image(
-                source=lungs_b64,
-                x=0.33, y=0.85, sizex=0.22, sizey=0.22,
-                xref="paper", yref="paper",
-                layer="above",
-                opacity=0.2
-            )
-
-    # Brain 9
-    brain_path = get_image_path("brain.png")
-    if brain_path:
-        brain_b64 = image_to_base64(brain_path)
-        if brain_b64:
-            fig.add_layout_image(
-                source=brain_b64,
-                x=0.335, y=1.02, sizex=0.15, sizey=0.15,
-                xref="paper", yref="paper",
-                layer="above",
-                opacity=0.2
-            )
-
-    print("Images loaded successfully!")
-
-    # Stores all the Hover data
-    hover_data = [
-        # Hover for Brain
-        {
-            'name': 'Brain', 
-            'x': 2.237, 
-            'y': 19, 
-            'info': 'Controls the nervous system',
-            'affected_by': 'Stroke, High BP, Mental Health, High Cholesterol, and Heavy Alcohol Consumptions', 
-            'index': 9
-        },
-        # Hover for Heart
-        {
-            'name': 'Heart', 
-            'x': 2.2, 
-            'y': 14, 
-            'info': 'Pumps blood',
-            'affected_by': 'High Cholesterol, High BP, Stroke, Smoker, and Heart Disease or Attack',
-            'index': 7
-        },
-        # Hover for Liver
-        {
-            'name': 'Liver', 
-            'x': 2.1, 
-            'y': 13, 
-            'info': 'Filters blood', 
-            'affected_by': 'High Cholesterol and Heavy Alcohol Consumptions',
-            'index': 6
-        },
-        # Hover for Pancreas
-        {
-            'name': 'Pancreas', 
-            'x': 2.2, 
-            'y': 11.5,
-            'info': 'Produces insulin', 
-            'affected_by': 'Heavy Alcohol Consumptions',
-            'index': 2
-        },
-        # Hover for Left Kidney
-        {
-            'name': 'Left Kidney', 
-            'x': 2.1, 
-            'y': 11.3, 
-            'info': 'Filter blood', 
-            'affected_by': 'High BP, Heavy Alcohol Consumptions',
-            'index': 3
-        },
-        # Hover for Right Kidney
-        {
-            'name': 'Right Kidney', 
-            'x': 2.25, 
-            'y': 11.3, 
-            'info': 'Filter blood', 
-            'affected_by': 'High BP, Heavy Alcohol Consumptions',
-            'index': 4
-        },
-        # Hover for Stomach
-        {
-            'name': 'Stomach', 
-            'x': 2.2, 
-            'y': 12.5, 
-            'info': 'Digests Food', 
-            'affected_by': '-', 
-            'index': 5
-        },
-        # Hover for Lungs
-        {
-            'name': 'Lungs', 
-            'x': 2.2, 
-            'y': 15,
-            'info': 'Oxygen exchange',
-            'affected_by': 'Smoker',
-            'index': 8
-        },
-        # Hover for Arteries (Plotted 3 times so user can find them easily!)
-        {
-            'name': 'Arteries', 
-            'x': 2.5, 
-            'y': 12,
-            'info': 'Carries Oxygen to the body',
-            'affected_by': 'High Cholesterol, High BP, Stroke, and Heart Disease or Attack',
-            'index': 1
-        },
-        {
-            'name': 'Arteries', 
-            'x': 2.35, 
-            'y': 16,
-            'info': 'Carries Oxygen to the body',
-            'affected_by': 'High Cholesterol, High BP, Stroke, and Heart Disease or Attack',
-            'index': 1
-        },
-        {
-            'name': 'Arteries', 
-            'x': 2.3, 
-            'y': 8,
-            'info': 'Carries Oxygen to the body',
-            'affected_by': 'High Cholesterol, High BP, Stroke, and Heart Disease or Attack',
-            'index': 1
-        }
-    ]
-
-    # Creating for loop for the hover tooltips
-    for organ in hover_data:
+    # Hover tooltips (hidden markers, shown per condition)
+    for name, x, y, info, affected_by, _ in ORGAN_HOVERS:
         fig.add_trace(go.Scatter(
-            x=[organ['x']],
-            y=[organ['y']],
+            x=[x],
+            y=[y],
             mode='markers',
             marker=dict(size=30, opacity=0),  # Opacity is 0 because scatter plot is hidden
             hovertemplate=(
@@ -320,7 +150,7 @@ def create_body_diagram():
                 'Affected by: %{customdata[2]}'
                 '<extra></extra>'
             ),
-            customdata=[[organ['name'], organ['info'], organ['affected_by']]],
+            customdata=[[name, info, affected_by]],
             hoverlabel=dict(
                 font= dict(color='black'),
                 bgcolor="#EEC8A3",
@@ -329,51 +159,6 @@ def create_body_diagram():
             visible=False
         ))
 
-    # Define conditions and affected organs
-    conditions = {
-        'None': [0],  # none
-        'Show All': [1, 2, 3, 4, 5, 6, 7, 8, 9],  # all organs
-        'High Cholesterol': [1, 6, 7, 9],  # arteries, liver, heart, brain
-        'High Blood Pressure': [1, 7, 9, 3, 4],  # arteries, heart, brain, kidneys
-        'Heavy Alcohol Consumptions': [2, 3, 4, 6, 9],  # pancreas, kidneys, liver, brain
-        'Mental Health': [9],  # brain
-        'Stroke': [9, 7, 1],  # brain, heart, arteries
-        'Heart Disease or Attack': [7, 1],  # heart, arteries
-        'Smoker': [7, 8],  # lungs, heart
-    }
-
-    # Create dropdown buttons
-    dropdown_buttons = []
-
-    for condition_name, organ_indices in conditions.items():
-        update_dict = {}
-        
-        # Gray out all organs or highlight based on selection
-        for i in range(1, 10):
-            if i in organ_indices:
-                update_dict[f'images[{i}].opacity'] = 1.0  # Highlight
-            else:
-                update_dict[f'images[{i}].opacity'] = 0.3  # Gray out
-        
-        visible_traces = []
-        for organ in hover_data:
-            if organ['index'] in organ_indices:
-                visible_traces.append(True)   # Show hover
-            else:
-                visible_traces.append(False)  # Hide hover
-        
-        # Create button
-        dropdown_buttons.append(
-            dict(
-                label=condition_name,
-                method="update",
-                args=[
-                    {"visible": visible_traces},  # Update traces (hover)
-                    update_dict
-                ]
-            )
-        )
-
     # Update layout with dropdown
     fig.update_layout(
         xaxis_visible=False,
@@ -389,7 +174,7 @@ def create_body_diagram():
         hovermode='closest',
         updatemenus=[
             dict(
-                buttons=dropdown_buttons,
+                buttons=condition_states(image_positions),
                 direction="down",
                 pad={"r": 25, "t": 60},
                 showactive=True,
@@ -418,8 +203,9 @@ def display_body_diagram():
     Use the dropdown below to explore which organs are affected by different conditions:
     """)
     
-    fig = create_body_diagram()
-    st.plotly_chart(fig, use_container_width=True , use_container_height=True)
+    fig, nbytes = create_body_diagram.sized()
+    with span("plotly_chart", "create_body_diagram", bytes=nbytes):
+        st.plotly_chart(fig, width="stretch")
     
     st.info("""
     💡 **Did you know?**
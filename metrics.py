@@ -0,0 +1,261 @@
+"""
+metrics.py - Prometheus Metrics Export
+Module for exporting render latency and cache efficiency in the Prometheus text exposition format.
+
+The numbers come from the profiling spans of each finished rerun (see profiling.py) plus the
+figure cache counters, so nothing extra is timed on the hot paths:
+
+- ``dashboard_rerun_seconds{page}``: whole script run per page; a fragment rerun (a selectbox
+  change) is labelled ``<page module>/<fragment>``, e.g. ``hypothesis_h1/physical_activity_chart``
+- ``dashboard_chart_seconds{chart, stage}``: ``create`` (builder call, cached or not) and
+  ``plotly_chart`` (serialization and send) per chart
+- ``dashboard_chart_payload_bytes{chart}``: figure JSON bytes per ``st.plotly_chart`` call
+- ``dashboard_dataset_load_seconds``: ``load_dataset`` per rerun (cold loads land in the top buckets)
+- ``dashboard_figure_cache_*``: hits, misses, evictions, entries and bytes
+
+Export is opt-in and configured from the environment when app.py calls ``start()``:
+
+- ``DASHBOARD_METRICS_FILE=/path/dashboard.prom`` rewrites the file (atomically) at most every
+  ``WRITE_INTERVAL`` seconds, e.g. for node_exporter's textfile collector
+- ``DASHBOARD_METRICS_PORT=9464`` serves ``/metrics`` from a local HTTP thread
+"""
+
+import bisect
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import profiling
+from figure_cache import FIGURE_CACHE
+
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+BYTES_BUCKETS = [2**k for k in range(12, 22)]   # 4 KiB - 2 MiB
+WRITE_INTERVAL = 10.0
+HOST = "127.0.0.1"
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Thread-safe Prometheus histogram with a fixed label set.
+
+    Parameters:
+    -----------
+    name : str
+        Metric name
+    help : str
+        One-line description
+    buckets : list of float
+        Upper bounds, ascending (``+Inf`` is added)
+    labelnames : tuple of str
+        Label names, in the order ``observe`` receives their values
+    """
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = list(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}   # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        """Exposition lines for every label combination seen so far."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for labelvalues, values in series:
+            pairs = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(pairs + [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(pairs + [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {_number(values[-2])}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {values[-1]}")
+        return lines
+
+
+RERUN_SECONDS = Histogram("dashboard_rerun_seconds", "Script run time per page or fragment rerun.",
+                          LATENCY_BUCKETS, ("page",))
+CHART_SECONDS = Histogram("dashboard_chart_seconds",
+                          "Chart time per stage: create (builder call) and plotly_chart (serialize and send).",
+                          LATENCY_BUCKETS, ("chart", "stage"))
+CHART_BYTES = Histogram("dashboard_chart_payload_bytes", "Figure JSON bytes per st.plotly_chart call.",
+                        BYTES_BUCKETS, ("chart",))
+DATASET_LOAD_SECONDS = Histogram("dashboard_dataset_load_seconds", "load_dataset time per rerun.",
+                                 LATENCY_BUCKETS)
+
+HISTOGRAMS = [RERUN_SECONDS, CHART_SECONDS, CHART_BYTES, DATASET_LOAD_SECONDS]
+
+
+def observe_rerun(profile):
+    """Profiling listener: add one finished rerun to the histograms."""
+    RERUN_SECONDS.observe(profile.total_ms / 1000, profile.label or "unknown")
+    for item in profile.spans:
+        if item["name"] == "load_dataset":
+            DATASET_LOAD_SECONDS.observe(item["ms"] / 1000)
+        elif item["name"] == "create" and item["depth"] == 0:
+            CHART_SECONDS.observe(item["ms"] / 1000, item["detail"], "create")
+        elif item["name"] == "plotly_chart":
+            CHART_SECONDS.observe(item["ms"] / 1000, item["detail"], "plotly_chart")
+            if item.get("bytes") is not None:
+                CHART_BYTES.observe(item["bytes"], item["detail"])
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format.
+
+    Returns:
+    --------
+    str
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+
+    stats = FIGURE_CACHE.stats()
+    for key, kind, help in [
+        ("hits", "counter", "Figure cache lookups that found a figure."),
+        ("misses", "counter", "Figure cache lookups that had to build the figure."),
+        ("waits", "counter", "Figure cache lookups that waited for another caller's build of the figure."),
+        ("evictions", "counter", "Figures evicted to stay within the cache budget."),
+        ("entries", "gauge", "Figures currently cached."),
+        ("bytes", "gauge", "Serialized size of the cached figures."),
+    ]:
+        name = f"dashboard_figure_cache_{key}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {stats[key]}"]
+
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+_LOCK = threading.Lock()
+_started = False
+_last_write = 0.0
+
+
+def write_file(path):
+    """
+    Write the metrics to ``path`` atomically (write a temporary file, then rename).
+
+    The temporary file gets a unique name next to ``path``, so sessions or processes writing
+    the same file at once never share it.
+    """
+    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path) or ".", prefix=".metrics-",
+                                     suffix=".tmp", delete=False) as out:
+        out.write(render())
+    try:
+        os.chmod(out.name, 0o644)   # NamedTemporaryFile is private; collectors must read it
+        os.replace(out.name, path)
+    except OSError:
+        os.remove(out.name)
+        raise
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves ``render()`` at /metrics."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host=HOST):
+    """
+    Serve /metrics from a daemon thread.
+
+    Returns:
+    --------
+    ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start():
+    """
+    Enable metrics as configured by ``DASHBOARD_METRICS_FILE`` / ``DASHBOARD_METRICS_PORT``.
+
+    Safe to call on every rerun: only the first call per process does anything.
+
+    Returns:
+    --------
+    bool
+        Whether metrics are being collected
+    """
+    global _started
+    path = os.environ.get("DASHBOARD_METRICS_FILE")
+    port = os.environ.get("DASHBOARD_METRICS_PORT")
+    if not path and not port:
+        return False
+
+    with _LOCK:
+        if _started:
+            return True
+        _started = True
+        profiling.LISTENERS.append(observe_rerun)
+        if path:
+            profiling.LISTENERS.append(lambda profile: _write_periodically(path))
+        if port:
+            try:
+                serve(int(port))
+            except OSError as exc:
+                print(f"Warning: metrics endpoint not started on port {port}: {exc}")
+    return True
+
+
+def _write_periodically(path):
+    """Profiling listener: rewrite the metrics file if the last write is older than ``WRITE_INTERVAL``."""
+    global _last_write
+    now = time.monotonic()
+    with _LOCK:
+        if now - _last_write < WRITE_INTERVAL:
+            return
+        _last_write = now
+        write_file(path)
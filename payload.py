@@ -0,0 +1,91 @@
+"""
+payload.py - Figure Payload Instrumentation
+Module for measuring the JSON that each chart sends to the browser.
+
+``st.plotly_chart`` serializes the whole figure on every rerun that renders it, so the JSON size
+is paid both in server time and in bytes over the websocket. ``figure_cache.cached_figure``
+measures every figure once, when it is built, and records it in ``PAYLOADS``; the payload
+benchmark checks the records against ``BUDGET_BYTES``.
+
+Figures are sent as the builders make them. Rewriting them for size (rounded floats, typed
+arrays, texttemplates) saved under 0.5 KiB of the ~310 KiB the charts send, most of which is
+the body diagram's images, so it isn't done.
+"""
+
+import threading
+import time
+
+BUDGET_BYTES = 256 * 1024
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def measure(fig):
+    """
+    Serialize a figure the way ``st.plotly_chart`` does.
+
+    Returns:
+    --------
+    tuple
+        (JSON size in bytes, serialization time in milliseconds)
+    """
+    start = time.perf_counter()
+    nbytes = len(fig.to_json())
+    return nbytes, (time.perf_counter() - start) * 1000
+
+
+class PayloadLog:
+    """
+    Thread-safe record of the latest size and serialization time per chart and dataset.
+
+    The same builder call draws a different figure for each dataset version and cohort, so
+    records are kept per ``dataset`` (any hashable key, e.g. ``figure_cache.dataset_key``).
+
+    Parameters:
+    -----------
+    budget : int
+        Largest acceptable figure JSON size in bytes
+    """
+
+    def __init__(self, budget=BUDGET_BYTES):
+        self.budget = budget
+        self._records = {}   # (dataset, label) -> (bytes, ms)
+        self._lock = threading.Lock()
+
+    def record(self, label, nbytes, ms, dataset=None):
+        with self._lock:
+            self._records[dataset, label] = (nbytes, ms)
+
+    def get(self, label, dataset=None):
+        """The latest (bytes, ms) recorded for a chart on a dataset, or None."""
+        with self._lock:
+            return self._records.get((dataset, label))
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def report(self):
+        """
+        Records sorted by size, largest first.
+
+        Returns:
+        --------
+        list of dict
+            label, dataset, bytes, ms and over_budget for each chart and dataset
+        """
+        with self._lock:
+            records = list(self._records.items())
+        return [
+            {"label": label, "dataset": dataset, "bytes": nbytes, "ms": ms, "over_budget": nbytes > self.budget}
+            for (dataset, label), (nbytes, ms) in sorted(records, key=lambda item: item[1][0], reverse=True)
+        ]
+
+    def over_budget(self):
+        """Records larger than the budget."""
+        return [row for row in self.report() if row["over_budget"]]
+
+
+PAYLOADS = PayloadLog()
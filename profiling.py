@@ -0,0 +1,203 @@
+"""
+profiling.py - Rerun Profiling
+Module for timing the dashboard's hot paths within each Streamlit rerun.
+
+Profiling is opt-in: set ``DASHBOARD_PROFILING=1`` in the environment (or ``ENABLED = True``)
+and app.py opens a ``RerunProfile`` at the top of every script run and closes it at the end.
+Code on the hot paths wraps itself in ``span(name, detail)``:
+
+- dataset load (app.py)
+- every ``create_*`` call, cache hit or not, and the figure's serialization (figure_cache.py)
+- every ``st.plotly_chart`` call
+
+Spans are recorded into the profile of the thread running the script, so concurrent sessions
+and the warm-up threads never mix their span lists, and a span outside a profiled rerun (or with
+profiling off) costs one attribute lookup. app.py's fragments open their own profile when
+they rerun on their own (labelled ``<page module>/<fragment>``).
+
+With ``TRACE_ALLOCATIONS`` each span also records the change in traced memory while it ran
+(tracemalloc), which slows every allocation in the process while profiling is on. tracemalloc
+counts the whole process, so this delta includes whatever concurrent sessions and the warm-up
+pool allocated or freed meanwhile; it is exact only while nothing else is running.
+
+``begin_rerun(capture=True)`` additionally runs the rerun under cProfile and writes the
+pstats dump to ``PROFILE_DIR`` when the rerun ends. A rerun interrupted before ``end_rerun``
+(a newer rerun or a stop request raises out of the script) is closed by the next
+``begin_rerun`` on its thread, which detaches its profiler and writes what it captured.
+
+Other modules can subscribe to finished profiles by appending a callable to ``LISTENERS``
+(metrics.py does); reruns are then timed even with the panel off, without allocation tracing.
+"""
+
+import contextlib
+import cProfile
+import datetime
+import os
+import threading
+import time
+import tracemalloc
+
+ENABLED = os.environ.get("DASHBOARD_PROFILING", "") not in ("", "0")
+TRACE_ALLOCATIONS = True
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+LISTENERS = []   # callables receiving each finished RerunProfile
+
+_local = threading.local()
+
+
+class RerunProfile:
+    """
+    Spans recorded during one script run.
+
+    Parameters:
+    -----------
+    label : str
+        What was rendered, e.g. the page name
+    capture : bool
+        Run the rerun under cProfile and dump the stats when it ends
+    """
+
+    def __init__(self, label=None, capture=False):
+        self.label = label
+        self.spans = []   # dicts in the order the spans finished
+        self.total_ms = None
+        self.dump_path = None
+        self._depth = 0
+        self._start = time.perf_counter()
+        self._profiler = cProfile.Profile() if capture else None
+
+    @property
+    def finished(self):
+        return self.total_ms is not None
+
+    def record(self, name, detail, ms, alloc_kib, depth, **fields):
+        self.spans.append({"name": name, "detail": detail, "ms": ms, "alloc_kib": alloc_kib, "depth": depth,
+                           **fields})
+
+    def totals(self):
+        """
+        Time per span name, outermost spans only, slowest first.
+
+        Returns:
+        --------
+        list of dict
+            name, calls, ms and alloc_kib (process-wide, see ``span``) for each span name
+        """
+        totals = {}
+        for item in self.spans:
+            if item["depth"] > 0:
+                continue
+            row = totals.setdefault(item["name"], {"name": item["name"], "calls": 0, "ms": 0.0, "alloc_kib": 0.0})
+            row["calls"] += 1
+            row["ms"] += item["ms"]
+            row["alloc_kib"] += item["alloc_kib"] or 0.0
+        return sorted(totals.values(), key=lambda row: row["ms"], reverse=True)
+
+
+def current():
+    """The profile of the rerun running on this thread, or None."""
+    profile = getattr(_local, "profile", None)
+    if profile is None or profile.finished:
+        return None
+    return profile
+
+
+def begin_rerun(label=None, capture=False):
+    """
+    Start profiling the script run on this thread.
+
+    Returns:
+    --------
+    RerunProfile or None
+        The new profile, or None if profiling is disabled and nobody listens
+    """
+    _abandon(getattr(_local, "profile", None))
+    if not ENABLED and not LISTENERS:
+        _local.profile = None
+        return None
+    if ENABLED and TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    profile = RerunProfile(label, capture)
+    _local.profile = profile
+    if profile._profiler is not None:
+        profile._profiler.enable()
+    return profile
+
+
+def end_rerun():
+    """
+    Finish the profile of this thread's script run, writing the cProfile dump if one was requested.
+
+    Returns:
+    --------
+    RerunProfile or None
+        The finished profile
+    """
+    profile = current()
+    if profile is None:
+        return None
+    _dump(profile)
+    profile.total_ms = (time.perf_counter() - profile._start) * 1000
+    for listener in LISTENERS:
+        try:
+            listener(profile)
+        except Exception as exc:
+            print(f"Warning: profiling listener failed: {exc}")
+    return profile
+
+
+def _dump(profile, suffix=""):
+    """Detach the profile's cProfile profiler, if any, and write its stats to ``PROFILE_DIR``."""
+    if profile._profiler is None:
+        return
+    profile._profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    profile.dump_path = os.path.join(PROFILE_DIR, f"rerun-{stamp}{suffix}.prof")
+    profile._profiler.dump_stats(profile.dump_path)
+    profile._profiler = None
+
+
+def _abandon(profile):
+    """Close a profile whose rerun stopped before ``end_rerun`` (listeners are not told)."""
+    if profile is None or profile.finished:
+        return
+    _dump(profile, "-interrupted")
+    profile.total_ms = (time.perf_counter() - profile._start) * 1000
+
+
+@contextlib.contextmanager
+def span(name, detail=None, **fields):
+    """
+    Time the enclosed block into the current rerun's profile (a no-op outside one).
+
+    With allocation tracing on, ``alloc_kib`` is the process-wide change in traced
+    memory during the block, including other threads' allocations.
+
+    Parameters:
+    -----------
+    name : str
+        What is being timed, e.g. ``"build"`` or ``"plotly_chart"``
+    detail : str
+        Which one, e.g. the builder name
+    **fields
+        Extra values stored with the span, e.g. ``bytes`` sent by a chart
+    """
+    profile = current()
+    if profile is None:
+        yield
+        return
+
+    tracing = tracemalloc.is_tracing()
+    before = tracemalloc.get_traced_memory()[0] if tracing else None
+    depth = profile._depth
+    profile._depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        profile._depth -= 1
+        alloc_kib = (tracemalloc.get_traced_memory()[0] - before) / 1024 if tracing else None
+        profile.record(name, detail, ms, alloc_kib, depth, **fields)
@@ -0,0 +1,275 @@
+"""
+synthetic_data.py - Synthetic Survey Data
+Module for generating diabetes.csv-compatible data of any size for benchmarks and load tests.
+
+The rows mimic the BRFSS 2015 diabetes health indicators extract the dashboard is built for:
+the same 22 columns and codes, marginals close to the balanced (50/50) extract, and the
+relationships the charts look at (older age, higher BMI, high blood pressure and cholesterol
+raise diabetes risk; income tracks education; general health, difficulty walking and poor
+health days follow the chronic conditions). Nothing is copied from real respondents.
+
+Rows are generated in fixed blocks of ``BLOCK_ROWS``, each from its own random stream seeded
+with (seed, block number), so:
+
+- the same seed always gives the same rows, and a shorter file is a prefix of a longer one
+- a file of 10M+ rows is written block by block without holding it in memory
+
+Usage:
+    python synthetic_data.py out.csv [--rows N] [--seed N] [--prevalence P] [--check]
+"""
+
+import argparse
+import functools
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 100_000
+
+# Column order of diabetes.csv
+COLUMNS = [
+    "Diabetes_binary", "HighBP", "HighChol", "CholCheck", "BMI", "Smoker", "Stroke",
+    "HeartDiseaseorAttack", "PhysActivity", "Fruits", "Veggies", "HvyAlcoholConsump",
+    "AnyHealthcare", "NoDocbcCost", "GenHlth", "MentHlth", "PhysHlth", "DiffWalk", "Sex",
+    "Age", "Education", "Income",
+]
+
+# Published column means of the balanced BRFSS 2015 extract, for --check
+TARGET_MEANS = {
+    "Diabetes_binary": 0.500, "HighBP": 0.563, "HighChol": 0.526, "CholCheck": 0.975,
+    "BMI": 29.86, "Smoker": 0.475, "Stroke": 0.062, "HeartDiseaseorAttack": 0.148,
+    "PhysActivity": 0.703, "Fruits": 0.612, "Veggies": 0.788, "HvyAlcoholConsump": 0.043,
+    "AnyHealthcare": 0.955, "NoDocbcCost": 0.094, "GenHlth": 2.84, "MentHlth": 3.75,
+    "PhysHlth": 5.81, "DiffWalk": 0.253, "Sex": 0.457, "Age": 8.58, "Education": 4.92,
+    "Income": 5.70,
+}
+
+# Category probabilities: age groups 1-13 (18-24 ... 80+), education 1-6, income 1-8
+AGE_PROBS = [0.014, 0.021, 0.031, 0.043, 0.054, 0.068, 0.090, 0.125, 0.146, 0.144, 0.119, 0.070, 0.075]
+EDUCATION_PROBS = [0.001, 0.020, 0.050, 0.260, 0.280, 0.389]
+INCOME_PROBS = [0.054, 0.066, 0.085, 0.102, 0.120, 0.150, 0.165, 0.258]
+GENHLTH_PROBS = [0.12, 0.29, 0.33, 0.18, 0.08]
+MALE_SHARE = 0.457
+EDUCATION_INCOME_CORRELATION = 0.5
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _bernoulli(rng, logit):
+    """0/1 draws with probability sigmoid(logit)."""
+    return (rng.random(len(logit)) < _sigmoid(logit)).astype(np.uint8)
+
+
+def _cutpoints(probs):
+    """Standard normal cutpoints splitting N(0, 1) into categories with the given probabilities."""
+    normal = statistics.NormalDist()
+    return np.array([normal.inv_cdf(p) for p in np.cumsum(probs)[:-1]])
+
+
+def _ordinal(latent, probs):
+    """Codes 1..len(probs) from a roughly standard normal latent score."""
+    return (np.searchsorted(_cutpoints(probs), latent) + 1).astype(np.uint8)
+
+
+def _health_days(rng, logit_any, logit_all_month, scale):
+    """
+    Days of poor health in the past 30: mostly 0, heaped at 30, otherwise skewed to a few days.
+    """
+    n = len(logit_any)
+    some = rng.random(n) < _sigmoid(logit_any)
+    all_month = rng.random(n) < _sigmoid(logit_all_month)
+    few = np.minimum(np.ceil(rng.exponential(scale, n)), 29)
+    return np.where(some, np.where(all_month, 30, few), 0).astype(np.uint8)
+
+
+# ============================================================================
+# GENERATION
+# ============================================================================
+
+def _risk_factors(rng, n):
+    """Demographics, BMI and lifestyle: everything the diabetes model depends on."""
+    age = rng.choice(np.arange(1, 14), size=n, p=AGE_PROBS).astype(np.uint8)
+    male = (rng.random(n) < MALE_SHARE).astype(np.uint8)
+    education = rng.choice(np.arange(1, 7), size=n, p=EDUCATION_PROBS).astype(np.uint8)
+
+    # Income from a latent score correlated with education (a Gaussian copula)
+    edu_z = (education - 4.92) / 1.03
+    r = EDUCATION_INCOME_CORRELATION
+    income = _ordinal(r * edu_z + np.sqrt(1 - r * r) * rng.standard_normal(n), INCOME_PROBS)
+
+    a = age - 8.6
+    inc = income - 5.7
+    edu = education - 4.9
+    bmi = np.exp(np.log(29.2) + 0.21 * rng.standard_normal(n) + 0.008 * a - 0.012 * inc)
+    bmi = np.clip(np.round(bmi), 12, 98).astype(np.float32)
+    b = bmi - 29.9
+
+    smoker = _bernoulli(rng, -0.22 + 0.3 * male - 0.25 * edu - 0.1 * inc + 0.02 * a)
+    phys = _bernoulli(rng, 1.0 - 0.04 * b + 0.15 * inc + 0.15 * edu - 0.06 * a - 0.2 * smoker)
+    fruits = _bernoulli(rng, 0.45 + 0.12 * edu - 0.35 * male + 0.35 * phys - 0.25 * smoker)
+    veggies = _bernoulli(rng, 1.1 + 0.1 * inc + 0.1 * edu + 0.45 * phys)
+    alcohol = _bernoulli(rng, -3.75 + 0.3 * male - 0.06 * a + 0.7 * smoker)
+    highbp = _bernoulli(rng, 0.3 + 0.22 * a + 0.08 * b + 0.25 * male)
+    highchol = _bernoulli(rng, 0.05 + 0.14 * a + 0.02 * b + 0.5 * (highbp - 0.56))
+
+    return {
+        "Age": age, "Sex": male, "Education": education, "Income": income, "BMI": bmi,
+        "Smoker": smoker, "PhysActivity": phys, "Fruits": fruits, "Veggies": veggies,
+        "HvyAlcoholConsump": alcohol, "HighBP": highbp, "HighChol": highchol,
+    }
+
+
+def _diabetes_logit(cols):
+    """Diabetes log-odds before the intercept."""
+    return (0.18 * (cols["Age"] - 8.6) + 0.08 * (cols["BMI"] - 29.9) + 1.0 * cols["HighBP"]
+            + 0.8 * cols["HighChol"] - 0.25 * cols["PhysActivity"] - 0.15 * (cols["Income"] - 5.7)
+            + 0.25 * cols["Sex"] - 0.1 * cols["Veggies"] + 0.1 * cols["Smoker"])
+
+
+@functools.lru_cache(maxsize=None)
+def diabetes_intercept(prevalence):
+    """
+    Intercept giving the requested diabetes prevalence, found once by bisection on a fixed sample.
+    """
+    logit = _diabetes_logit(_risk_factors(np.random.default_rng(0), 200_000))
+    low, high = -20.0, 20.0
+    for _ in range(60):
+        mid = (low + high) / 2
+        if _sigmoid(logit + mid).mean() < prevalence:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def generate_block(seed, block, prevalence=0.5):
+    """
+    Generate one block of ``BLOCK_ROWS`` rows.
+
+    Parameters:
+    -----------
+    seed : int
+        Seed of the whole dataset
+    block : int
+        Block number; each block has its own random stream
+    prevalence : float
+        Share of rows with diabetes
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Columns in diabetes.csv order, as small integers (BMI as float32)
+    """
+    rng = np.random.default_rng([seed, block])
+    rows = BLOCK_ROWS
+    cols = _risk_factors(rng, rows)
+    a = cols["Age"] - 8.6
+    inc = cols["Income"] - 5.7
+    b = cols["BMI"] - 29.9
+
+    diabetes = _bernoulli(rng, _diabetes_logit(cols) + diabetes_intercept(prevalence))
+    cols["Diabetes_binary"] = diabetes
+    cols["CholCheck"] = _bernoulli(rng, 3.3 + 0.2 * a + 1.0 * cols["HighChol"] + 1.0 * diabetes)
+    cols["HeartDiseaseorAttack"] = _bernoulli(rng, -3.25 + 0.25 * a + 0.5 * diabetes + 0.45 * cols["HighBP"]
+                                              + 0.45 * cols["HighChol"] + 0.35 * cols["Smoker"]
+                                              + 0.6 * cols["Sex"])
+    cols["Stroke"] = _bernoulli(rng, -3.6 + 0.2 * a + 0.4 * diabetes + 0.6 * cols["HighBP"]
+                                + 0.3 * cols["Smoker"])
+    cols["AnyHealthcare"] = _bernoulli(rng, 3.3 + 0.35 * inc + 0.2 * a)
+    cols["NoDocbcCost"] = _bernoulli(rng, -1.75 - 0.35 * inc - 0.9 * cols["AnyHealthcare"] - 0.1 * a)
+
+    # General health (1 excellent - 5 poor) from a latent score driven by the conditions
+    health = (0.55 * diabetes + 0.4 * cols["HeartDiseaseorAttack"] + 0.35 * cols["Stroke"]
+              + 0.25 * cols["HighBP"] + 0.025 * b - 0.12 * inc - 0.35 * cols["PhysActivity"]
+              + 0.2 * cols["Smoker"])
+    genhlth = _ordinal(0.85 * rng.standard_normal(rows) + health - 0.39, GENHLTH_PROBS)
+    g = genhlth.astype(np.float64) - 2.85
+    cols["GenHlth"] = genhlth
+    cols["DiffWalk"] = _bernoulli(rng, -1.5 + 1.0 * g + 0.12 * a + 0.03 * b)
+    cols["PhysHlth"] = _health_days(rng, -0.75 + 0.9 * g + 1.0 * cols["DiffWalk"],
+                                    -1.3 + 0.7 * g + 0.8 * cols["DiffWalk"], 4.0)
+    cols["MentHlth"] = _health_days(rng, -0.8 + 0.45 * g - 0.45 * cols["Sex"] - 0.1 * a - 0.05 * inc,
+                                    -1.3 + 0.4 * g, 5.0)
+
+    return pd.DataFrame({col: cols[col] for col in COLUMNS})
+
+
+def iter_blocks(rows, seed=0, prevalence=0.5):
+    """
+    Yield the dataset block by block.
+
+    Parameters:
+    -----------
+    rows : int
+        Total rows
+    seed : int
+        Random seed; the same seed always gives the same rows
+    prevalence : float
+        Share of rows with diabetes (0.5 matches the balanced extract)
+
+    Returns:
+    --------
+    iterator of pandas.DataFrame
+        Blocks of at most ``BLOCK_ROWS`` rows
+    """
+    for block, start in enumerate(range(0, rows, BLOCK_ROWS)):
+        df = generate_block(seed, block, prevalence)
+        # the last block is cut short rather than drawn smaller, so its rows don't depend on ``rows``
+        yield df if start + BLOCK_ROWS <= rows else df.iloc[:rows - start]
+
+
+def generate(rows, seed=0, prevalence=0.5):
+    """Generate the whole dataset in memory (see ``iter_blocks``)."""
+    blocks = list(iter_blocks(rows, seed, prevalence))
+    return pd.concat(blocks, ignore_index=True) if blocks else generate_block(seed, 0, prevalence).iloc[:0]
+
+
+def write_csv(path, rows, seed=0, prevalence=0.5):
+    """
+    Stream the dataset to a CSV file without holding it in memory.
+
+    Values are written as plain integers; data_loader reads them the same way as the
+    original file's ``1.0`` style.
+    """
+    with open(path, "w", newline="") as out:
+        for block, df in enumerate(iter_blocks(rows, seed, prevalence)):
+            df.to_csv(out, header=block == 0, index=False)
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def check(df):
+    """Print each column's mean next to the published extract's."""
+    print(f"{'column':<24}{'synthetic':>11}{'extract':>10}")
+    for col in COLUMNS:
+        print(f"{col:<24}{df[col].mean():>11.3f}{TARGET_MEANS[col]:>10.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV file to write")
+    parser.add_argument("--rows", type=int, default=70_692)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prevalence", type=float, default=0.5, help="share of rows with diabetes")
+    parser.add_argument("--check", action="store_true", help="compare column means with the real extract")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    write_csv(args.path, args.rows, args.seed, args.prevalence)
+    print(f"Wrote {args.rows:,} rows to {args.path} in {time.perf_counter() - start:.1f} s")
+    if args.check:
+        check(generate(min(args.rows, 1_000_000), args.seed, args.prevalence))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+variants.py - Client-Side Chart Variants
+Module for packing every option of a selectbox-driven chart into one Plotly figure.
+
+Builders add the traces of each variant to one figure, one variant after another, and then call
+``add_variant_menu``. The browser switches variants through a dropdown inside the figure, so
+changing the option needs no server round-trip at all.
+"""
+
+
+def add_variant_menu(fig, variants, active=0, **placement):
+    """
+    Show one variant at a time and add a dropdown to switch between them.
+
+    Parameters:
+    -----------
+    fig : plotly.graph_objects.Figure
+        Figure holding the traces of every variant, in ``variants`` order
+    variants : list of tuple
+        (label, number of traces, layout changes) for each variant; layout
+        changes use Plotly's relayout paths, e.g. {"title.text": "..."}
+    active : int
+        Index of the variant shown first
+    **placement
+        Overrides for the dropdown position (x, xanchor, y, yanchor), e.g.
+        to keep it clear of a left-aligned title
+
+    Returns:
+    --------
+    plotly.graph_objects.Figure
+        The same figure, for chaining
+    """
+    owners = [i for i, (_, count, _) in enumerate(variants) for _ in range(count)]
+    for trace, owner in zip(fig.data, owners):
+        trace.visible = owner == active
+
+    buttons = [
+        dict(
+            label=label,
+            method="update",
+            args=[{"visible": [owner == i for owner in owners]}, layout],
+        )
+        for i, (label, _, layout) in enumerate(variants)
+    ]
+
+    menu = dict(
+        active=active,
+        buttons=buttons,
+        direction='down',
+        pad={'r': 10, 't': 10},
+        showactive=True,
+        x=0.01,
+        xanchor='left',
+        y=1.15,
+        yanchor='top'
+    )
+    menu.update(placement)
+    fig.update_layout(updatemenus=[menu])
+    fig.update_layout(variants[active][2])
+    return fig
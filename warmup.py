@@ -0,0 +1,233 @@
+"""
+warmup.py - Figure Cache Warm-up
+Module for pre-rendering every chart variant into the figure cache in the background.
+
+The dashboard's option space is small and fully enumerable: every page, tab and selectbox
+option maps to one builder call. ``start_warmup`` is called at the end of every run of app.py;
+the first call for a dataset version (server start, or after the CSV changes) builds the shared
+indexes and then every variant on a thread pool, so later visits to any page get a cache hit.
+Starting only once the first run has drawn its page keeps the warm-up (which imports every
+page's chart module, plotly.express included) from competing with the first visitor's render.
+
+Client-side variants are opt-in: set ``DASHBOARD_CLIENT_SIDE_VARIANTS=1`` in the environment to
+replace the H1, H3 and H5 selectboxes with a dropdown inside one figure carrying every option's
+data. Those combined figures are only pre-rendered while the mode is on.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bitmap import get_bitmaps
+from cube import get_cube
+from features import get_features
+
+WORKERS = 4
+
+# Draw the selectbox charts with every option in one figure (see app.py's fragments)
+CLIENT_SIDE_VARIANTS = os.environ.get("DASHBOARD_CLIENT_SIDE_VARIANTS", "") not in ("", "0")
+
+_LOCK = threading.Lock()
+_RUNS = {}   # dataset fingerprint -> WarmupRun
+
+
+def chart_variants(df, client_side=None):
+    """
+    Enumerate every figure the dashboard can show.
+
+    Parameters:
+    -----------
+    client_side : bool, optional
+        Include the combined all-options figures of client-side variants (default
+        ``CLIENT_SIDE_VARIANTS``, i.e. only when the dashboard draws them)
+
+    Returns:
+    --------
+    list of tuple
+        (label, builder, args, kwargs) for each page/tab/selectbox combination
+    """
+    if client_side is None:
+        client_side = CLIENT_SIDE_VARIANTS
+    # Imported here so that importing this module (from app.py) doesn't load every page's charts
+    import hypothesis_h1 as h1
+    import hypothesis_h2 as h2
+    import hypothesis_h3 as h3
+    import hypothesis_h4 as h4
+    import hypothesis_h5 as h5
+    from conclusion import create_sankey_diagram
+    from introduction import create_body_diagram
+
+    variants = [("Introduction: body diagram", create_body_diagram, (), {})]
+
+    variants += [
+        ("H1: individual factors", h1.create_individual_lifestyle_factors_chart, (df,), {}),
+        ("H1: risk factors", h1.create_risk_factors_chart, (df,), {}),
+    ]
+    variants += [(f"H1: physical activity by {option}", h1.create_physical_activity_by_demographics_chart,
+                  (df,), {"demographic": option}) for option in h1.DEMOGRAPHIC_OPTIONS]
+    if client_side:
+        variants.append(("H1: physical activity, all views", h1.create_physical_activity_by_demographics_chart,
+                         (df,), {"all_variants": True}))
+
+    variants += [
+        ("H2: health behaviors", h2.create_education_health_behaviors_chart, (df,), {}),
+        ("H2: diabetes trend", h2.create_education_diabetes_trend_chart, (df,), {}),
+        ("H2: income by education", h2.create_income_diabetes_by_education_chart, (df,), {}),
+        ("H2: lifestyle", h2.create_education_lifestyle_diabetes_chart, (df,), {}),
+    ]
+
+    variants += [(f"H3: coverage {level}", h3.create_healthcare_coverage_chart,
+                  (df,), {"income_level": level}) for level in h3.INCOME_LEVELS]
+    if client_side:
+        variants.append(("H3: coverage, all levels", h3.create_healthcare_coverage_chart,
+                         (df,), {"all_variants": True}))
+    variants += [
+        ("H3: income trends", h3.create_income_trends_dual_chart, (df,), {}),
+        ("H3: access barriers", h3.create_access_barriers_chart, (df,), {}),
+    ]
+
+    variants += [
+        ("H4: health trends", h4.create_health_trends_chart, (df,), {}),
+        ("H4: limitations comparison", h4.create_functional_limitations_comparison_chart, (df,), {}),
+        ("H4: limitations", h4.create_functional_limitations_chart, (df,), {}),
+    ]
+
+    variants += [(f"H5: conditions by {option}", h5.create_preexisting_conditions_chart,
+                  (df,), {"sort_by": option}) for option in h5.SORT_OPTIONS]
+    if client_side:
+        variants.append(("H5: conditions, all sort orders", h5.create_preexisting_conditions_chart,
+                         (df,), {"all_variants": True}))
+    variants += [
+        ("H5: demographics", h5.create_preexisting_conditions_demographics_chart, (df,), {}),
+        ("H5: BMI categories", h5.create_bmi_categories_chart, (df,), {}),
+        ("H5: condition count", h5.create_condition_count_chart, (df,), {}),
+    ]
+
+    variants.append(("Conclusion: sankey", create_sankey_diagram, (), {}))
+    return variants
+
+
+class WarmupRun:
+    """Progress of one warm-up: counts, failures, timing and the error that stopped it, if any."""
+
+    def __init__(self, total=0):
+        self.total = total   # 0 until the warm-up has listed the variants
+        self.done = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.error = None   # exception that stopped the warm-up early
+        self._lock = threading.Lock()
+
+    def record(self, label, error=None):
+        with self._lock:
+            self.done += 1
+            if error is not None:
+                self.errors.append((label, error))
+            if self.done == self.total:
+                self.elapsed = time.perf_counter() - self.started
+
+    def finish(self, error=None):
+        """Mark the warm-up as over, whether or not every variant was built."""
+        with self._lock:
+            if error is not None:
+                self.error = error
+            if self.elapsed is None:
+                self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def finished(self):
+        return self.elapsed is not None
+
+    def status(self):
+        """Snapshot of the progress as a dict (safe to read from any thread)."""
+        with self._lock:
+            return {
+                "done": self.done,
+                "total": self.total,
+                "errors": list(self.errors),
+                "finished": self.elapsed is not None,
+                "error": self.error,
+                "elapsed": self.elapsed if self.elapsed is not None else time.perf_counter() - self.started,
+            }
+
+
+def warm(df, workers=WORKERS, run=None):
+    """
+    Build every chart variant into the figure cache, blocking until done.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        Dataset from ``data_loader.load_dataset``
+    workers : int
+        Size of the thread pool
+    run : WarmupRun, optional
+        Progress object to update (one is created if omitted)
+
+    Returns:
+    --------
+    WarmupRun
+    """
+    run = run or WarmupRun()
+    error = None
+    try:
+        variants = chart_variants(df)
+        run.total = len(variants)
+
+        # Shared per-dataset structures first, so the workers don't all wait on the same lock
+        get_features(df)
+        get_cube(df)
+        get_bitmaps(df)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup") as pool:
+            futures = {pool.submit(builder, *args, **kwargs): label
+                       for label, builder, args, kwargs in variants}
+            for future in as_completed(futures):
+                failure = future.exception()
+                if failure is not None:
+                    print(f"Warning: warm-up failed for {futures[future]}: {failure!r}")
+                run.record(futures[future], failure)
+    except Exception as exc:
+        print(f"Warning: warm-up stopped: {exc!r}")
+        error = exc
+        raise
+    finally:
+        # Always mark the run finished so the sidebar stops showing progress
+        run.finish(error)
+    return run
+
+
+def warmup_run(df):
+    """The warm-up started for this dataset version, or None if there is none yet."""
+    with _LOCK:
+        return _RUNS.get(df.attrs.get("fingerprint"))
+
+
+def start_warmup(df, workers=WORKERS):
+    """
+    Start warming the figure cache for this dataset version in a background thread.
+
+    Safe to call on every rerun: only the first call per dataset fingerprint
+    starts a warm-up, later calls return the existing one.
+
+    Returns:
+    --------
+    WarmupRun or None
+        None for frames without a fingerprint, which the figure cache skips
+    """
+    fingerprint = df.attrs.get("fingerprint")
+    if fingerprint is None:
+        return None
+
+    with _LOCK:
+        run = _RUNS.get(fingerprint)
+        if run is not None:
+            return run
+        run = WarmupRun()
+        _RUNS.clear()   # only the current dataset version is worth tracking
+        _RUNS[fingerprint] = run
+
+    threading.Thread(target=warm, args=(df, workers, run), name="warmup", daemon=True).start()
+    return run